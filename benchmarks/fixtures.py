@@ -0,0 +1,220 @@
+"""
+Synthetic fixture archives for the benchmarks, shaped like the responses of the
+live API so no recording is needed to run them.
+"""
+
+from urllib.parse import urlencode
+import json, random
+
+from mercapy.constants import API_URL
+from mercapy.utils.api import ALGOLIA_URL, algolia_params
+from mercapy.utils.replay import FixtureArchive, exchange_key
+from mercapy.utils.warehouses import CHANGE_POSTCODE_URL
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+BRANDS = ["Hacendado", "Deliplus", "Bosque Verde", "Compy", "Solcare", None]
+WORDS = [
+    "jamón", "serrano", "queso", "curado", "leche", "entera", "galletas",
+    "chocolate", "aceite", "oliva", "virgen", "extra", "tomate", "frito",
+    "yogur", "natural", "pan", "integral", "café", "molido", "zumo", "naranja",
+]
+
+
+def product_data(pid: int, category: dict, details: bool, rng: random.Random) -> dict:
+    """
+    Product payload as returned by the API, either from a listing or, with `details`, from /api/products/{id}/.
+    """
+    name = " ".join(rng.sample(WORDS, 3)).capitalize()
+    price = round(rng.uniform(0.3, 30), 2)
+    is_pack = rng.random() < 0.2
+
+    data = {
+        "id": str(pid),
+        "slug": name.lower().replace(" ", "-"),
+        "limit": 999,
+        "badges": {"is_water": False, "requires_age_check": rng.random() < 0.05},
+        "status": None,
+        "packaging": rng.choice(["Paquete", "Botella", "Bandeja", None]),
+        "published": True,
+        "share_url": f"https://tienda.mercadona.es/product/{pid}/",
+        "thumbnail": f"https://prod-mercadona.imgix.net/images/{pid:032x}.jpg?fit=crop&h=300&w=300",
+        "categories": [
+            {
+                "id": category["parent"],
+                "name": category["parent_name"],
+                "level": 0,
+                "order": 1,
+                "categories": [
+                    {
+                        "id": category["id"],
+                        "name": category["name"],
+                        "level": 1,
+                        "order": 1,
+                    }
+                ],
+            }
+        ],
+        "display_name": name,
+        "unavailable_from": None,
+        "price_instructions": {
+            "iva": rng.choice([4, 10, 21]),
+            "is_new": rng.random() < 0.05,
+            "is_pack": is_pack,
+            "pack_size": 6 if is_pack else None,
+            "unit_name": None,
+            "unit_size": round(rng.uniform(0.1, 2), 3),
+            "bulk_price": f"{price * 2:.2f}",
+            "unit_price": f"{price:.2f}",
+            "approx_size": False,
+            "size_format": "kg",
+            "total_units": 6 if is_pack else None,
+            "unit_selector": True,
+            "bunch_selector": False,
+            "drained_weight": None,
+            "selling_method": 0,
+            "price_decreased": rng.random() < 0.1,
+            "reference_price": f"{price * 2:.3f}",
+            "min_bunch_amount": 1,
+            "reference_format": "kg",
+            "previous_unit_price": None,
+            "increment_bunch_amount": 1,
+        },
+        "unavailable_weekdays": [],
+    }
+
+    if details:
+        data["ean"] = f"84{pid:011d}"
+        data["brand"] = rng.choice(BRANDS)
+        data["origin"] = "España"
+        data["details"] = {
+            "brand": data["brand"],
+            "origin": "España",
+            "suppliers": [{"name": "Proveedor S.A."}],
+            "legal_name": name.upper(),
+            "description": " ".join(rng.choices(WORDS, k=12)),
+            "counter_info": None,
+            "danger_mentions": "",
+            "alcohol_by_volume": None,
+            "mandatory_mentions": "",
+            "production_variant": "",
+            "usage_instructions": "",
+            "storage_instructions": "Conservar en lugar fresco y seco.",
+        }
+        data["photos"] = [
+            {
+                "zoom": f"https://prod-mercadona.imgix.net/images/{pid:032x}.jpg?fit=crop&h=1600&w=1600",
+                "regular": f"https://prod-mercadona.imgix.net/images/{pid:032x}.jpg?fit=crop&h=600&w=600",
+                "thumbnail": f"https://prod-mercadona.imgix.net/images/{pid:032x}.jpg?fit=crop&h=300&w=300",
+                "perspective": i,
+            }
+            for i in range(3)
+        ]
+        data["nutrition_information"] = {"allergens": "", "ingredients": ""}
+
+    return data
+
+
+def generate_archive(
+    categories: int = 20,
+    products: int = 100,
+    warehouse: str = "mad1",
+    language: str = "es",
+    postcode: str = "28001",
+    seed: int = 0,
+) -> FixtureArchive:
+    """
+    Builds an archive with a catalog of `categories` level 1 categories of `products` products each, the details of every product, the warehouse lookup of `postcode` and a search for every word in WORDS.
+
+    Returns:
+        FixtureArchive: The archive, ready to be replayed.
+    """
+    rng = random.Random(seed)
+    archive = FixtureArchive()
+    params = {"lang": language, "wh": warehouse}
+
+    def add(method, url, payload, body=None, headers=JSON_HEADERS):
+        content = json.dumps(payload).encode() if payload is not None else b""
+        archive.record(exchange_key(method, url, body), 200, headers, content, "OK")
+
+    def api_url(endpoint):
+        return f"{API_URL}{endpoint.lstrip('/')}?{urlencode(params)}"
+
+    tops = []
+    pid = 10000
+    for top in range((categories + 9) // 10):
+        children = []
+        for i in range(min(10, categories - top * 10)):
+            category = {
+                "id": 100 + top * 10 + i,
+                "name": f"Categoría {top * 10 + i}",
+                "parent": top + 1,
+                "parent_name": f"Sección {top}",
+            }
+
+            listing = []
+            for _ in range(products):
+                listing.append(product_data(pid, category, False, rng))
+                details = product_data(pid, category, True, rng)
+                add("GET", api_url(f"/api/products/{pid}/"), details)
+                pid += 1
+
+            # Products are grouped in subcategories of up to 25
+            subcategories = [
+                {
+                    "id": category["id"] * 100 + j,
+                    "name": f"{category['name']} {j}",
+                    "layout": 1,
+                    "products": listing[k : k + 25],
+                    "published": True,
+                    "is_extended": False,
+                }
+                for j, k in enumerate(range(0, len(listing), 25))
+            ]
+            add(
+                "GET",
+                api_url(f"/api/categories/{category['id']}/"),
+                {
+                    "id": category["id"],
+                    "name": category["name"],
+                    "layout": 2,
+                    "published": True,
+                    "categories": subcategories,
+                },
+            )
+            children.append(
+                {"id": category["id"], "name": category["name"], "published": True}
+            )
+
+        tops.append({"id": top + 1, "name": f"Sección {top}", "categories": children})
+
+    add(
+        "GET",
+        api_url("/api/categories/"),
+        {"count": len(tops), "next": None, "previous": None, "results": tops},
+    )
+
+    add(
+        "PUT",
+        CHANGE_POSTCODE_URL,
+        None,
+        body=json.dumps({"new_postal_code": postcode}),
+        headers={"X-Customer-Wh": warehouse},
+    )
+
+    # Search hits are drawn from the first category
+    first = {"id": 100, "name": "Categoría 0", "parent": 1, "parent_name": "Sección 0"}
+    for word in WORDS:
+        hits = [
+            product_data(10000 + rng.randrange(products), first, False, rng)
+            for _ in range(20)
+        ]
+        body = json.dumps({"params": algolia_params(word)})
+        add(
+            "POST",
+            f"{ALGOLIA_URL}products_prod_{warehouse}_{language}/query",
+            {"hits": hits, "nbHits": len(hits), "page": 0, "nbPages": 1, "query": word},
+            body=body,
+        )
+
+    return archive
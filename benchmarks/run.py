@@ -0,0 +1,333 @@
+"""
+Performance benchmarks of mercapy against a local replay or stub backend.
+
+Usage:
+    python benchmarks/run.py [--backend replay|stub] [--output results.json] [--baseline old.json]
+
+Results are written as JSON so the numbers of two releases can be compared with
+--baseline.
+"""
+
+from datetime import datetime, timezone
+from pathlib import Path
+import argparse, gc, json, platform, resource, statistics, subprocess, sys, time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fixtures import generate_archive
+
+from mercapy import CompactProduct, Mercadona
+from mercapy.elements.fields import decode_unit_price
+from mercapy.utils.decoding import JSONDecoder, msgspec
+from mercapy.utils.replay import Faults, ReplayTransport, StubServer
+
+# Product properties read by the property access benchmark.
+PROPERTIES = ["name", "unit_price", "bulk_price", "is_pack", "brand", "iva"]
+
+
+def percentiles(values: list[float]) -> dict:
+    # Nearest-rank percentiles, in milliseconds.
+    values = sorted(values)
+    if not values:
+        return {}
+
+    def rank(p):
+        i = round(p / 100 * len(values)) - 1
+        return values[min(len(values) - 1, max(0, i))]
+
+    return {
+        "count": len(values),
+        "p50_ms": rank(50) * 1000,
+        "p95_ms": rank(95) * 1000,
+        "p99_ms": rank(99) * 1000,
+        "max_ms": values[-1] * 1000,
+    }
+
+
+def peak_rss() -> int:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+class Backend:
+    # Creates transports answering from the fixture archive, either in-process
+    # or through a local HTTP stub server.
+
+    def __init__(self, kind: str, archive, faults: Faults, pool_maxsize: int):
+        self.kind = kind
+        self.archive = archive
+        self.faults = faults
+        self.pool_maxsize = pool_maxsize
+        self.server = StubServer(archive, faults).start() if kind == "stub" else None
+
+    def transport(self, **kwargs):
+        kwargs.setdefault("pool_maxsize", self.pool_maxsize)
+        if self.server is not None:
+            return self.server.transport(**kwargs)
+        return ReplayTransport(self.archive, self.faults, **kwargs)
+
+    def close(self):
+        if self.server is not None:
+            self.server.stop()
+
+
+def timed(transport) -> list[float]:
+    # Records the latency of every request sent through the transport.
+    latencies = []
+    transport.instrumentation.add_hook(lambda event: latencies.append(event.latency))
+    return latencies
+
+
+def bench_catalog(backend: Backend, args) -> dict:
+    results = {}
+
+    for concurrency in args.concurrency:
+        runs = []
+        latencies = []
+        for _ in range(args.repeat):
+            transport = backend.transport()
+            latencies = timed(transport)
+            client = Mercadona(args.warehouse, transport=transport)
+
+            gc.collect()
+            started_at = time.perf_counter()
+            products = client.get_catalog(concurrency=concurrency)
+            runs.append(time.perf_counter() - started_at)
+            transport.close()
+
+        wall = statistics.median(runs)
+        results[str(concurrency)] = {
+            "wall_s": wall,
+            "runs_s": runs,
+            "products": len(products),
+            "products_per_s": len(products) / wall,
+            "requests": len(latencies),
+            "latency": percentiles(latencies),
+        }
+
+    return results
+
+
+def bench_hydration(backend: Backend, args) -> dict:
+    transport = backend.transport()
+    client = Mercadona(args.warehouse, transport=transport)
+    count = min(args.hydrate, args.categories * args.products)
+    ids = [str(10000 + i) for i in range(count)]
+
+    latencies = timed(transport)
+    started_at = time.perf_counter()
+    products = client.get_products(ids, concurrency=max(args.concurrency))
+    wall = time.perf_counter() - started_at
+    transport.close()
+
+    return {
+        "products": len(products),
+        "concurrency": max(args.concurrency),
+        "wall_s": wall,
+        "products_per_s": len(products) / wall,
+        "latency": percentiles(latencies),
+    }
+
+
+def per_access(func, accesses: int) -> float:
+    # Best of 5 runs, in nanoseconds per access.
+    best = float("inf")
+    for _ in range(5):
+        started_at = time.perf_counter_ns()
+        func()
+        best = min(best, time.perf_counter_ns() - started_at)
+
+    return best / accesses
+
+
+def bench_properties(backend: Backend, args) -> dict:
+    transport = backend.transport()
+    client = Mercadona(args.warehouse, transport=transport)
+    category = client.get_categories()[0]
+    products = category.products
+    data = [p._data for p in products]
+    compact = [CompactProduct.from_data(d, args.warehouse, "es") for d in data]
+    transport.close()
+
+    accesses = len(products) * len(PROPERTIES)
+
+    def product_properties():
+        for product in products:
+            for name in PROPERTIES:
+                getattr(product, name)
+
+    def compact_attributes():
+        for product in compact:
+            for name in PROPERTIES:
+                getattr(product, name)
+
+    def unit_price():
+        for product in products:
+            product.unit_price
+
+    def decoder():
+        for d in data:
+            decode_unit_price(d)
+
+    return {
+        "products": len(products),
+        "properties": PROPERTIES,
+        "product_ns": per_access(product_properties, accesses),
+        "compact_ns": per_access(compact_attributes, accesses),
+        "unit_price_ns": per_access(unit_price, len(products)),
+        "unit_price_decoder_ns": per_access(decoder, len(data)),
+    }
+
+
+def bench_json(args) -> dict:
+    archive = args.archive
+    key = next(k for k in archive.exchanges if "/api/categories/1" in k)
+    content = archive.lookup(key)[2]
+
+    decoders = {"json": json.loads, "untyped": JSONDecoder().decode}
+    if msgspec is not None:
+        typed = JSONDecoder(typed=True)
+        decoders["typed"] = lambda c: typed.decode(c, "category")
+
+    results = {"backend": JSONDecoder().backend, "payload_bytes": len(content)}
+    for name, decode in decoders.items():
+        runs = []
+        for _ in range(args.repeat * 10):
+            started_at = time.perf_counter()
+            decode(content)
+            runs.append(time.perf_counter() - started_at)
+
+        best = min(runs)
+        results[name] = {"us": best * 1e6, "mb_per_s": len(content) / best / 1e6}
+
+    return results
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).parent,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    # {"a": {"b": 1}} -> {"a.b": 1}, keeping only numbers.
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+
+    return flat
+
+
+def compare(results: dict, baseline: dict) -> None:
+    current, previous = flatten(results), flatten(baseline)
+
+    print(f"\n{'metric':<45} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name in sorted(current.keys() & previous.keys()):
+        old, new = previous[name], current[name]
+        change = f"{(new - old) / old * 100:+.1f}%" if old else ""
+        print(f"{name:<45} {old:>12.4g} {new:>12.4g} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--backend", choices=["replay", "stub"], default="replay")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Results of a previous run to compare with")
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--products", type=int, default=100)
+    parser.add_argument("--hydrate", type=int, default=500, help="Products to hydrate")
+    parser.add_argument(
+        "--concurrency",
+        type=lambda v: [int(c) for c in v.split(",")],
+        default=[1, 4, 8, 16],
+        help="Comma separated concurrency levels",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.02, help="Seconds per request"
+    )
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    args.warehouse = "mad1"
+    args.archive = generate_archive(
+        args.categories, args.products, args.warehouse, seed=args.seed
+    )
+    faults = Faults(
+        latency=args.latency,
+        jitter=args.jitter,
+        throttle_rate=args.throttle_rate,
+        retry_after=0,
+        seed=args.seed,
+    )
+    backend = Backend(args.backend, args.archive, faults, max(args.concurrency))
+
+    results = {}
+    rss = {}
+    try:
+        for name, bench in [
+            ("catalog", lambda: bench_catalog(backend, args)),
+            ("hydration", lambda: bench_hydration(backend, args)),
+            ("properties", lambda: bench_properties(backend, args)),
+            ("json", lambda: bench_json(args)),
+        ]:
+            print(f"Running {name}...", flush=True)
+            results[name] = bench()
+            rss[name] = peak_rss()
+    finally:
+        backend.close()
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            k: v
+            for k, v in vars(args).items()
+            if k not in {"archive", "output", "baseline"}
+        },
+        "results": results,
+        # Peak RSS of the process after each benchmark
+        "peak_rss_bytes": rss,
+    }
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+
+    for concurrency, run in results["catalog"].items():
+        print(
+            f"catalog c={concurrency:<3} {run['wall_s']:.3f}s "
+            f"{run['products_per_s']:.0f} products/s p95={run['latency']['p95_ms']:.1f}ms"
+        )
+    print(f"hydration {results['hydration']['products_per_s']:.0f} products/s")
+    print(f"property access {results['properties']['product_ns']:.0f}ns")
+    print(f"peak RSS {max(rss.values()) / 2**20:.1f}MB")
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            previous = json.load(file)
+
+        compare(
+            {**results, "peak_rss_bytes": rss},
+            {**previous["results"], "peak_rss_bytes": previous["peak_rss_bytes"]},
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,109 +1,15 @@
 """
 This script performs a BFS (Breadth-First Search) across postal codes to find unique warehouse codes
-associated with Mercadona stores. It uses concurrent execution to speed up the process by fetching
-warehouse codes asynchronously using ThreadPoolExecutor.
-"""
-
-import requests
-from collections import deque
-import concurrent.futures
-
-
-def get_warehouse_code(postal_code):
-    """
-    Get warehouse code for a given postal code.
-
-    Args:
-        postal_code (str): The postal code to query.
-
-    Returns:
-        str or None: Warehouse code if found, None otherwise.
-    """
-    url = "https://tienda.mercadona.es/api/postal-codes/actions/change-pc/"
-    payload = {"new_postal_code": postal_code}
-    headers = {"Content-Type": "application/json"}
-
-    try:
-        response = requests.put(url, json=payload, headers=headers)
-        if response.status_code == 200:
-            return response.headers.get("X-Customer-Wh")
-    except Exception as e:
-        print(f"Error for postal code {postal_code}: {e}")
-    return None
-
-
-def get_neighboring_postal_codes(postal_code):
-    """
-    Get neighboring postal codes by changing each digit.
-
-    Args:
-        postal_code (str): The postal code to find neighbors for.
-
-    Returns:
-        set: A set of neighboring postal codes.
-    """
-    neighbors = set()
-    postal_code_digits = list(postal_code)
-    for i in range(5):  # Iterate over each digit in the postal code
-        original_digit = postal_code_digits[i]
-        for change in [-1, 1]:  # Change the digit by -1 and +1
-            new_digit = (int(original_digit) + change) % 10
-            postal_code_digits[i] = str(new_digit)
-            neighbors.add("".join(postal_code_digits))
-        postal_code_digits[i] = original_digit
-    return neighbors
-
+associated with Mercadona stores, using mercapy.discovery. Queries are pipelined under a rate limit,
+and the progress is saved to a checkpoint file so an interrupted search resumes where it stopped.
 
-def find_unique_warehouses(starting_postal_codes):
-    """
-    Perform BFS to explore postal codes and find unique warehouse codes.
-
-    Args:
-        starting_postal_codes (list): List of initial postal codes to start the search.
-
-    Returns:
-        set: Set of unique warehouse codes found.
-    """
-    visited = set()
-    unique_warehouses = set()
-    queue = deque(starting_postal_codes)
-    total_checked = 0
-
-    # Use ThreadPoolExecutor to run requests concurrently
-    with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-        futures = []
-        while queue:
-            current_postal_code = queue.popleft()
-            if current_postal_code in visited:
-                continue
-
-            visited.add(current_postal_code)
-            total_checked += 1
-            print(
-                f"Checking postal code: {current_postal_code} (Total checked: {total_checked})"
-            )
-
-            # Submit the request to get warehouse code asynchronously
-            futures.append(executor.submit(get_warehouse_code, current_postal_code))
-
-            # Wait for some requests to complete before adding more
-            if len(futures) >= 10 or not queue:
-                for future in concurrent.futures.as_completed(futures):
-                    warehouse_code = future.result()
-                    if warehouse_code:
-                        if warehouse_code not in unique_warehouses:
-                            print(
-                                f"Found new warehouse code: {warehouse_code} for postal code: {current_postal_code}"
-                            )
-                        unique_warehouses.add(warehouse_code)
-                        neighbors = get_neighboring_postal_codes(current_postal_code)
-                        for neighbor in neighbors:
-                            if neighbor not in visited:
-                                queue.append(neighbor)
-                futures = []
+Usage:
+    python find_warehouses.py [--concurrency 8] [--rate 10] [--checkpoint find_warehouses.json]
+"""
 
-    return unique_warehouses
+import argparse
 
+from mercapy.discovery import WarehouseDiscovery
 
 # Initial postal codes to start the search
 initial_postal_codes = [
@@ -426,6 +332,25 @@ initial_postal_codes = [
     "52000",
 ]  # Example initial postal codes covering more areas
 
-print("Starting the search for unique warehouse codes...")
-unique_warehouses = find_unique_warehouses(initial_postal_codes)
-print(f"Unique warehouse codes found: {unique_warehouses}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, help="Maximum queries per second")
+    parser.add_argument("--checkpoint", default="find_warehouses.json")
+    args = parser.parse_args()
+
+    print("Starting the search for unique warehouse codes...")
+    discovery = WarehouseDiscovery(
+        initial_postal_codes,
+        args.concurrency,
+        args.rate,
+        checkpoint=args.checkpoint,
+        verbose=True,
+    )
+    state = discovery.run()
+    print(f"Unique warehouse codes found: {state.warehouses}")
+
+
+if __name__ == "__main__":
+    main()
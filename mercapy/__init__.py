@@ -1,3 +1,24 @@
 from .elements import *
 from .merca import *
-from .constants import WAREHOUSES
\ No newline at end of file
+from .async_merca import AsyncMercadona
+from .constants import WAREHOUSES
+from .utils.transport import Transport
+from .utils.async_transport import AsyncTransport
+from .utils.cache import ResponseCache
+from .utils.identity import IdentityMap
+from .search import LocalIndex
+from .utils.decoding import JSONDecoder
+from .utils.replay import (
+    RecordingTransport,
+    ReplayTransport,
+    AsyncReplayTransport,
+    StubServer,
+    Faults,
+)
+from .utils.instrumentation import Instrumentation, RequestEvent
+from .downloads import download_photos, DownloadReport
+from .planner import FetchPlan
+from .tree import CategoryTree, CategoryNode
+from .sweep import sweep_warehouses, PriceMatrix
+from .utils.postcodes import PostcodeTable, PostcodeCache
+from .discovery import WarehouseDiscovery, DiscoveryState
@@ -0,0 +1,451 @@
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator
+from typing import Literal
+from urllib.parse import urljoin
+
+from .constants import WAREHOUSES, API_URL
+from .merca import Catalog, _ClientMixin
+from .utils.api import (
+    fetch_json_async,
+    query_algolia_async,
+    query_algolia_batch_async,
+)
+from .utils.warehouses import get_warehouse_code_async
+from .utils.async_transport import AsyncTransport, aiohttp
+from .utils.identity import IdentityMap
+from .elements import Product, Category, CompactProduct, ItemError
+from .elements.base import MercadonaItem
+from .elements.fields import check_fields, needs_details
+from .planner import FetchPlan
+from .search import LocalIndex
+
+
+class AsyncMercadona(_ClientMixin):
+
+    def __init__(
+        self,
+        postcode: str,
+        language: Literal["es", "en"] = "es",
+        transport: AsyncTransport = None,
+        concurrency: int = 32,
+        identity_map: IdentityMap = None,
+        local_index: LocalIndex = None,
+    ) -> None:
+        """
+        Asynchronous counterpart of Mercadona: every method that talks to the API is awaitable, so many requests can be in flight at once.
+        If the postcode isn't a warehouse code, the closest warehouse is looked up on the first request.
+        Items returned by this client keep its transport and never fetch data synchronously: reading a property that needs data the item doesn't have yet raises RuntimeError. Await `load` (or the item's own `load`, which uses this client's transport) first.
+
+        Args:
+            postcode (str): The postcode from where products are being accessed. Warehouse codes are accepted too (e.g. "mad1", "vlc1", etc.)
+            language (str): The language of the information recieved. Defaults to "es": Spanish. Can also be "en": English.
+            transport (AsyncTransport, optional): The transport every request is sent through. Defaults to a new transport owned by this instance.
+            concurrency (int): Maximum number of requests in flight when no transport is given. Defaults to 32.
+            identity_map (IdentityMap, optional): Map shared by every item created by this instance. Replaces the transport's own map if given. Defaults to the transport's map.
+            local_index (LocalIndex, optional): Offline index used by `search(backend="local")`. Can also be built later with `build_local_index`.
+        """
+        self.language = language
+        self.postcode = postcode
+        self.warehouse = postcode if postcode in WAREHOUSES else None
+        self.local_index = local_index
+
+        self.transport = transport or AsyncTransport(concurrency=concurrency)
+        if identity_map is not None:
+            self.transport.identity_map = identity_map
+
+    async def _ensure_warehouse(self) -> str:
+        if self.warehouse is None:
+            self.warehouse = await get_warehouse_code_async(
+                self.postcode, self.transport
+            )
+
+        return self.warehouse
+
+    async def _get_with_context(self, url: str):
+        await self._ensure_warehouse()
+        return await fetch_json_async(
+            url, {"lang": self.language, "wh": self.warehouse}, self.transport
+        )
+
+    def _sync_only(self, method: str):
+        raise NotImplementedError(
+            f"AsyncMercadona has no `{method}`. Use a synchronous Mercadona client for it."
+        )
+
+    async def load(self, items: list[MercadonaItem]) -> list[MercadonaItem]:
+        """
+        Fetches the complete data of many products, categories or seasons concurrently.
+
+        Args:
+            items (list[MercadonaItem]): Items to load.
+
+        Returns:
+            list[MercadonaItem]: The same items, in the same order.
+        """
+        return await asyncio.gather(*(i.load(self.transport) for i in items))
+
+    async def get_product(self, id: str) -> Product:
+        """
+        Fetches a product of this warehouse. If the transport has an identity map, every call with the same id returns the same instance.
+
+        Args:
+            id (str): Product identifier.
+
+        Returns:
+            Product: The loaded product.
+        """
+        await self._ensure_warehouse()
+        product = Product.get_or_create(
+            id, self.warehouse, self.language, self.transport
+        )
+        return await product.load(self.transport)
+
+    async def get_products(
+        self, ids: list[str], fields: list[str] = None
+    ) -> list[Product | ItemError]:
+        """
+        Fetches many products concurrently. Repeated ids are only fetched once.
+
+        Args:
+            ids (list[str]): Product identifiers.
+            fields (list[str], optional): Product properties that will be read (e.g. ["name", "unit_price"]). Products already holding the data these need aren't fetched again. Defaults to every property.
+
+        Returns:
+            list[Product | ItemError]: One result per id, in input order: the loaded product, or an ItemError if it couldn't be fetched.
+        """
+        details = needs_details(check_fields(fields))
+        await self._ensure_warehouse()
+
+        unique_ids = list(dict.fromkeys(str(i) for i in ids))
+        products = [
+            Product.get_or_create(i, self.warehouse, self.language, self.transport)
+            for i in unique_ids
+        ]
+        pending = [
+            p
+            for p in products
+            if p._is_empty() or (details and p._is_data_incomplete())
+        ]
+
+        async def fetch(product: Product) -> ItemError | None:
+            try:
+                await product.load(self.transport, report_errors=False)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                return ItemError(product.id, None, str(e) or type(e).__name__)
+
+            err_code = product._data.get("err_code")
+            if err_code:
+                message = str(product._data.get("err_message"))
+                return ItemError(product.id, err_code, message)
+
+        errors = await asyncio.gather(*(fetch(p) for p in pending))
+        errors = {e.id: e for e in errors if e}
+
+        results = {p.id: errors.get(p.id, p) for p in products}
+        return [results[str(i)] for i in ids]
+
+    async def get_category(self, id: str) -> Category:
+        """
+        Fetches a category of this warehouse. If the transport has an identity map, every call with the same id returns the same instance.
+
+        Args:
+            id (str): Category identifier.
+
+        Returns:
+            Category: The loaded category.
+        """
+        await self._ensure_warehouse()
+        category = Category.get_or_create(
+            id, self.warehouse, self.language, self.transport
+        )
+        return await category.load(self.transport)
+
+    async def search(
+        self,
+        query: str,
+        hits_per_page: int = None,
+        page: int = None,
+        attributes: list[str] = None,
+        backend: Literal["algolia", "local"] = "algolia",
+    ) -> list[Product]:
+        """
+        Queries Mercadona's products using their provider "Algolia". Products are built from the search hits.
+        With `backend="local"` the query is answered by the local index instead, without any request.
+
+        Args:
+            query (str): Search query (e.g. Dish Soap).
+            hits_per_page (int, optional): Number of products per page. Defaults to Algolia's default, or 20 for the local index.
+            page (int, optional): Page to retrieve, starting at 0. Defaults to the first page.
+            attributes (list[str], optional): Hit attributes to retrieve. Defaults to every attribute. Ignored by the local index.
+            backend (str): Either "algolia" or "local". Defaults to "algolia".
+
+        Returns:
+            list[Product]: List of products related to the search.
+        """
+        if backend == "local":
+            return self._search_local(query, hits_per_page or 20, page or 0)
+        elif backend != "algolia":
+            raise ValueError(f"Unknown search backend: {backend}")
+
+        await self._ensure_warehouse()
+        response = await query_algolia_async(
+            query,
+            self.warehouse,
+            self.language,
+            self.transport,
+            hits_per_page,
+            page,
+            attributes,
+        )
+        return self._parse_search(response)
+
+    async def build_local_index(
+        self, path: str = None, details: bool = True
+    ) -> LocalIndex:
+        """
+        Builds the offline index used by `search(backend="local")` from a crawl of the catalog.
+
+        Args:
+            path (str, optional): If given, the index is also saved to this file, to be loaded later with `LocalIndex.load`.
+            details (bool): Fetch the details of every product, so their legal name and description are indexed too. Without them only the category endpoints are requested. Defaults to True.
+
+        Returns:
+            LocalIndex: The index, which is also kept in `local_index`.
+        """
+        fields = ["legal_name", "description"] if details else None
+        catalog = await self.get_catalog(fields=fields)
+        self.local_index = LocalIndex.build(catalog, self.warehouse, self.language)
+
+        if path:
+            self.local_index.save(path)
+
+        return self.local_index
+
+    async def iter_search(
+        self, query: str, hits_per_page: int = None, attributes: list[str] = None
+    ) -> AsyncIterator[Product]:
+        """
+        Yields every product matching a search, requesting the following page only once the current one has been consumed.
+
+        Args:
+            query (str): Search query (e.g. Dish Soap).
+            hits_per_page (int, optional): Number of products per page. Defaults to Algolia's default.
+            attributes (list[str], optional): Hit attributes to retrieve. Defaults to every attribute.
+
+        Yields:
+            Product: Every product related to the search.
+        """
+        await self._ensure_warehouse()
+
+        page = 0
+        while True:
+            response = await query_algolia_async(
+                query,
+                self.warehouse,
+                self.language,
+                self.transport,
+                hits_per_page,
+                page,
+                attributes,
+            )
+            for product in self._parse_search(response):
+                yield product
+
+            page += 1
+            if response is None or page >= response.get("nbPages", 0):
+                return
+
+    async def search_many(
+        self,
+        queries: list[str],
+        batch_size: int = 50,
+        hits_per_page: int = None,
+        attributes: list[str] = None,
+    ) -> dict[str, list[Product]]:
+        """
+        Runs many searches at once. Queries are grouped in batches sent to Algolia's multi-query endpoint, and every batch is sent concurrently.
+
+        Args:
+            queries (list[str]): Search queries.
+            batch_size (int): Number of queries sent in each request. Must be at least 1. Defaults to 50.
+            hits_per_page (int, optional): Number of products per query. Defaults to Algolia's default.
+            attributes (list[str], optional): Hit attributes to retrieve. Defaults to every attribute.
+
+        Returns:
+            dict[str, list[Product]]: Products related to each query. Queries whose batch failed, or that got no result, map to an empty list.
+        """
+        batches = self._batch_queries(queries, batch_size)
+        await self._ensure_warehouse()
+
+        async def send(batch: list[str]) -> list[dict] | None:
+            return await query_algolia_batch_async(
+                batch,
+                self.warehouse,
+                self.language,
+                self.transport,
+                hits_per_page,
+                attributes,
+            )
+
+        responses = await asyncio.gather(*(send(b) for b in batches))
+        return self._parse_batches(batches, responses)
+
+    async def get_home_recommendations(self) -> dict:
+        """
+        Retrieves product recommendations for the home page grouped by sections.
+
+        Returns:
+            dict: Dictionary where keys are layout names and values are lists of recommended products. The lists of products can also include banners which often are Season objects.
+        """
+        url = urljoin(API_URL, "/api/home/")
+        response = await self._get_with_context(url)
+        return self._parse_home_recommendations(response)
+
+    async def get_new_arrivals(self) -> list[Product]:
+        """
+        New product arrivals at Mercadona
+
+        Returns:
+            list[Product]: List of new product arrivals.
+        """
+        url = urljoin(API_URL, "/api/home/new-arrivals/")
+        response = await self._get_with_context(url)
+        return self._parse_new_arrivals(response)
+
+    async def get_categories(self) -> list[Category]:
+        url = urljoin(API_URL, "/api/categories/")
+        response = await self._get_with_context(url)
+        return self._parse_categories(response)
+
+    async def get_catalog(self, fields: list[str] = None) -> Catalog:
+        """
+        Fetches every category concurrently and returns all of their products. Products listed in several categories are only returned once, with every category they were listed in in `listed_in`.
+
+        Args:
+            fields (list[str], optional): Product fields that will be read (e.g. ["unit_price", "brand"]). If any of them is only available in the product's details, the details of every product are fetched concurrently too, once per product. Products whose details can't be fetched keep their listing data. Defaults to fetching details lazily.
+
+        Returns:
+            Catalog: Every product in the catalog, in the order they were first listed, and the number of duplicate listings merged in `duplicates`.
+        """
+        categories = await self.get_categories()
+        await self._load_all(categories)
+        catalog = Catalog()
+
+        # Categories that couldn't be fetched have already been reported.
+        pairs = ((c, c._data) for c in categories if not c._data.get("err_code"))
+        for product_data, listed_in in self._iter_listings(pairs, catalog=catalog):
+            catalog.append(self._listed_product(product_data, listed_in))
+
+        if fields is not None and needs_details(check_fields(fields)):
+            await self._load_all(catalog)
+
+        return catalog
+
+    async def _load_all(self, items: list[MercadonaItem]) -> None:
+        # Loads the complete data of every item that is still missing it. An item
+        # that can't be fetched keeps the data it had (e.g. a product's listing
+        # data), so one failure doesn't abort the others.
+
+        async def load(item: MercadonaItem) -> None:
+            data = item._data
+            try:
+                await item.load(self.transport)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                print(f"Error fetching data for {item}.")
+                return
+
+            if item._data.get("err_code") and data:
+                item._data = data
+
+        pending = [i for i in items if i._is_data_incomplete()]
+        await asyncio.gather(*(load(i) for i in pending))
+
+    async def plan_catalog(self, fields: list[str] = None) -> FetchPlan:
+        """
+        Tells ahead of time which endpoints and how many requests `get_catalog(fields=...)` needs. Only the category list is fetched to plan.
+
+        Args:
+            fields (list[str], optional): Product fields that will be read. Defaults to every field.
+
+        Returns:
+            FetchPlan: The endpoints and number of requests. Detail requests are counted exactly if every category was already fetched (e.g. kept by an identity map), and estimated otherwise, as in `Mercadona.plan_catalog`.
+        """
+        return self._plan_catalog(check_fields(fields), await self.get_categories())
+
+    async def iter_catalog(
+        self, readahead: int = 0, compact: bool = False, unique: bool = False
+    ) -> AsyncIterator[Product] | AsyncIterator[CompactProduct]:
+        """
+        Yields every product of every category as soon as its category is fetched, without keeping the whole catalog in memory.
+
+        Args:
+            readahead (int): Number of upcoming categories fetched in the background while the current one is consumed. Defaults to fetching each category when it is reached.
+            compact (bool): Yield CompactProduct snapshots instead of Product objects. Defaults to False.
+            unique (bool): Yield products listed in several categories only once. Their `listed_in` keeps growing as they are found in later categories. Every product yielded is remembered to do so, so memory grows with the catalog. Defaults to False: products are yielded once per category they are listed in, and memory stays constant.
+
+        Yields:
+            Product | CompactProduct: Every product in the catalog, in category order.
+        """
+        # Listings are deduplicated a category at a time, sharing the memberships.
+        memberships = {}
+
+        async for category, data in self._iter_category_data(readahead):
+            listings = self._iter_listings([(category, data)], unique, None, memberships)
+            for product_data, listed_in in listings:
+                yield self._listed_product(product_data, listed_in, compact)
+
+    async def _iter_category_data(
+        self, readahead: int = 0
+    ) -> AsyncIterator[tuple[Category, dict]]:
+        # Yields every category with its response, in order, fetching up to
+        # `readahead` categories in the background.
+
+        async def fetch(category: Category) -> dict:
+            # The response isn't stored in the category so it can be freed as soon
+            # as its products have been consumed.
+            if not category._is_data_incomplete():
+                return category._data
+
+            return await self._get_with_context(urljoin(API_URL, category.endpoint))
+
+        categories = deque(await self.get_categories())
+        pending = deque()
+        try:
+            while categories or pending:
+                while categories and len(pending) <= readahead:
+                    category = categories.popleft()
+                    pending.append((category, asyncio.ensure_future(fetch(category))))
+
+                category, task = pending.popleft()
+                data = await task
+                if data.get("err_code"):
+                    print(f"Error fetching data for {category}.")
+                    continue
+
+                yield category, data
+        finally:
+            # Stopping early cancels the categories fetched ahead.
+            for _, task in pending:
+                task.cancel()
+
+    def get_category_tree(self, *args, **kwargs):
+        self._sync_only("get_category_tree")
+
+    def export_catalog(self, *args, **kwargs):
+        self._sync_only("export_catalog")
+
+    def download_photos(self, *args, **kwargs):
+        self._sync_only("download_photos")
+
+    async def close(self) -> None:
+        """
+        Closes every connection opened by this instance.
+        """
+        await self.transport.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
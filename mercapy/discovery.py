@@ -0,0 +1,279 @@
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+import json, os, time
+
+from .utils.postcodes import PostcodeTable, is_spanish_postcode, neighbouring_postcodes
+from .utils.ratelimit import RateLimiter
+from .utils.transport import Transport
+from .utils.warehouses import query_warehouse_code
+
+
+@dataclass
+class DiscoveryState:
+    """
+    Progress of a warehouse discovery crawl, saved to resume it later.
+
+    Args:
+        results (dict[str, str | None]): Warehouse of every postcode the API answered for, or None if it isn't served.
+        frontier (deque[str]): Postcodes waiting to be queried, in order.
+        failed (set[str]): Postcodes whose request failed. They are queued again when the crawl is resumed.
+    """
+
+    results: dict[str, str | None] = field(default_factory=dict)
+    frontier: deque[str] = field(default_factory=deque)
+    failed: set[str] = field(default_factory=set)
+
+    @property
+    def visited(self) -> set[str]:
+        """
+        Every postcode that has been queried or queued.
+        """
+        return set(self.results) | set(self.frontier) | self.failed
+
+    @property
+    def warehouses(self) -> set[str]:
+        """
+        Every warehouse code found so far.
+        """
+        return {w for w in self.results.values() if w is not None}
+
+    def save(self, path: str) -> None:
+        """
+        Saves the state to a JSON file, replacing it atomically so an interrupted save never leaves a corrupted checkpoint.
+
+        Args:
+            path (str): Path of the file.
+        """
+        payload = {
+            "results": self.results,
+            "frontier": list(self.frontier),
+            "failed": sorted(self.failed),
+        }
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(path + ".part", "w", encoding="utf-8") as file:
+            json.dump(payload, file, separators=(",", ":"))
+        os.replace(path + ".part", path)
+
+    @classmethod
+    def load(cls, path: str) -> "DiscoveryState":
+        """
+        Loads a state saved with `save`.
+
+        Args:
+            path (str): Path of the file.
+
+        Returns:
+            DiscoveryState: The state.
+        """
+        with open(path, encoding="utf-8") as file:
+            payload = json.load(file)
+
+        return cls(
+            payload["results"], deque(payload["frontier"]), set(payload["failed"])
+        )
+
+
+class WarehouseDiscovery:
+    def __init__(
+        self,
+        seeds: list[str] = None,
+        concurrency: int = 8,
+        rate: float = None,
+        transport: Transport = None,
+        checkpoint: str = None,
+        checkpoint_interval: float = 30,
+        on_result: Callable[[str, str | None], None] = None,
+        verbose: bool = False,
+    ) -> None:
+        """
+        Finds which warehouse serves every reachable Spanish postcode. Starting from the seed postcodes, the neighbours (see `neighbouring_postcodes`) of every postcode served by a warehouse are queried too, until no new postcode is found.
+        Queries are pipelined: a new postcode is sent as soon as any query in flight finishes, so there are always `concurrency` requests in flight while the frontier isn't empty. With a checkpoint, the progress is saved periodically and when the crawl stops (even if interrupted), and a new crawl with the same checkpoint resumes from it.
+
+        Args:
+            seeds (list[str], optional): Postcodes to start from. Invalid postcodes are ignored. Defaults to the first postcode of every province (01001, 02001... 52001).
+            concurrency (int): Number of queries in flight. Defaults to 8.
+            rate (float, optional): Maximum queries per second when no transport is given. Defaults to no pacing.
+            transport (Transport, optional): Transport every query is sent through. Defaults to a new transport limited by `concurrency` and `rate`, closed when the crawl ends.
+            checkpoint (str, optional): Path of the file the progress is saved to and resumed from. Defaults to not saving it.
+            checkpoint_interval (float): Seconds between checkpoints. Defaults to 30.
+            on_result (Callable, optional): Function called with every postcode answered and its warehouse (or None).
+            verbose (bool): Print every new warehouse found and the progress at every checkpoint. Defaults to False.
+        """
+        self.seeds = seeds or [f"{province:02d}001" for province in range(1, 53)]
+        self.concurrency = max(1, concurrency)
+        self.rate = rate
+        self.transport = transport
+        self.checkpoint = checkpoint
+        self.checkpoint_interval = checkpoint_interval
+        self.on_result = on_result
+        self.verbose = verbose
+
+        if checkpoint is not None and os.path.exists(checkpoint):
+            self.state = DiscoveryState.load(checkpoint)
+            # Failed queries get another chance.
+            self.state.frontier.extend(sorted(self.state.failed))
+            self.state.failed.clear()
+        else:
+            self.state = DiscoveryState()
+
+        self._found = self.state.warehouses
+
+        visited = self.state.visited
+        for seed in dict.fromkeys(self.seeds):
+            if is_spanish_postcode(seed) and seed not in visited:
+                self.state.frontier.append(seed)
+
+    def run(self, max_queries: int = None) -> DiscoveryState:
+        """
+        Crawls until the frontier is empty.
+
+        Args:
+            max_queries (int, optional): Stop after sending this many queries, leaving the rest of the frontier for a later run. Defaults to no limit.
+
+        Returns:
+            DiscoveryState: The results, the postcodes still queued and those that failed.
+        """
+        owned = self.transport is None
+        transport = self.transport or Transport(
+            pool_maxsize=self.concurrency,
+            rate_limiter=RateLimiter(self.rate, max_concurrency=self.concurrency),
+        )
+
+        state = self.state
+        visited = state.visited
+        pending = {}
+        sent = 0
+        saved_at = time.monotonic()
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                while state.frontier or pending:
+                    while (
+                        state.frontier
+                        and len(pending) < self.concurrency
+                        and (max_queries is None or sent < max_queries)
+                    ):
+                        postcode = state.frontier.popleft()
+                        future = executor.submit(query_warehouse_code, postcode, transport)
+                        pending[future] = postcode
+                        sent += 1
+
+                    if not pending:
+                        break
+
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        # Only forgotten once handled, so it's queued again if the
+                        # crawl is interrupted in between.
+                        warehouse, answered = future.result()
+                        self._add_result(pending[future], warehouse, answered, visited)
+                        del pending[future]
+
+                    if (
+                        self.checkpoint is not None
+                        and time.monotonic() - saved_at >= self.checkpoint_interval
+                    ):
+                        self._save(pending)
+                        saved_at = time.monotonic()
+        finally:
+            # Queries still in flight (if interrupted) are queued again, so they
+            # are sent when the crawl is resumed.
+            for future, postcode in pending.items():
+                future.cancel()
+                state.frontier.appendleft(postcode)
+            pending.clear()
+
+            if self.checkpoint is not None:
+                self._save()
+            if owned:
+                transport.close()
+
+        return state
+
+    def _add_result(
+        self, postcode: str, warehouse: str | None, answered: bool, visited: set[str]
+    ) -> None:
+        state = self.state
+
+        if not answered:
+            state.failed.add(postcode)
+            return
+
+        if warehouse is not None and warehouse not in self._found:
+            self._found.add(warehouse)
+            if self.verbose:
+                print(f"Found new warehouse code: {warehouse} for postal code: {postcode}")
+
+        state.results[postcode] = warehouse
+
+        # Only the neighbours of the postcode that was answered, and only if it's
+        # served by a warehouse.
+        if warehouse is not None:
+            for neighbour in neighbouring_postcodes(postcode):
+                if neighbour not in visited:
+                    visited.add(neighbour)
+                    state.frontier.append(neighbour)
+
+        if self.on_result is not None:
+            self.on_result(postcode, warehouse)
+
+    def _save(self, pending: dict = None) -> None:
+        state = self.state
+        if pending:
+            # In-flight postcodes are saved as queued without touching the
+            # frontier being crawled.
+            state = DiscoveryState(
+                state.results,
+                deque([*pending.values(), *state.frontier]),
+                state.failed,
+            )
+
+        state.save(self.checkpoint)
+
+        if self.verbose:
+            print(
+                f"{len(state.results)} postcodes answered, {len(state.warehouses)} warehouses, "
+                f"{len(state.frontier)} queued, {len(state.failed)} failed"
+            )
+
+    def to_table(self) -> PostcodeTable:
+        """
+        Returns the postcodes answered so far as a PostcodeTable.
+        """
+        table = PostcodeTable(generated_at=time.time())
+        for postcode, warehouse in self.state.results.items():
+            table.set(postcode, warehouse)
+
+        return table
+
+
+def find_warehouses(
+    seeds: list[str] = None,
+    concurrency: int = 8,
+    rate: float = None,
+    checkpoint: str = None,
+    verbose: bool = False,
+) -> set[str]:
+    """
+    Crawls postcodes (see `WarehouseDiscovery`) and returns every warehouse code found.
+
+    Args:
+        seeds (list[str], optional): Postcodes to start from. Defaults to the first postcode of every province.
+        concurrency (int): Number of queries in flight. Defaults to 8.
+        rate (float, optional): Maximum queries per second. Defaults to no pacing.
+        checkpoint (str, optional): Path of the file the progress is saved to and resumed from. Defaults to not saving it.
+        verbose (bool): Print the progress. Defaults to False.
+
+    Returns:
+        set[str]: The warehouse codes.
+    """
+    discovery = WarehouseDiscovery(
+        seeds, concurrency, rate, checkpoint=checkpoint, verbose=verbose
+    )
+    return discovery.run().warehouses
@@ -0,0 +1,166 @@
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Literal
+import os, time
+
+import requests
+
+from .elements import Product, CompactProduct
+from .elements.photo import Photo, stream_to_file
+from .utils.transport import Transport, get_default_transport
+
+
+@dataclass
+class DownloadReport:
+    """
+    Outcome of a bulk photo download.
+
+    Args:
+        downloaded (int): Files downloaded.
+        skipped (int): Files that already existed and weren't downloaded again.
+        failed (list[tuple[str, str]]): URL and error of every download that failed. Products whose photos couldn't be fetched are listed by their repr instead of a URL.
+        bytes (int): Bytes written to disk.
+        elapsed (float): Seconds the whole download took.
+    """
+
+    downloaded: int = 0
+    skipped: int = 0
+    failed: list[tuple[str, str]] = field(default_factory=list)
+    bytes: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """
+        Bytes written per second.
+        """
+        return self.bytes / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def files_per_second(self) -> float:
+        """
+        Files downloaded per second.
+        """
+        return self.downloaded / self.elapsed if self.elapsed else 0.0
+
+
+def size_label(size: tuple[int, int] | None) -> str:
+    """
+    Returns the name of the directory photos of a given size are saved to.
+
+    Args:
+        size (tuple[int, int] | None): (width, height), or None for the original size.
+
+    Returns:
+        str: "original", or "{width}x{height}" (e.g. "600x600").
+    """
+    return "original" if size is None else f"{size[0]}x{size[1]}"
+
+
+def photo_path(dest: str, photo: Photo, size: tuple[int, int] = None) -> str:
+    """
+    Returns where a photo of a given size is saved. Photo file names are hashes of their content, so a file that already exists doesn't need to be downloaded again.
+
+    Args:
+        dest (str): Root directory of the photos.
+        photo (Photo): The photo.
+        size (tuple[int, int], optional): (width, height). Defaults to the original size.
+
+    Returns:
+        str: The path (e.g. "photos/600x600/cea11c6ef934dff6c6a018df3b757b8d.jpg").
+    """
+    return os.path.join(dest, size_label(size), photo.file_name)
+
+
+def _get_photos(
+    item: Product | CompactProduct | Photo,
+) -> tuple[list[Photo], str | None]:
+    # Returns the item's photos, and why they couldn't be listed if the API
+    # answered the product's details with an error (e.g. a 404).
+    if isinstance(item, Photo):
+        return [item], None
+
+    # Fetches the product's details if its photos aren't known yet.
+    photos = item.photos or []
+
+    if isinstance(item, Product):
+        err_code = item._data.get("err_code")
+        if err_code:
+            return [], str(item._data.get("err_message") or err_code)
+
+    return photos, None
+
+
+def download_photos(
+    products: Iterable[Product | CompactProduct | Photo],
+    sizes: list[tuple[int, int] | None] = None,
+    dest: str = "photos",
+    concurrency: int = 8,
+    fit_mode: Literal["crop", "fit"] = "crop",
+    transport: Transport = None,
+) -> DownloadReport:
+    """
+    Downloads every photo of many products in several sizes, streaming each one to disk. Photos shared by several products are only downloaded once, and files that already exist are skipped, so an interrupted download can be resumed by calling this again.
+
+    Args:
+        products (Iterable): Products (or photos) whose photos are downloaded. Products whose details haven't been fetched yet are fetched first.
+        sizes (list, optional): (width, height) of every size to download, or None for the original size. Defaults to the original size only.
+        dest (str): Root directory of the photos. Every size is saved to its own subdirectory (see `photo_path`). Defaults to "photos".
+        concurrency (int): Number of photos downloaded in parallel. Keep it at or below the transport's `pool_maxsize` so every worker reuses a pooled connection. Defaults to 8.
+        fit_mode (str): Fit mode for resized photos. Defaults to "crop".
+        transport (Transport, optional): Transport every photo is downloaded through. Defaults to the shared default transport.
+
+    Returns:
+        DownloadReport: Number of files downloaded, skipped and failed, and the throughput.
+    """
+    transport = transport or get_default_transport()
+    sizes = sizes or [None]
+    report = DownloadReport()
+    started_at = time.perf_counter()
+
+    def download(task: tuple[str, str]) -> tuple[int | None, str | None]:
+        url, path = task
+        try:
+            return stream_to_file(transport, url, path), None
+        except (requests.exceptions.RequestException, OSError) as e:
+            return None, str(e)
+
+    def list_photos(item) -> tuple[str, list[Photo], str | None]:
+        # A product whose details can't be fetched is reported as failed
+        # instead of stopping the whole download.
+        try:
+            return repr(item), *_get_photos(item)
+        except requests.exceptions.RequestException as e:
+            return repr(item), [], str(e)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        photos = {}
+        for item, item_photos, error in executor.map(list_photos, products):
+            if error is not None:
+                report.failed.append((item, error))
+
+            for photo in item_photos:
+                photos.setdefault(photo.file_name, photo)
+
+        tasks = []
+        for photo in photos.values():
+            for size in sizes:
+                path = photo_path(dest, photo, size)
+                if os.path.exists(path):
+                    report.skipped += 1
+                    continue
+
+                url = photo.url if size is None else photo.get_size(*size, fit_mode)
+                tasks.append((url, path))
+
+        for (url, _), (written, error) in zip(tasks, executor.map(download, tasks)):
+            if error is not None:
+                report.failed.append((url, error))
+                continue
+
+            report.downloaded += 1
+            report.bytes += written
+
+    report.elapsed = time.perf_counter() - started_at
+    return report
@@ -1,3 +1,5 @@
 from .product import Product
 from .season import Season
 from .category import Category
+from .compact import CompactProduct
+from .base import ItemError
@@ -1,17 +1,18 @@
 from dataclasses import dataclass, field
 from typing import Literal
 from urllib.parse import urljoin
-import time
+import threading
 
-from ..utils.api import fetch_json
+from ..utils.api import fetch_json, fetch_json_async
+from ..utils.transport import Transport
+from ..utils.async_transport import AsyncTransport
 from ..constants import API_URL
 
 
 def lazy_load_property(func):
     @property
     def wrapper(self):
-        if self._is_empty():
-            self._fetch_data()
+        self._ensure_data()
 
         if self.not_found():
             return None
@@ -21,6 +22,22 @@ def lazy_load_property(func):
     return wrapper
 
 
+@dataclass
+class ItemError:
+    """
+    Returned in place of an item that couldn't be fetched.
+
+    Args:
+        id (str): Identifier of the item.
+        err_code (int | None): HTTP status code received, or None if no response was received.
+        err_message (str): Description of the error.
+    """
+
+    id: str
+    err_code: int | None
+    err_message: str
+
+
 @dataclass
 class MercadonaItem:
     """
@@ -31,64 +48,171 @@ class MercadonaItem:
         endpoint (str): API endpoint to fetch data from.
         warehouse (str): Warehouse or distribution center postal code.
         language (str): Language for the API response. Defaults to "es".
+        transport (Transport | AsyncTransport, optional): Transport used to fetch data. Items with an AsyncTransport can only be fetched with `load`. Defaults to the shared default transport.
     """
 
     id: str | dict
     endpoint: str = field(repr=False)
     warehouse: str = "mad1"
     language: Literal["es", "en"] = field(default="es", init=True, repr=False)
+    transport: Transport | AsyncTransport = field(
+        default=None, repr=False, compare=False
+    )
 
     def __post_init__(self):
         self._data = {}
+        # Held while the item's data is fetched, so threads reading the same item
+        # at once only fetch it once.
+        self._lock = threading.Lock()
 
         if isinstance(self.id, dict):
             self._data = self.id
             self.id = str(self._data.get("id"))
 
+    @classmethod
+    def get_or_create(
+        cls,
+        id: str | dict,
+        warehouse: str,
+        language: Literal["es", "en"] = "es",
+        transport: Transport = None,
+    ):
+        """
+        Returns the instance of this item shared through the transport's identity map, creating it if needed. Without an identity map a new instance is always returned.
+        Data given as a dictionary is merged into an existing instance that hasn't got its complete data yet.
+
+        Args:
+            id (str | dict): Item identifier, or the item's data as returned by the API.
+            warehouse (str): Warehouse or distribution center postal code.
+            language (str): Language for the API response. Defaults to "es".
+            transport (Transport, optional): Transport used to fetch data. Defaults to the shared default transport.
+
+        Returns:
+            MercadonaItem: The shared instance.
+        """
+        identity_map = transport.identity_map if transport else None
+        if identity_map is None:
+            return cls(id, warehouse, language, transport)
+
+        item_id = str(id.get("id")) if isinstance(id, dict) else str(id)
+        key = (cls.__name__, item_id, warehouse, language)
+
+        item, existed = identity_map.get_or_add(
+            key, lambda: cls(id, warehouse, language, transport)
+        )
+        if existed and isinstance(id, dict) and item._is_data_incomplete():
+            with item._lock:
+                if item._is_data_incomplete():
+                    item._data = {**item._data, **id}
+
+        return item
+
     def not_found(self):
-        if self._is_empty():
-            self._fetch_data()
+        self._ensure_data()
 
         return bool(self._data.get("err_code"))
 
     def _fetch_with_context(self, endpoint: str) -> dict:
         url = urljoin(API_URL, endpoint)
-        return fetch_json(url, {"lang": self.language, "wh": self.warehouse})
-
-    def _fetch_data(self, retry_attempts: int = 3, retry_delay: int = 20) -> None:
-        attempt = 0
-        while attempt <= retry_attempts:
-            self._data = self._fetch_with_context(self.endpoint)
-            err_code = self._data.get("err_code")
-
-            if err_code is None:
-                # No error, data fetched successfully
-                break
-            elif err_code == 429:
-                # Too Many Requests, retry
-                attempt += 1
-                if attempt > retry_attempts:
-                    print(
-                        f"Exceeded maximum retry attempts ({retry_attempts}) for {self}."
-                    )
-                    break
-                calculated_delay = attempt**2 * retry_delay
-                time.sleep(calculated_delay)
-            elif err_code == 404:
-                # Not Found, no need to retry
-                print(f"Couldn't find {self} :(")
-                break
-            else:
-                # Other errors, stop retrying
-                print(f"Error fetching data for {self}.")
-                print(self._data)
-                break
+        if isinstance(self.transport, AsyncTransport):
+            # A synchronous request would block the event loop.
+            raise RuntimeError(
+                f"{self} can't fetch its data synchronously from an async client. "
+                "Load it first with `await item.load()` or `await mercadona.load(items)`."
+            )
+
+        return fetch_json(
+            url, {"lang": self.language, "wh": self.warehouse}, self.transport
+        )
+
+    def _ensure_data(self, complete: bool = False, report_errors: bool = True) -> None:
+        # Fetches the item's data if it is missing (or incomplete, with `complete`).
+        # Threads reaching here at once wait for the first one to fetch it.
+        missing = self._is_data_incomplete if complete else self._is_empty
+        if not missing():
+            return
+
+        with self._lock:
+            if missing():
+                self._fetch_data(report_errors)
+
+    def _fetch_data(self, report_errors: bool = True) -> None:
+        # Throttling (429) is retried by the transport, so any error that gets
+        # here is final.
+        self._data = self._fetch_with_context(self.endpoint)
+
+        if report_errors:
+            self._report_error()
+
+    def _report_error(self) -> None:
+        err_code = self._data.get("err_code")
+
+        if err_code is None:
+            # No error, data fetched successfully
+            return
+        elif err_code == 429:
+            print(f"Exceeded maximum retry attempts for {self}.")
+        elif err_code == 404:
+            print(f"Couldn't find {self} :(")
+        else:
+            print(f"Error fetching data for {self}.")
+            print(self._data)
+
+    async def load(
+        self,
+        transport: AsyncTransport = None,
+        force: bool = False,
+        report_errors: bool = True,
+    ):
+        """
+        Fetches the complete data of the item without blocking the event loop. Does nothing if the data is already complete, unless `force` is set.
+
+        Args:
+            transport (AsyncTransport, optional): Transport used to fetch the data. Defaults to the item's own transport if it is asynchronous (e.g. items created by AsyncMercadona), otherwise to a transport that only lives for this call.
+            force (bool): Fetch the data even if it is already complete. Defaults to False.
+            report_errors (bool): Print a message if the API answers with an error. Defaults to True.
+
+        Returns:
+            MercadonaItem: The item itself, so it can be awaited inline.
+        """
+        if not force and not self._is_data_incomplete():
+            return self
+
+        if transport is None and isinstance(self.transport, AsyncTransport):
+            transport = self.transport
+
+        url = urljoin(API_URL, self.endpoint)
+        params = {"lang": self.language, "wh": self.warehouse}
+
+        self._data = await fetch_json_async(url, params, transport)
+        if report_errors:
+            self._report_error()
+
+        return self
 
     def _is_empty(self):
         return not bool(self._data)
 
+    def _is_data_incomplete(self):
+        return self._is_empty()
+
     def __dict__(self):
-        if self._is_empty():
-            self._fetch_data()
+        self._ensure_data()
 
         return self._data
+
+    def __getstate__(self):
+        # The lock and the transport's open connections can't be pickled or
+        # copied, so a restored item gets a new lock and the default transport.
+        # `__dict__` is shadowed above, so the instance dict is read through object.
+        state = dict(object.__getstate__(self))
+        del state["_lock"]
+        state["transport"] = None
+
+        return state
+
+    def __setstate__(self, state: dict):
+        for key, value in state.items():
+            setattr(self, key, value)
+
+        self._lock = threading.Lock()
@@ -1,11 +1,11 @@
 from typing import Literal
 
 from .base import MercadonaItem, lazy_load_property
+from ..utils.transport import Transport
 
 def require_complete_data(func):
     def wrapper(self):
-        if self._is_data_incomplete():
-            self._fetch_data()
+        self._ensure_data(complete=True)
 
         value = func(self)
         return value
@@ -18,13 +18,14 @@ class Category(MercadonaItem):
         id: str | dict,
         warehouse: str,
         language: Literal["es", "en"] = "es",
+        transport: Transport = None,
     ):
         if isinstance(id, dict):
             endpoint = f"/api/categories/{id.get("id")}/"
         else:
             endpoint = f"/api/categories/{id}/"
 
-        super().__init__(id, endpoint, warehouse, language)
+        super().__init__(id, endpoint, warehouse, language, transport)
 
     def _is_data_incomplete(self):      
         subcategories = self._data.get("categories", None)
@@ -33,19 +34,26 @@ class Category(MercadonaItem):
     @lazy_load_property
     @require_complete_data
     def products(self):
+        return self._parse_products(self._data)
+
+    def _parse_products(self, data: dict) -> list:
         from .product import Product
 
-        category_products = []
-        subcategories = self._data.get("categories", [])
+        return [
+            Product.get_or_create(
+                product_data, self.warehouse, self.language, self.transport
+            )
+            for product_data in self._iter_product_data(data)
+        ]
+
+    def _iter_product_data(self, data: dict):
+        # Raw data of every product in every subcategory.
+        subcategories = data.get("categories", [])
 
         for subcategory in subcategories:
             products = subcategory.get("products", None)
 
-            for product_data in products:
-                product = Product(product_data, self.warehouse, self.language)
-                category_products.append(product)
-
-        return category_products
+            yield from products
 
     @lazy_load_property
     def name(self):
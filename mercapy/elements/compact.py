@@ -0,0 +1,142 @@
+from dataclasses import dataclass, field
+
+from .fields import *
+from .photo import Photo
+from ..utils.urls import get_file_path
+
+
+@dataclass(slots=True)
+class CompactProduct:
+    """
+    Memory-efficient, read-only snapshot of a product. Every field is decoded once when it is created, and the raw API data is only kept if asked to.
+    Fields that need the product's details (e.g. ean, description) are only filled if the data it was created from included them.
+
+    Args:
+        id (str): Product identifier.
+        warehouse (str): Warehouse the product belongs to.
+        language (str): Language of the product's texts.
+        raw (dict, optional): The API data the product was created from, if kept.
+        listed_in (list[str]): Identifiers of the categories the product was listed in by the catalog crawl it comes from, if any.
+    """
+
+    id: str
+    warehouse: str = "mad1"
+    language: str = field(default="es", repr=False)
+    name: str | None = None
+    slug: str | None = field(default=None, repr=False)
+    brand: str | None = None
+    unit_price: float | None = None
+    bulk_price: float | None = field(default=None, repr=False)
+    previous_price: float | None = field(default=None, repr=False)
+    is_discounted: bool | None = field(default=None, repr=False)
+    iva: int | None = field(default=None, repr=False)
+    age_check: bool = field(default=False, repr=False)
+    is_new: bool = field(default=False, repr=False)
+    is_pack: bool = field(default=False, repr=False)
+    pack_size: int | None = field(default=None, repr=False)
+    total_units: int | None = field(default=None, repr=False)
+    minimum_amount: int = field(default=1, repr=False)
+    weight: float | None = field(default=None, repr=False)
+    category: str | None = field(default=None, repr=False)
+    category_id: str | None = field(default=None, repr=False)
+    ean: str | None = field(default=None, repr=False)
+    legal_name: str | None = field(default=None, repr=False)
+    description: str | None = field(default=None, repr=False)
+    origin: str | None = field(default=None, repr=False)
+    supplier: str | None = field(default=None, repr=False)
+    alcohol_by_volume: float | None = field(default=None, repr=False)
+    photo_urls: tuple[str, ...] = field(default=(), repr=False)
+    raw: dict | None = field(default=None, repr=False, compare=False)
+    listed_in: list[str] = field(default_factory=list, repr=False, compare=False)
+
+    @classmethod
+    def from_data(
+        cls,
+        data: dict,
+        warehouse: str = "mad1",
+        language: str = "es",
+        keep_raw: bool = False,
+    ) -> "CompactProduct":
+        """
+        Decodes a product from its data as returned by the API, in a single pass.
+
+        Args:
+            data (dict): The product's data.
+            warehouse (str): Warehouse the product belongs to. Defaults to "mad1".
+            language (str): Language of the product's texts. Defaults to "es".
+            keep_raw (bool): Keep the data in `raw`. Defaults to False.
+
+        Returns:
+            CompactProduct: The decoded product.
+        """
+        category = decode_category(data) or {}
+        has_details = bool(data.get("details"))
+
+        return cls(
+            id=str(data.get("id")),
+            warehouse=warehouse,
+            language=language,
+            name=decode_name(data),
+            slug=decode_slug(data),
+            brand=decode_brand(data),
+            unit_price=decode_unit_price(data),
+            bulk_price=decode_bulk_price(data),
+            previous_price=decode_previous_price(data),
+            is_discounted=decode_is_discounted(data),
+            iva=decode_iva(data),
+            age_check=decode_age_check(data),
+            is_new=decode_is_new(data),
+            is_pack=decode_is_pack(data),
+            pack_size=decode_pack_size(data),
+            total_units=decode_total_units(data),
+            minimum_amount=decode_minimum_amount(data),
+            weight=decode_weight(data),
+            category=category.get("name"),
+            category_id=str(category["id"]) if "id" in category else None,
+            ean=decode_ean(data),
+            legal_name=decode_legal_name(data),
+            description=decode_description(data) if has_details else None,
+            origin=decode_origin(data),
+            supplier=decode_supplier(data),
+            alcohol_by_volume=decode_alcohol_by_volume(data),
+            photo_urls=tuple(decode_photos(data)),
+            raw=data if keep_raw else None,
+        )
+
+    @property
+    def photos(self) -> list[Photo]:
+        """
+        Returns the list of photos for the product.
+        """
+        return [Photo(get_file_path(url)) for url in self.photo_urls]
+
+    def to_dict(self) -> dict:
+        """
+        Converts the product to a dictionary with the same keys as `Product.__dict__()`.
+        """
+        return {
+            "id": self.id,
+            "warehouse": self.warehouse,
+            "language": self.language,
+            "ean": self.ean,
+            "name": self.name,
+            "slug": self.slug,
+            "legal_name": self.legal_name,
+            "unit_price": self.unit_price,
+            "bulk_price": self.bulk_price,
+            "is_discounted": self.is_discounted,
+            "previous_price": self.previous_price,
+            "iva": self.iva,
+            "age_check": self.age_check,
+            "alcohol_by_volume": self.alcohol_by_volume,
+            "is_new": self.is_new,
+            "is_pack": self.is_pack,
+            "pack_size": self.pack_size,
+            "description": self.description,
+            "minimum_amount": self.minimum_amount,
+            "weight": self.weight,
+            "brand": self.brand,
+            "origin": self.origin,
+            "supplier": self.supplier,
+            "category": self.category,
+        }
@@ -0,0 +1,199 @@
+# Decoders reading each product field straight from the product's data as
+# returned by the API. Product properties and CompactProduct share them, so every
+# representation of a product agrees on its values.
+
+# Properties that are only available once the product's details are fetched from
+# /api/products/{id}/. The rest come along in every listing (categories, search,
+# home, seasons).
+DETAIL_FIELDS = frozenset(
+    {
+        "ean",
+        "legal_name",
+        "previous_price",
+        "alcohol_by_volume",
+        "photos",
+        "description",
+        "origin",
+        "supplier",
+    }
+)
+
+
+def _price_instructions(data: dict) -> dict:
+    return data.get("price_instructions") or {}
+
+
+def _details(data: dict) -> dict:
+    return data.get("details") or {}
+
+
+def _to_float(value) -> float | None:
+    return None if value is None else float(value)
+
+
+def decode_ean(data: dict) -> str | None:
+    return data.get("ean")
+
+
+def decode_name(data: dict) -> str | None:
+    return data.get("display_name")
+
+
+def decode_slug(data: dict) -> str | None:
+    return data.get("slug")
+
+
+def decode_legal_name(data: dict) -> str | None:
+    return _details(data).get("legal_name", None)
+
+
+def decode_unit_price(data: dict) -> float | None:
+    return _to_float(_price_instructions(data).get("unit_price"))
+
+
+def decode_bulk_price(data: dict) -> float | None:
+    return _to_float(_price_instructions(data).get("bulk_price", None))
+
+
+def decode_is_discounted(data: dict) -> bool | None:
+    return _price_instructions(data).get("price_decreased")
+
+
+def decode_previous_price(data: dict) -> float | None:
+    return _price_instructions(data).get("previous_unit_price")
+
+
+def decode_iva(data: dict) -> int | None:
+    return _price_instructions(data).get("iva")
+
+
+def decode_age_check(data: dict) -> bool:
+    return (data.get("badges") or {}).get("requires_age_check", False)
+
+
+def decode_alcohol_by_volume(data: dict) -> float | None:
+    percentage = _details(data).get("alcohol_by_volume")
+
+    if percentage:
+        return float(percentage.removesuffix("º"))
+
+
+def decode_is_new(data: dict) -> bool:
+    return _price_instructions(data).get("is_new", False)
+
+
+def decode_is_pack(data: dict) -> bool:
+    return _price_instructions(data).get("is_pack", False)
+
+
+def decode_pack_size(data: dict) -> int | None:
+    if not decode_is_pack(data):
+        return None
+
+    return _price_instructions(data).get("pack_size", None)
+
+
+def decode_total_units(data: dict) -> int | None:
+    if not decode_is_pack(data):
+        return None
+
+    return _price_instructions(data).get("total_units", None)
+
+
+def decode_photos(data: dict) -> list[str]:
+    # Photo URLs; Product wraps them in Photo objects.
+    return [p.get("regular") for p in data.get("photos", [])]
+
+
+def decode_description(data: dict) -> str:
+    return _details(data).get("description", "")
+
+
+def decode_minimum_amount(data: dict) -> int:
+    return int(_price_instructions(data).get("min_bunch_amount", 1))
+
+
+def decode_weight(data: dict) -> float | None:
+    return _price_instructions(data).get("unit_size")
+
+
+def decode_brand(data: dict) -> str | None:
+    return data.get("brand")
+
+
+def decode_origin(data: dict) -> str | None:
+    return _details(data).get("origin", None)
+
+
+def decode_supplier(data: dict) -> str | None:
+    suppliers = _details(data).get("suppliers", [])
+
+    if suppliers:
+        return suppliers[0]["name"]
+
+
+def decode_category(data: dict) -> dict | None:
+    # Data of the product's first level 1 category; Product wraps it in a
+    # Category object.
+    categories = data.get("categories") or []
+    if not categories:
+        return None
+
+    subcategories = categories[0].get("categories") or []
+    return subcategories[0] if subcategories else None
+
+
+DECODERS = {
+    "ean": decode_ean,
+    "name": decode_name,
+    "slug": decode_slug,
+    "legal_name": decode_legal_name,
+    "unit_price": decode_unit_price,
+    "bulk_price": decode_bulk_price,
+    "is_discounted": decode_is_discounted,
+    "previous_price": decode_previous_price,
+    "iva": decode_iva,
+    "age_check": decode_age_check,
+    "alcohol_by_volume": decode_alcohol_by_volume,
+    "is_new": decode_is_new,
+    "is_pack": decode_is_pack,
+    "pack_size": decode_pack_size,
+    "total_units": decode_total_units,
+    "photos": decode_photos,
+    "description": decode_description,
+    "minimum_amount": decode_minimum_amount,
+    "weight": decode_weight,
+    "brand": decode_brand,
+    "origin": decode_origin,
+    "supplier": decode_supplier,
+    "category": decode_category,
+}
+
+FIELDS = frozenset(DECODERS)
+
+
+def check_fields(fields: list[str] = None) -> list[str]:
+    """
+    Validates a list of product fields.
+
+    Args:
+        fields (list[str], optional): Product fields (e.g. ["name", "unit_price"]). Defaults to every field.
+
+    Returns:
+        list[str]: The fields, in order and without repetitions.
+    """
+    if fields is None:
+        return list(DECODERS)
+
+    unknown = set(fields) - FIELDS
+    if unknown:
+        raise ValueError(f"Unknown product fields: {', '.join(sorted(unknown))}")
+
+    return list(dict.fromkeys(fields))
+
+
+def needs_details(fields: list[str]) -> bool:
+    """
+    Whether reading any of the given fields requires fetching the product's details from /api/products/{id}/.
+    """
+    return bool(DETAIL_FIELDS.intersection(fields))
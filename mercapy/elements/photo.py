@@ -1,8 +1,48 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Literal
 import os, requests
 
 from ..utils.urls import *
+from ..utils.transport import Transport, get_default_transport
+
+# Bytes written to disk at a time when downloading photos.
+CHUNK_SIZE = 64 * 1024
+
+
+def stream_to_file(transport: Transport, url: str, path: str) -> int:
+    """
+    Downloads a URL to a file in chunks, without holding the whole body in memory. The body is written to a temporary ".part" file that is only renamed to `path` once complete, so an interrupted download never leaves a truncated file behind.
+
+    Args:
+        transport (Transport): Transport used to send the request.
+        url (str): The URL to download.
+        path (str): Path of the file.
+
+    Returns:
+        int: Bytes written.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    partial = f"{path}.part"
+    written = 0
+
+    with transport.get(url, stream=True) as response:
+        response.raise_for_status()
+
+        try:
+            with open(partial, "wb") as file:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    file.write(chunk)
+                    written += len(chunk)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+
+    os.replace(partial, path)
+    return written
 
 
 @dataclass
@@ -12,9 +52,11 @@ class Photo:
 
     Args:
         file_name (str): The file name corresponding to the image (e.g. "cea11c6ef934dff6c6a018df3b757b8d.jpg")
+        transport (Transport, optional): Transport used to download the photo. Defaults to the shared default transport.
     """
 
     file_name: str
+    transport: Transport = field(default=None, repr=False, compare=False)
 
     def __post_init__(self):
         if is_url(self.file_name):
@@ -40,7 +82,7 @@ class Photo:
 
     def save(self, path: str, width: int = None, height: int = None, fit_mode="crop"):
         """
-        Downloads and saves the photo to a specified path.
+        Downloads and saves the photo to a specified path, streaming it to disk in chunks.
 
         Args:
             path (str): Path where the photo will be saved.
@@ -52,15 +94,7 @@ class Photo:
             self.get_size(width, height, fit_mode) if width and height else self.url
         )
         try:
-            response = requests.get(photo_url)
-            response.raise_for_status()
-
-            # Ensure the directory exists
-            directory = os.path.dirname(path)
-            if directory:
-                os.makedirs(directory, exist_ok=True)
-
-            with open(path, "wb") as file:
-                file.write(response.content)
+            transport = self.transport or get_default_transport()
+            stream_to_file(transport, photo_url, path)
         except requests.exceptions.RequestException as e:
             print(f"Failed to download the photo: {e}")
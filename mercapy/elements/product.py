@@ -4,13 +4,15 @@ from .base import MercadonaItem, lazy_load_property
 from .category import Category
 from ..constants import *
 from ..utils.urls import get_file_path
+from ..utils.transport import Transport
 from .photo import Photo
+from .fields import *
+from .compact import CompactProduct
 
 
 def require_complete_data(func):
     def wrapper(self):
-        if self._is_data_incomplete():
-            self._fetch_data()
+        self._ensure_data(complete=True)
         if self.not_found():
             return None
 
@@ -26,13 +28,18 @@ class Product(MercadonaItem):
         id: str | dict,
         warehouse: str = "mad1",
         language: Literal["es", "en"] = "es",
+        transport: Transport = None,
     ):
         if isinstance(id, dict):
             endpoint = f"/api/products/{id.get("id")}/"
         else:
             endpoint = f"/api/products/{id}/"
 
-        super().__init__(id, endpoint, warehouse, language)
+        super().__init__(id, endpoint, warehouse, language, transport)
+
+        # Identifiers of the categories the product was listed in by the last
+        # catalog crawl (see `Mercadona.get_catalog`).
+        self.listed_in = []
 
     def _is_data_incomplete(self):
         if self._data is None:
@@ -41,27 +48,44 @@ class Product(MercadonaItem):
         details = self._data.get("details", {})
         return not details
 
+    def compact(self, keep_raw: bool = False) -> CompactProduct | None:
+        """
+        Returns a memory-efficient snapshot of the product, with every field decoded once. Details are only included if they have already been fetched.
+
+        Args:
+            keep_raw (bool): Keep the product's API data in the snapshot. Defaults to False.
+
+        Returns:
+            CompactProduct: The snapshot, or None if the product wasn't found.
+        """
+        if self.not_found():
+            return None
+
+        return CompactProduct.from_data(
+            self._data, self.warehouse, self.language, keep_raw
+        )
+
     @lazy_load_property
     @require_complete_data
     def ean(self) -> str:
         """
         Returns the European Article Number (EAN) for the product.
         """
-        return self._data.get("ean")
+        return decode_ean(self._data)
 
     @lazy_load_property
     def name(self) -> str:
         """
         Returns the display name of the product.
         """
-        return self._data.get("display_name")
+        return decode_name(self._data)
 
     @lazy_load_property
     def slug(self) -> str:
         """
         Returns the slug (URL-friendly version of the name) for the product.
         """
-        return self._data.get("slug")
+        return decode_slug(self._data)
 
     @lazy_load_property
     @require_complete_data
@@ -69,15 +93,14 @@ class Product(MercadonaItem):
         """
         Returns the legal name of the product.
         """
-        details = self._data.get("details", {})
-        return details.get("legal_name", None)
+        return decode_legal_name(self._data)
 
     @lazy_load_property
     def unit_price(self) -> float | None:
         """
         Returns the unit price of the product.
         """
-        return float(self._data.get("price_instructions", {}).get("unit_price"))
+        return decode_unit_price(self._data)
 
     @lazy_load_property
     def bulk_price(self) -> float | None:
@@ -87,14 +110,14 @@ class Product(MercadonaItem):
         Returns:
             float: The bulk price as a float, or None if not available.
         """
-        return float(self._data.get("price_instructions", {}).get("bulk_price", None))
+        return decode_bulk_price(self._data)
 
     @lazy_load_property
     def is_discounted(self) -> bool:
         """
         Checks if the product is currently discounted.
         """
-        return self._data.get("price_instructions", {}).get("price_decreased")
+        return decode_is_discounted(self._data)
 
     @lazy_load_property
     @require_complete_data
@@ -102,21 +125,21 @@ class Product(MercadonaItem):
         """
         Returns the previous unit price before any discounts.
         """
-        return self._data.get("price_instructions", {}).get("previous_unit_price")
+        return decode_previous_price(self._data)
 
     @lazy_load_property
     def iva(self) -> int:
         """
         Returns the tax rate (IVA) applied to the product.
         """
-        return self._data.get("price_instructions", {}).get("iva")
+        return decode_iva(self._data)
 
     @lazy_load_property
     def age_check(self) -> bool:
         """
         Checks if the product requires an age check.
         """
-        return self._data.get("badges", {}).get("requires_age_check", False)
+        return decode_age_check(self._data)
 
     @lazy_load_property
     @require_complete_data
@@ -124,45 +147,35 @@ class Product(MercadonaItem):
         """
         Returns the alcohol by volume percentage of the product.
         """
-        details = self._data.get("details", {})
-        percentage = details.get("alcohol_by_volume")
-
-        if percentage:
-            return float(percentage.removesuffix("º"))
+        return decode_alcohol_by_volume(self._data)
 
     @lazy_load_property
     def is_new(self) -> bool:
         """
         Checks if the product is new.
         """
-        return self._data.get("price_instructions", {}).get("is_new", False)
+        return decode_is_new(self._data)
 
     @lazy_load_property
     def is_pack(self) -> bool:
         """
         Checks if the product is sold as a pack.
         """
-        return self._data.get("price_instructions", {}).get("is_pack", False)
+        return decode_is_pack(self._data)
 
     @lazy_load_property
     def pack_size(self) -> int | None:
         """
         Returns the pack size of the product, if applicable.
         """
-        if not self.is_pack:
-            return None
-
-        return self._data.get("price_instructions", {}).get("pack_size",  None)
+        return decode_pack_size(self._data)
 
     @lazy_load_property
     def total_units(self) -> int | None:
         """
         Returns the total units in the pack, if applicable.
         """
-        if not self.is_pack:
-            return None
-        
-        return self._data.get("price_instructions", {}).get("total_units", None)
+        return decode_total_units(self._data)
 
     @lazy_load_property
     @require_complete_data
@@ -170,8 +183,11 @@ class Product(MercadonaItem):
         """
         Returns the list of photos for the product.
         """
-        photos = self._data.get("photos", [])
-        return [Photo(get_file_path(p.get("regular"))) for p in photos]
+        # Photos are downloaded synchronously, so they can't use an async transport.
+        transport = self.transport if isinstance(self.transport, Transport) else None
+        return [
+            Photo(get_file_path(url), transport) for url in decode_photos(self._data)
+        ]
 
     @lazy_load_property
     @require_complete_data
@@ -179,29 +195,28 @@ class Product(MercadonaItem):
         """
         Returns the description of the product.
         """
-        details = self._data.get("details", {})
-        return details.get("description", "")
+        return decode_description(self._data)
 
     @lazy_load_property
     def minimum_amount(self) -> int:
         """
         Returns the minimum amount that can be purchased.
         """
-        return int(self._data.get("price_instructions", {}).get("min_bunch_amount", 1))
+        return decode_minimum_amount(self._data)
 
     @lazy_load_property
     def weight(self) -> float:
         """
         Returns the weight of the product.
         """
-        return self._data.get("price_instructions", {}).get("unit_size")
+        return decode_weight(self._data)
 
     @lazy_load_property
     def brand(self) -> str:
         """
         Returns the brand of the product.
         """
-        return self._data.get("brand")
+        return decode_brand(self._data)
 
     @lazy_load_property
     @require_complete_data
@@ -209,8 +224,7 @@ class Product(MercadonaItem):
         """
         Returns the origin of the product.
         """
-        details = self._data.get("details", {})
-        return details.get("origin", None)
+        return decode_origin(self._data)
 
     @lazy_load_property
     @require_complete_data
@@ -218,23 +232,21 @@ class Product(MercadonaItem):
         """
         Returns the main supplier of the product.
         """
-        details = self._data.get("details", {})
-        suppliers = details.get("suppliers", [])
-
-        if suppliers:
-            return suppliers[0]["name"]
+        return decode_supplier(self._data)
 
     @lazy_load_property
     def category(self) -> list[str]:
         """
         Returns the category of the product.
         """
-        high_level_category = self._data.get("categories", [])[0]
-        category_data = high_level_category.get("categories", [])[0]
-        
-        category = Category(category_data, self.warehouse, self.language)
-        return category
-    
+        category_data = decode_category(self._data)
+        if category_data is None:
+            return None
+
+        return Category.get_or_create(
+            category_data, self.warehouse, self.language, self.transport
+        )
+
     @require_complete_data
     def __dict__(self) -> dict | None:
         """
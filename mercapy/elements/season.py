@@ -1,6 +1,7 @@
 from typing import Literal
 
 from .base import MercadonaItem, lazy_load_property
+from ..utils.transport import Transport
 from .product import Product
 
 
@@ -10,13 +11,14 @@ class Season(MercadonaItem):
         id: str | dict,
         warehouse: str,
         language: Literal["es", "en"] = "es",
+        transport: Transport = None,
     ):
         if isinstance(id, dict):
             endpoint = f"/api/home/seasons/{id.get("id")}/"
         else:
             endpoint = f"/api/home/seasons/{id}/"
         
-        super().__init__(id, endpoint, warehouse, language)
+        super().__init__(id, endpoint, warehouse, language, transport)
 
     @lazy_load_property
     def title(self) -> str:
@@ -25,4 +27,7 @@ class Season(MercadonaItem):
     @lazy_load_property
     def products(self) -> list[Product]:
         items = self._data.get("items", [])
-        return [Product(i, self.warehouse, self.language) for i in items]
+        return [
+            Product.get_or_create(i, self.warehouse, self.language, self.transport)
+            for i in items
+        ]
@@ -0,0 +1,179 @@
+from collections.abc import Iterable
+from typing import Literal
+import csv, json
+
+from .elements.fields import DECODERS, check_fields
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Type of every exported field, used to build the Parquet schema.
+FIELD_TYPES = {
+    "ean": str,
+    "name": str,
+    "slug": str,
+    "legal_name": str,
+    "unit_price": float,
+    "bulk_price": float,
+    "is_discounted": bool,
+    "previous_price": float,
+    "iva": int,
+    "age_check": bool,
+    "alcohol_by_volume": float,
+    "is_new": bool,
+    "is_pack": bool,
+    "pack_size": int,
+    "total_units": int,
+    "photos": list,
+    "description": str,
+    "minimum_amount": int,
+    "weight": float,
+    "brand": str,
+    "origin": str,
+    "supplier": str,
+    "category": str,
+}
+
+FORMATS = ("jsonl", "csv", "parquet")
+
+
+def decode_row(data: dict, fields: list[str]) -> dict:
+    """
+    Decodes the exported fields of a product straight from its API data.
+
+    Args:
+        data (dict): The product's data as returned by the API.
+        fields (list[str]): Fields to decode.
+
+    Returns:
+        dict: The product's id and every field. The category is exported by name and photos as a list of URLs.
+    """
+    row = {"id": data.get("id")}
+
+    for field in fields:
+        value = DECODERS[field](data)
+        if field == "category":
+            value = value.get("name") if value else None
+        row[field] = value
+
+    return row
+
+
+class _JSONLinesWriter:
+    def __init__(self, path: str, fields: list[str]) -> None:
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write(self, rows: list[dict]) -> None:
+        self.file.writelines(
+            json.dumps(row, ensure_ascii=False) + "\n" for row in rows
+        )
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class _CSVWriter:
+    def __init__(self, path: str, fields: list[str]) -> None:
+        self.file = open(path, "w", encoding="utf-8", newline="")
+        self.writer = csv.DictWriter(self.file, ["id", *fields])
+        self.writer.writeheader()
+
+    def write(self, rows: list[dict]) -> None:
+        for row in rows:
+            # Lists (photos) are written as space separated values.
+            self.writer.writerow(
+                {k: " ".join(v) if isinstance(v, list) else v for k, v in row.items()}
+            )
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class _ParquetWriter:
+    def __init__(self, path: str, fields: list[str]) -> None:
+        if pyarrow is None:
+            raise ImportError(
+                "Parquet export requires pyarrow. Install it with `pip install mercapy[parquet]`."
+            )
+
+        types = {
+            str: pyarrow.string(),
+            float: pyarrow.float64(),
+            int: pyarrow.int64(),
+            bool: pyarrow.bool_(),
+            list: pyarrow.list_(pyarrow.string()),
+        }
+        self.fields = fields
+        self.schema = pyarrow.schema(
+            [("id", pyarrow.string())]
+            + [(f, types[FIELD_TYPES[f]]) for f in fields]
+        )
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+
+    def write(self, rows: list[dict]) -> None:
+        columns = {"id": [str(row["id"]) for row in rows]}
+        for field in self.fields:
+            cast = FIELD_TYPES[field]
+            columns[field] = [_cast(row[field], cast) for row in rows]
+
+        self.writer.write_table(pyarrow.table(columns, schema=self.schema))
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+def _cast(value, cast):
+    # The API isn't consistent about types (e.g. prices come as strings), but
+    # Parquet columns are typed.
+    if value is None or cast is list:
+        return value
+
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return None
+
+
+WRITERS = {
+    "jsonl": _JSONLinesWriter,
+    "csv": _CSVWriter,
+    "parquet": _ParquetWriter,
+}
+
+
+def export_rows(
+    batches: Iterable[list[dict]],
+    path: str,
+    format: Literal["jsonl", "csv", "parquet"] = "jsonl",
+    fields: list[str] = None,
+) -> int:
+    """
+    Writes batches of decoded products (see `decode_row`) to a file, one batch at a time.
+
+    Args:
+        batches (Iterable[list[dict]]): Batches of rows.
+        path (str): Path of the file.
+        format (str): "jsonl", "csv" or "parquet" (requires pyarrow). Defaults to "jsonl".
+        fields (list[str], optional): Fields of every row, besides the id. Defaults to every field.
+
+    Returns:
+        int: Number of rows written.
+    """
+    if format not in WRITERS:
+        raise ValueError(f"Unknown format {format!r}, expected one of {FORMATS}")
+
+    writer = WRITERS[format](path, check_fields(fields))
+    written = 0
+
+    try:
+        for rows in batches:
+            if rows:
+                writer.write(rows)
+                written += len(rows)
+    finally:
+        writer.close()
+
+    return written
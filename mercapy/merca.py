@@ -1,18 +1,245 @@
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from typing import Literal
 from urllib.parse import urljoin
+import requests
 
 from .constants import WAREHOUSES
 from .utils.warehouses import get_warehouse_code
 from .utils.api import *
-from .elements import Product, Season, Category
+from .utils.transport import Transport
+from .utils.instrumentation import RequestEvent
+from .elements import Product, Season, Category, CompactProduct, ItemError
+from .elements.base import MercadonaItem
+from .elements.fields import check_fields, needs_details
+from .search import LocalIndex
+from .downloads import DownloadReport, download_photos
+from .export import decode_row, export_rows
+from .planner import FetchPlan, PRODUCTS_PER_CATEGORY
+from .tree import CategoryTree
 
 
-class Mercadona:
+class Catalog(list):
+    def __init__(self, products: list = (), duplicates: int = 0) -> None:
+        """
+        Products returned by `Mercadona.get_catalog()`. Behaves as a list with one entry per product, even if it is listed in several categories.
+
+        Args:
+            products (list): The products.
+            duplicates (int): Listings merged into a product that had already been listed in another category.
+        """
+        super().__init__(products)
+        self.duplicates = duplicates
+
+
+class _ClientMixin:
+    # Parsing helpers and stats shared by Mercadona and AsyncMercadona. They only
+    # build items from responses already received, so they never send requests.
+    # Expects `warehouse`, `language`, `transport` and `local_index` attributes.
+
+    def _search_local(self, query: str, limit: int, page: int) -> list[Product]:
+        if self.local_index is None:
+            raise ValueError(
+                "No local index: build one with build_local_index() or pass local_index."
+            )
+
+        results = self.local_index.search(query, limit, page * limit)
+        return [
+            Product.get_or_create(data, self.warehouse, self.language, self.transport)
+            for data, _ in results
+        ]
+
+    def _parse_search(self, response: dict) -> list[Product]:
+        hits = (response or {}).get("hits", [])
+
+        products = []
+        for h in hits:
+            # Hits carry the same fields as any other product listing, plus
+            # Algolia's own metadata (e.g. "_highlightResult").
+            data = {k: v for k, v in h.items() if not k.startswith("_")}
+
+            product = Product.get_or_create(
+                data, self.warehouse, self.language, self.transport
+            )
+            products.append(product)
+
+        return products
+
+    def _parse_home_recommendations(self, response: dict) -> dict:
+        sections = response.get("sections", [])
+
+        # Dictionary to store products grouped by sections
+        section_products = {}
+
+        for section in sections:
+            section_name = section.get("layout")
+
+            items = section.get("content", {}).get("items", [])
+
+            for item in items:
+                if item.get("bg_colors", None):
+                    parsed_item = Season.get_or_create(
+                        str(item["id"]), self.warehouse, self.language, self.transport
+                    )
+                else:
+                    parsed_item = Product.get_or_create(
+                        item, self.warehouse, self.language, self.transport
+                    )
+
+                if section_products.get(section_name, None):
+                    section_products[section_name].append(parsed_item)
+                else:
+                    section_products[section_name] = [parsed_item]
+
+        return section_products
+
+    def _parse_new_arrivals(self, response: dict) -> list[Product]:
+        products = []
+        for item in response.get("items", []):
+            product = Product.get_or_create(
+                item, self.warehouse, self.language, self.transport
+            )
+            products.append(product)
+
+        return products
+
+    def _parse_categories(self, response: dict) -> list[Category]:
+        # Get all level 1 categories
+        lvl1_categories = []
+
+        results = response.get("results", [])
+        for result in results:
+            categories = result.get("categories", [])
+            for c in categories:
+                category = Category.get_or_create(
+                    c, self.warehouse, self.language, self.transport
+                )
+                lvl1_categories.append(category)
+
+        return lvl1_categories
+
+    def _batch_queries(self, queries: list[str], batch_size: int) -> list[list[str]]:
+        # Splits the queries, without repeats, in batches of `batch_size`.
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+
+        unique_queries = list(dict.fromkeys(queries))
+        return [
+            unique_queries[i : i + batch_size]
+            for i in range(0, len(unique_queries), batch_size)
+        ]
+
+    def _parse_batches(
+        self, batches: list[list[str]], responses: list[list[dict] | None]
+    ) -> dict[str, list[Product]]:
+        # Maps every query to its products. A failed batch, or one answered with
+        # fewer results than queries, leaves the missing queries without results.
+        searches = {}
+        for batch, results in zip(batches, responses):
+            results = (results or [])[: len(batch)]
+            results += [None] * (len(batch) - len(results))
+
+            for query, result in zip(batch, results):
+                searches[query] = self._parse_search(result)
+
+        return searches
+
+    def _iter_listings(
+        self,
+        pairs: Iterator[tuple[Category, dict]],
+        unique: bool = True,
+        catalog: Catalog = None,
+        memberships: dict = None,
+    ) -> Iterator[tuple[dict, list[str]]]:
+        # Yields the raw data of every product listed in the categories with the
+        # ids of the categories it is listed in. With `unique`, every product is
+        # only yielded the first time it is listed; the list of categories it was
+        # yielded with keeps growing as it is found in later categories, and every
+        # merged listing is counted in `catalog.duplicates`. Passing the same
+        # `memberships` to several calls deduplicates across them.
+        memberships = {} if memberships is None else memberships
+
+        for category, data in pairs:
+            for product_data in category._iter_product_data(data):
+                id = str(product_data.get("id"))
+                listed_in = memberships.get(id) if unique else None
+
+                if listed_in is not None:
+                    if category.id not in listed_in:
+                        listed_in.append(category.id)
+                    if catalog is not None:
+                        catalog.duplicates += 1
+                    continue
+
+                listed_in = [category.id]
+                if unique:
+                    memberships[id] = listed_in
+
+                yield product_data, listed_in
+
+    def _listed_product(
+        self, product_data: dict, listed_in: list[str], compact: bool = False
+    ) -> Product | CompactProduct:
+        if compact:
+            product = CompactProduct.from_data(
+                product_data, self.warehouse, self.language
+            )
+        else:
+            product = Product.get_or_create(
+                product_data, self.warehouse, self.language, self.transport
+            )
+
+        product.listed_in = listed_in
+        return product
+
+    def _plan_catalog(self, fields: list[str], categories: list[Category]) -> FetchPlan:
+        details = needs_details(fields)
+        pending = [c for c in categories if c._is_data_incomplete()]
+
+        detail_requests = 0
+        if details:
+            fetched = [c for c in categories if not c._is_data_incomplete()]
+            products = {p.id: p for c in fetched for p in c.products}
+            detail_requests = sum(p._is_data_incomplete() for p in products.values())
+
+            if pending:
+                per_category = (
+                    len(products) / len(fetched) if products else PRODUCTS_PER_CATEGORY
+                )
+                detail_requests += round(per_category * len(pending))
+
+        return FetchPlan(
+            fields, details, 1 + len(pending), detail_requests, details and bool(pending)
+        )
+
+    def on_request(self, hook: Callable[[RequestEvent], None]) -> None:
+        """
+        Registers a function called after every request sent by this instance, and every response served from the cache.
+
+        Args:
+            hook (Callable): Function called with a RequestEvent holding the endpoint, status, latency, response size, retries, backoff and whether the cache was hit.
+        """
+        self.transport.instrumentation.add_hook(hook)
+
+    def stats(self) -> dict:
+        """
+        Returns request stats aggregated since this instance's transport was created.
+
+        Returns:
+            dict: A "total" entry and an entry per endpoint template in "endpoints" (e.g. "/api/categories/{id}/"), each with the number of requests, errors, cache hits and retries, the bytes received, the seconds spent waiting for responses, in backoff and held back by the rate limiter, and the p50, p95 and p99 latencies in milliseconds.
+        """
+        return self.transport.instrumentation.stats()
+
+
+class Mercadona(_ClientMixin):
 
     def __init__(
         self,
         postcode: str,
         language: Literal["es", "en"] = "es",
+        transport: Transport = None,
+        local_index: LocalIndex = None,
     ) -> None:
         """
         Represents a Mercadona warehouse, from where their catalog can browsed.
@@ -21,72 +248,226 @@ class Mercadona:
         Args:
             postcode (str): The postcode from where products are being accessed. From there, the closest warehouse will be found. Warehouse codes are accepted too (e.g. "mad1", "vlc1", etc.)
             language (str): The language of the information recieved. Defaults to "es": Spanish. Can also be "en": English.
+            transport (Transport, optional): The transport every request is sent through. Defaults to a new pooled transport owned by this instance.
+            local_index (LocalIndex, optional): Offline index used by `search(backend="local")`. Can also be built later with `build_local_index`.
         """
         self.language = language
+        self.transport = transport or Transport()
+        self.local_index = local_index
 
         if postcode in WAREHOUSES:
             self.postcode = postcode
             self.warehouse = self.postcode
         else:
             self.postcode = postcode
-            self.warehouse = get_warehouse_code(self.postcode)
+            self.warehouse = get_warehouse_code(self.postcode, self.transport)
 
     def _get_with_context(self, url: str):
-        return fetch_json(url, {"lang": self.language, "wh": self.warehouse})
+        return fetch_json(
+            url, {"lang": self.language, "wh": self.warehouse}, self.transport
+        )
+
+    def get_product(self, id: str) -> Product:
+        """
+        Returns a product of this warehouse. If the transport has an identity map, every call with the same id returns the same instance.
+
+        Args:
+            id (str): Product identifier.
+
+        Returns:
+            Product: The product, fetched lazily.
+        """
+        return Product.get_or_create(id, self.warehouse, self.language, self.transport)
 
-    def search(self, query: str) -> list[Product]:
+    def get_products(
+        self, ids: list[str], fields: list[str] = None, concurrency: int = 8
+    ) -> list[Product | ItemError]:
         """
-        Queries Mercadona's products using their provider "Algolia".
+        Fetches many products at once. Repeated ids are only fetched once, and up to `concurrency` products are fetched in parallel.
+
+        Args:
+            ids (list[str]): Product identifiers.
+            fields (list[str], optional): Product properties that will be read (e.g. ["name", "unit_price"]). Products already holding the data these need aren't fetched again. Defaults to every property.
+            concurrency (int): Number of products fetched in parallel. Defaults to 8.
+
+        Returns:
+            list[Product | ItemError]: One result per id, in input order: the hydrated product, or an ItemError if it couldn't be fetched.
+        """
+        details = needs_details(check_fields(fields))
+
+        unique_ids = list(dict.fromkeys(str(i) for i in ids))
+        products = [self.get_product(i) for i in unique_ids]
+        pending = [
+            p
+            for p in products
+            if p._is_empty() or (details and p._is_data_incomplete())
+        ]
+
+        def fetch(product: Product) -> ItemError | None:
+            try:
+                product._ensure_data(complete=details, report_errors=False)
+            except requests.exceptions.RequestException as e:
+                return ItemError(product.id, None, str(e))
+
+            err_code = product._data.get("err_code")
+            if err_code:
+                message = str(product._data.get("err_message"))
+                return ItemError(product.id, err_code, message)
+
+        errors = {e.id: e for e in self._map(fetch, pending, concurrency) if e}
+
+        results = {p.id: errors.get(p.id, p) for p in products}
+        return [results[str(i)] for i in ids]
+
+    def get_category(self, id: str) -> Category:
+        """
+        Returns a category of this warehouse. If the transport has an identity map, every call with the same id returns the same instance.
+
+        Args:
+            id (str): Category identifier.
+
+        Returns:
+            Category: The category, fetched lazily.
+        """
+        return Category.get_or_create(id, self.warehouse, self.language, self.transport)
+
+    def search(
+        self,
+        query: str,
+        hits_per_page: int = None,
+        page: int = None,
+        attributes: list[str] = None,
+        backend: Literal["algolia", "local"] = "algolia",
+    ) -> list[Product]:
+        """
+        Queries Mercadona's products using their provider "Algolia". Products are built from the search hits, so reading their name, prices or brand doesn't send any other request.
+        With `backend="local"` the query is answered by the local index instead, without any request.
 
         Args:
             query (str): Search query (e.g. Dish Soap).
-            lang (str): Language code. Defaults to spanish. Can be "en" too.
+            hits_per_page (int, optional): Number of products per page. Defaults to Algolia's default, or 20 for the local index.
+            page (int, optional): Page to retrieve, starting at 0. Defaults to the first page.
+            attributes (list[str], optional): Hit attributes to retrieve (e.g. ["display_name", "price_instructions"]). Only the properties backed by these attributes can be read from the products. Defaults to every attribute. Ignored by the local index.
+            backend (str): Either "algolia" or "local". Defaults to "algolia".
 
         Rerturns:
             list[Product]: List of products related to the search.
         """
-        response = query_algolia(query, self.warehouse, self.language)
-        hits = response.get("hits", [])
-
-        products = []
-        for h in hits:
-            product = Product(h["id"], self.warehouse, self.language)
-            products.append(product)
+        if backend == "local":
+            return self._search_local(query, hits_per_page or 20, page or 0)
+        elif backend != "algolia":
+            raise ValueError(f"Unknown search backend: {backend}")
 
-        return products
+        response = query_algolia(
+            query,
+            self.warehouse,
+            self.language,
+            self.transport,
+            hits_per_page,
+            page,
+            attributes,
+        )
+        return self._parse_search(response)
 
-    def get_home_recommendations(self) -> dict:
+    def build_local_index(
+        self, concurrency: int = None, path: str = None, details: bool = True
+    ) -> LocalIndex:
         """
-        Retrieves product recommendations for the home page grouped by sections.
+        Builds the offline index used by `search(backend="local")` from a crawl of the catalog.
+
+        Args:
+            concurrency (int, optional): Number of categories (and product details) fetched in parallel. Defaults to one at a time.
+            path (str, optional): If given, the index is also saved to this file, to be loaded later with `LocalIndex.load`.
+            details (bool): Fetch the details of every product, so their legal name and description are indexed too. Without them only the category endpoints are requested. Defaults to True.
 
         Returns:
-            dict: Dictionary where keys are layout names and values are lists of recommended products. The lists of products can also include banners which often are Season objects.
+            LocalIndex: The index, which is also kept in `local_index`.
         """
-        url = urljoin(API_URL, f"/api/home/")
-        response = self._get_with_context(url)
+        fields = ["legal_name", "description"] if details else None
+        catalog = self.get_catalog(concurrency, fields=fields)
+        self.local_index = LocalIndex.build(catalog, self.warehouse, self.language)
 
-        sections = response.get("sections", [])
+        if path:
+            self.local_index.save(path)
 
-        # Dictionary to store products grouped by sections
-        section_products = {}
+        return self.local_index
 
-        for section in sections:
-            section_name = section.get("layout")
+    def iter_search(
+        self, query: str, hits_per_page: int = None, attributes: list[str] = None
+    ) -> Iterator[Product]:
+        """
+        Yields every product matching a search, requesting the following page only once the current one has been consumed.
 
-            items = section.get("content", {}).get("items", [])
+        Args:
+            query (str): Search query (e.g. Dish Soap).
+            hits_per_page (int, optional): Number of products per page. Defaults to Algolia's default.
+            attributes (list[str], optional): Hit attributes to retrieve. Defaults to every attribute.
 
-            for item in items:
-                if item.get("bg_colors", None):
-                    parsed_item = Season(str(item["id"]), self.warehouse, self.language)
-                else:
-                    parsed_item = Product(item, self.warehouse, self.language)
+        Yields:
+            Product: Every product related to the search.
+        """
+        page = 0
+        while True:
+            response = query_algolia(
+                query,
+                self.warehouse,
+                self.language,
+                self.transport,
+                hits_per_page,
+                page,
+                attributes,
+            )
+            yield from self._parse_search(response)
 
-                if section_products.get(section_name, None):
-                    section_products[section_name].append(parsed_item)
-                else:
-                    section_products[section_name] = [parsed_item]
+            page += 1
+            if response is None or page >= response.get("nbPages", 0):
+                return
 
-        return section_products
+    def search_many(
+        self,
+        queries: list[str],
+        batch_size: int = 50,
+        concurrency: int = 4,
+        hits_per_page: int = None,
+        attributes: list[str] = None,
+    ) -> dict[str, list[Product]]:
+        """
+        Runs many searches at once. Queries are grouped in batches sent to Algolia's multi-query endpoint, and up to `concurrency` batches are sent in parallel.
+
+        Args:
+            queries (list[str]): Search queries.
+            batch_size (int): Number of queries sent in each request. Must be at least 1. Defaults to 50.
+            concurrency (int): Number of batches sent in parallel. Defaults to 4.
+            hits_per_page (int, optional): Number of products per query. Defaults to Algolia's default.
+            attributes (list[str], optional): Hit attributes to retrieve. Defaults to every attribute.
+
+        Returns:
+            dict[str, list[Product]]: Products related to each query. Queries whose batch failed, or that got no result, map to an empty list.
+        """
+        batches = self._batch_queries(queries, batch_size)
+
+        def send(batch: list[str]) -> list[dict] | None:
+            return query_algolia_batch(
+                batch,
+                self.warehouse,
+                self.language,
+                self.transport,
+                hits_per_page,
+                attributes,
+            )
+
+        return self._parse_batches(batches, self._map(send, batches, concurrency))
+
+    def get_home_recommendations(self) -> dict:
+        """
+        Retrieves product recommendations for the home page grouped by sections.
+
+        Returns:
+            dict: Dictionary where keys are layout names and values are lists of recommended products. The lists of products can also include banners which often are Season objects.
+        """
+        url = urljoin(API_URL, f"/api/home/")
+        response = self._get_with_context(url)
+        return self._parse_home_recommendations(response)
 
     def get_new_arrivals(self) -> list[Product]:
         """
@@ -100,29 +481,286 @@ class Mercadona:
         """
         url = urljoin(API_URL, f"/api/home/new-arrivals/")
         response = self._get_with_context(url)
-
-        products = []
-        for item in response.get("items", []):
-            product = Product(item, self.warehouse, self.language)
-            products.append(product)
-
-        return products
+        return self._parse_new_arrivals(response)
 
     def get_categories(self) -> list[Category]:
         url = urljoin(API_URL, "/api/categories/")
         response = self._get_with_context(url)
+        return self._parse_categories(response)
 
-        # Get all level 1 categories
-        lvl1_categories = []
+    def get_category_tree(self, concurrency: int = None) -> CategoryTree:
+        """
+        Crawls every category once and indexes all of their levels, with links to parents and children and the categories of every product. Save it with `CategoryTree.save` and keep it up to date with `CategoryTree.refresh` instead of crawling again.
 
-        results = response.get("results", [])
-        for result in results:
-            categories = result.get("categories", [])
-            for c in categories:
-                category = Category(c, self.warehouse, self.language)
-                lvl1_categories.append(category)
+        Args:
+            concurrency (int, optional): Number of categories fetched in parallel. Defaults to one at a time.
 
-        return lvl1_categories
+        Returns:
+            CategoryTree: The tree.
+        """
+        return CategoryTree.build(self, concurrency)
+
+    def _map(self, func, items: list, concurrency: int = None) -> list:
+        # Applies `func` to every item over a pool of `concurrency` threads sharing
+        # the client's transport, keeping the input order.
+        if not concurrency or concurrency <= 1:
+            return [func(i) for i in items]
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return list(executor.map(func, items))
+
+    def _fetch_all(self, items: list[MercadonaItem], concurrency: int = None) -> None:
+        # Fetches the complete data of every item that is still missing it. An item
+        # that can't be fetched keeps the data it had (e.g. a product's listing
+        # data), so one failure doesn't abort the others.
+
+        def fetch(item: MercadonaItem) -> None:
+            with item._lock:
+                if not item._is_data_incomplete():
+                    return
+
+                data = item._data
+                try:
+                    item._fetch_data()
+                except requests.exceptions.RequestException:
+                    print(f"Error fetching data for {item}.")
+                    return
+
+                if item._data.get("err_code") and data:
+                    item._data = data
+
+        pending = [i for i in items if i._is_data_incomplete()]
+        self._map(fetch, pending, concurrency)
+
+    def get_catalog(
+        self,
+        concurrency: int = None,
+        compact: bool = False,
+        fields: list[str] = None,
+    ) -> Catalog:
+        """
+        Retrieves every product of every category. Products listed in several categories are only returned once, with every category they were listed in in `listed_in`, so their details are never fetched twice.
 
-    def get_catalog(self) -> list[Product]:
-        return [p for c in self.get_categories() for p in c.products]
+        Args:
+            concurrency (int, optional): Number of categories (and product details, if needed) fetched in parallel. Keep it at or below the transport's `pool_maxsize` so every worker gets its own connection. Defaults to fetching one at a time.
+            compact (bool): Return CompactProduct snapshots instead of Product objects, which takes far less memory for large catalogs. Defaults to False.
+            fields (list[str], optional): Product fields that will be read (e.g. ["unit_price", "brand"]). If any of them is only available in the product's details (see `plan_catalog`), the details of every product are fetched up front, in parallel; otherwise the product detail endpoint is never requested. Products whose details can't be fetched keep their listing data. Defaults to fetching details lazily, when a property needs them.
+
+        Returns:
+            Catalog: Every product in the catalog, in the order they were first listed, and the number of duplicate listings merged in `duplicates`.
+        """
+        details = fields is not None and needs_details(check_fields(fields))
+        catalog = Catalog()
+
+        if compact:
+            listings = list(
+                self._iter_listings(
+                    self._iter_category_data(concurrency or 0), catalog=catalog
+                )
+            )
+
+            if details:
+                with ThreadPoolExecutor(max_workers=max(1, concurrency or 1)) as executor:
+                    data = list(executor.map(self._fetch_product_data, listings))
+            else:
+                data = [product_data for product_data, _ in listings]
+
+            for product_data, (_, listed_in) in zip(data, listings):
+                product = CompactProduct.from_data(
+                    product_data, self.warehouse, self.language
+                )
+                product.listed_in = listed_in
+                catalog.append(product)
+
+            return catalog
+
+        categories = self.get_categories()
+        self._fetch_all(categories, concurrency)
+
+        # Categories that couldn't be fetched have already been reported.
+        pairs = ((c, c._data) for c in categories if not c._data.get("err_code"))
+        for product_data, listed_in in self._iter_listings(pairs, catalog=catalog):
+            product = Product.get_or_create(
+                product_data, self.warehouse, self.language, self.transport
+            )
+            product.listed_in = listed_in
+            catalog.append(product)
+
+        if details:
+            self._fetch_all(catalog, concurrency)
+
+        return catalog
+
+    def _fetch_product_data(self, listing: tuple[dict, list[str]]) -> dict:
+        # Complete data of a listed product, falling back to the listing data if
+        # its details can't be fetched.
+        data = listing[0]
+        url = urljoin(API_URL, f"/api/products/{data.get('id')}/")
+        try:
+            response = self._get_with_context(url)
+        except requests.exceptions.RequestException:
+            return data
+
+        return data if response.get("err_code") else response
+
+    def plan_catalog(self, fields: list[str] = None) -> FetchPlan:
+        """
+        Tells ahead of time which endpoints and how many requests `get_catalog(fields=...)` needs. Only the category list is fetched to plan.
+
+        Args:
+            fields (list[str], optional): Product fields that will be read. Defaults to every field.
+
+        Returns:
+            FetchPlan: The endpoints and number of requests. Detail requests are counted exactly if every category was already fetched (e.g. kept by an identity map). Otherwise those of the categories not fetched yet are estimated from the average of the fetched ones (or `planner.PRODUCTS_PER_CATEGORY` if there are none), and the plan is marked as `estimated`.
+        """
+        return self._plan_catalog(check_fields(fields), self.get_categories())
+
+    def iter_catalog(
+        self, readahead: int = 0, compact: bool = False, unique: bool = False
+    ) -> Iterator[Product] | Iterator[CompactProduct]:
+        """
+        Yields every product of every category as soon as its category is fetched, without keeping the whole catalog in memory.
+
+        Args:
+            readahead (int): Number of upcoming categories fetched in the background while the current one is consumed. Defaults to fetching each category when it is reached.
+            compact (bool): Yield CompactProduct snapshots instead of Product objects. Defaults to False.
+            unique (bool): Yield products listed in several categories only once. Their `listed_in` keeps growing as they are found in later categories. Every product yielded is remembered to do so, so memory grows with the catalog. Defaults to False: products are yielded once per category they are listed in, and memory stays constant.
+
+        Yields:
+            Product | CompactProduct: Every product in the catalog, in category order.
+        """
+        pairs = self._iter_category_data(readahead)
+
+        for product_data, listed_in in self._iter_listings(pairs, unique):
+            yield self._listed_product(product_data, listed_in, compact)
+
+    def _iter_category_data(
+        self, readahead: int = 0
+    ) -> Iterator[tuple[Category, dict]]:
+        # Yields every category with its response, in order, fetching up to
+        # `readahead` categories in the background.
+
+        def fetch(category: Category) -> dict:
+            # The response isn't stored in the category so it can be freed as soon
+            # as its products have been consumed.
+            if not category._is_data_incomplete():
+                return category._data
+
+            return category._fetch_with_context(category.endpoint)
+
+        def consume(category: Category, data: dict):
+            if data.get("err_code"):
+                print(f"Error fetching data for {category}.")
+                return
+
+            yield category, data
+
+        categories = iter(self.get_categories())
+
+        if readahead <= 0:
+            for category in categories:
+                yield from consume(category, fetch(category))
+            return
+
+        with ThreadPoolExecutor(max_workers=readahead) as executor:
+            pending = deque()
+
+            for category in categories:
+                pending.append((category, executor.submit(fetch, category)))
+                if len(pending) <= readahead:
+                    continue
+
+                category, future = pending.popleft()
+                yield from consume(category, future.result())
+
+            while pending:
+                category, future = pending.popleft()
+                yield from consume(category, future.result())
+
+    def export_catalog(
+        self,
+        path: str,
+        format: Literal["jsonl", "csv", "parquet"] = "jsonl",
+        fields: list[str] = None,
+        batch_size: int = 1000,
+        concurrency: int = 8,
+        readahead: int = 1,
+    ) -> int:
+        """
+        Writes every product of the catalog to a file, streaming straight from the category responses without creating Product objects. Product details are only fetched if a requested field needs them, and products are written in batches so memory stays bounded however large the catalog is.
+
+        Args:
+            path (str): Path of the file.
+            format (str): "jsonl", "csv" or "parquet" (requires `pip install mercapy[parquet]`). Defaults to "jsonl".
+            fields (list[str], optional): Product fields to export besides the id (e.g. ["name", "unit_price"]). Defaults to every field, which means fetching the details of every product.
+            batch_size (int): Products decoded and written at a time. Defaults to 1000.
+            concurrency (int): Number of product details fetched in parallel, when needed. Defaults to 8.
+            readahead (int): Number of categories fetched in the background while the current one is exported. Defaults to 1.
+
+        Returns:
+            int: Number of products written. Products listed in several categories are only written once.
+        """
+        fields = check_fields(fields)
+
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            batches = (
+                [decode_row(data, fields) for data in batch]
+                for batch in self._iter_product_batches(
+                    executor, needs_details(fields), batch_size, readahead
+                )
+            )
+            return export_rows(batches, path, format, fields)
+
+    def _iter_product_batches(
+        self,
+        executor: ThreadPoolExecutor,
+        details: bool,
+        batch_size: int = 1000,
+        readahead: int = 0,
+    ) -> Iterator[list[dict]]:
+        # Yields the raw data of every product of the catalog in batches, once per
+        # product, straight from the category responses. With `details`, the
+        # details of every batch are fetched over `executor`, falling back to the
+        # listing data for the products whose details can't be fetched.
+
+        def complete(batch: list[tuple[dict, list[str]]]) -> list[dict]:
+            if details:
+                return list(executor.map(self._fetch_product_data, batch))
+
+            return [data for data, _ in batch]
+
+        batch = []
+
+        for listing in self._iter_listings(self._iter_category_data(readahead)):
+            batch.append(listing)
+            if len(batch) >= batch_size:
+                yield complete(batch)
+                batch = []
+
+        if batch:
+            yield complete(batch)
+
+    def download_photos(
+        self,
+        products: list[Product | CompactProduct],
+        sizes: list[tuple[int, int] | None] = None,
+        dest: str = "photos",
+        concurrency: int = 8,
+        fit_mode: Literal["crop", "fit"] = "crop",
+    ) -> DownloadReport:
+        """
+        Downloads every photo of many products in several sizes through this instance's transport. Files that already exist are skipped.
+
+        Args:
+            products (list[Product | CompactProduct]): Products whose photos are downloaded (e.g. `get_catalog()`).
+            sizes (list, optional): (width, height) of every size to download, or None for the original size. Defaults to the original size only.
+            dest (str): Root directory of the photos, with a subdirectory per size. Defaults to "photos".
+            concurrency (int): Number of photos downloaded in parallel. Keep it at or below the transport's `pool_maxsize`. Defaults to 8.
+            fit_mode (str): Fit mode for resized photos. Defaults to "crop".
+
+        Returns:
+            DownloadReport: Number of files downloaded, skipped and failed, and the throughput.
+        """
+        return download_photos(
+            products, sizes, dest, concurrency, fit_mode, self.transport
+        )
@@ -0,0 +1,49 @@
+from dataclasses import dataclass
+
+# Endpoints a catalog crawl can read from, cheapest first.
+CATEGORIES_ENDPOINT = "/api/categories/"
+CATEGORY_ENDPOINT = "/api/categories/{id}/"
+PRODUCT_ENDPOINT = "/api/products/{id}/"
+
+# Rough number of distinct products listed per category of the catalog, used to
+# estimate the detail requests of categories that haven't been fetched yet.
+PRODUCTS_PER_CATEGORY = 35
+
+
+@dataclass
+class FetchPlan:
+    """
+    Requests a catalog crawl needs to read a set of product fields.
+    Fields available in category listings (prices, name, brand...) only need the category endpoints. Detail fields (ean, description, photos...) need one more request per product.
+
+    Args:
+        fields (list[str]): Product fields that will be read.
+        needs_details (bool): Whether any field needs the product detail endpoint.
+        category_requests (int): Requests to the category list and to every category not fetched yet.
+        detail_requests (int): Requests to the product detail endpoint, one per product missing its details. Products of categories that haven't been fetched yet can't be counted, so they are estimated.
+        estimated (bool): Whether `detail_requests` is an estimate rather than an exact count.
+    """
+
+    fields: list[str]
+    needs_details: bool
+    category_requests: int
+    detail_requests: int = 0
+    estimated: bool = False
+
+    @property
+    def endpoints(self) -> list[str]:
+        """
+        Endpoint templates the crawl reads from.
+        """
+        endpoints = [CATEGORIES_ENDPOINT, CATEGORY_ENDPOINT]
+        if self.needs_details:
+            endpoints.append(PRODUCT_ENDPOINT)
+
+        return endpoints
+
+    @property
+    def requests(self) -> int:
+        """
+        Total number of requests. An estimate if `estimated` is set.
+        """
+        return self.category_requests + self.detail_requests
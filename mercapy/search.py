@@ -0,0 +1,266 @@
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Iterable
+import gzip, json, math, re, unicodedata
+
+from .elements import Product, CompactProduct
+
+# How much a match in each field counts towards a product's score.
+FIELD_WEIGHTS = {
+    "name": 3,
+    "brand": 2,
+    "category": 2,
+    "legal_name": 1,
+    "description": 1,
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Splits a text into lowercase tokens, ignoring accents (e.g. "Jamón" and "jamon" are the same token).
+
+    Args:
+        text (str): Text to split.
+
+    Returns:
+        list[str]: The tokens, in order.
+    """
+    if not text:
+        return []
+
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return TOKEN_PATTERN.findall(stripped)
+
+
+def _product_fields(data: dict) -> dict[str, str]:
+    # Reads the indexed fields straight from the product's data, so building an
+    # index never triggers a request for missing details.
+    details = data.get("details") or {}
+
+    category = None
+    categories = data.get("categories") or []
+    if categories:
+        subcategories = categories[0].get("categories") or []
+        category = (subcategories[0] if subcategories else categories[0]).get("name")
+
+    return {
+        "name": data.get("display_name"),
+        "brand": data.get("brand"),
+        "category": category,
+        "legal_name": details.get("legal_name"),
+        "description": details.get("description"),
+    }
+
+
+def _indexed_data(product: Product | CompactProduct) -> dict:
+    # API data a product is indexed and stored as. CompactProducts created
+    # without `keep_raw` only have their decoded fields, so the ones the index
+    # reads are mapped back to the API's keys.
+    if not isinstance(product, CompactProduct):
+        return product._data
+
+    if product.raw is not None:
+        return product.raw
+
+    category = {"id": product.category_id, "name": product.category}
+    return {
+        "id": product.id,
+        "display_name": product.name,
+        "slug": product.slug,
+        "brand": product.brand,
+        "categories": [{"categories": [category]}] if product.category else [],
+        "details": {
+            "legal_name": product.legal_name,
+            "description": product.description,
+        },
+    }
+
+
+class LocalIndex:
+    def __init__(self, warehouse: str = None, language: str = None) -> None:
+        """
+        Offline full-text index over a snapshot of the catalog, ranked with BM25.
+        It indexes the name, brand, category, legal name and description of every product, ignoring case and accents. Details that weren't fetched before building the index (legal name, description) are simply not indexed, so build it from a catalog fetched with those fields (as `Mercadona.build_local_index` does).
+
+        Args:
+            warehouse (str, optional): Warehouse the indexed products belong to.
+            language (str, optional): Language the indexed products are in.
+        """
+        self.warehouse = warehouse
+        self.language = language
+
+        self.documents = []
+        self.postings = {}
+        self.lengths = []
+
+        self._terms = None
+        self._average_length = None
+
+    @classmethod
+    def build(
+        cls,
+        products: Iterable[Product | CompactProduct],
+        warehouse: str = None,
+        language: str = None,
+    ) -> "LocalIndex":
+        """
+        Builds an index from a catalog snapshot (e.g. `Mercadona.get_catalog()`).
+
+        Args:
+            products (Iterable[Product | CompactProduct]): Products to index. Repeated products are only indexed once. CompactProducts without their raw data are indexed (and returned by `search`) with only their name, slug, brand, category, legal name and description.
+            warehouse (str, optional): Warehouse the products belong to. Defaults to the first product's.
+            language (str, optional): Language the products are in. Defaults to the first product's.
+
+        Returns:
+            LocalIndex: The index.
+        """
+        index = cls(warehouse, language)
+        seen = set()
+
+        for product in products:
+            data = _indexed_data(product)
+            if product.id in seen or not data:
+                continue
+            seen.add(product.id)
+
+            index.warehouse = index.warehouse or product.warehouse
+            index.language = index.language or product.language
+            index.add(data)
+
+        return index
+
+    def add(self, data: dict) -> None:
+        """
+        Adds a product to the index.
+
+        Args:
+            data (dict): The product's data as returned by the API.
+        """
+        doc = len(self.documents)
+        frequencies = Counter()
+
+        for field, text in _product_fields(data).items():
+            weight = FIELD_WEIGHTS[field]
+            for token in tokenize(text):
+                frequencies[token] += weight
+
+        self.documents.append(data)
+        self.lengths.append(sum(frequencies.values()))
+        for token, frequency in frequencies.items():
+            self.postings.setdefault(token, []).append((doc, frequency))
+
+        self._terms = None
+        self._average_length = None
+
+    def _expand(self, token: str) -> list[str]:
+        # Every indexed term starting with `token`, used for the last word of a
+        # query so partially typed words still match.
+        if self._terms is None:
+            self._terms = sorted(self.postings)
+
+        terms = []
+        i = bisect_left(self._terms, token)
+        while i < len(self._terms) and self._terms[i].startswith(token):
+            terms.append(self._terms[i])
+            i += 1
+
+        return terms
+
+    def search(
+        self, query: str, limit: int = 20, offset: int = 0, prefix: bool = True
+    ) -> list[tuple[dict, float]]:
+        """
+        Ranks the indexed products against a query.
+
+        Args:
+            query (str): Search query (e.g. "jamon serrano").
+            limit (int): Maximum number of results. Defaults to 20.
+            offset (int): Number of top results to skip, for pagination. Defaults to 0.
+            prefix (bool): Treat the last word of the query as a prefix, for autocompletion. Defaults to True.
+
+        Returns:
+            list[tuple[dict, float]]: The product data and score of every result, best first.
+        """
+        tokens = tokenize(query)
+        if not tokens or not self.documents:
+            return []
+
+        terms = [[t] for t in tokens]
+        if prefix:
+            terms[-1] = self._expand(tokens[-1]) or terms[-1]
+
+        k1, b = 1.2, 0.75
+        total = len(self.documents)
+        if self._average_length is None:
+            self._average_length = sum(self.lengths) / total
+
+        scores = Counter()
+        for alternatives in terms:
+            best = {}
+            for term in alternatives:
+                postings = self.postings.get(term, [])
+                found = len(postings)
+                idf = math.log(1 + (total - found + 0.5) / (found + 0.5))
+
+                for doc, frequency in postings:
+                    length = self.lengths[doc] / self._average_length
+                    norm = k1 * (1 - b + b * length)
+                    score = idf * frequency * (k1 + 1) / (frequency + norm)
+                    best[doc] = max(best.get(doc, 0.0), score)
+
+            scores.update(best)
+
+        ranked = sorted(scores.items(), key=lambda s: (-s[1], s[0]))
+        return [(self.documents[d], s) for d, s in ranked[offset : offset + limit]]
+
+    def save(self, path: str) -> None:
+        """
+        Saves the index to a gzip-compressed file.
+
+        Args:
+            path (str): Path of the file.
+        """
+        postings = {
+            term: [value for posting in postings for value in posting]
+            for term, postings in self.postings.items()
+        }
+        payload = {
+            "warehouse": self.warehouse,
+            "language": self.language,
+            "documents": self.documents,
+            "lengths": self.lengths,
+            "postings": postings,
+        }
+
+        with gzip.open(path, "wt", encoding="utf-8") as file:
+            json.dump(payload, file, separators=(",", ":"), ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "LocalIndex":
+        """
+        Loads an index saved with `save`.
+
+        Args:
+            path (str): Path of the file.
+
+        Returns:
+            LocalIndex: The index.
+        """
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            payload = json.load(file)
+
+        index = cls(payload["warehouse"], payload["language"])
+        index.documents = payload["documents"]
+        index.lengths = payload["lengths"]
+        index.postings = {
+            term: list(zip(values[::2], values[1::2]))
+            for term, values in payload["postings"].items()
+        }
+
+        return index
+
+    def __len__(self) -> int:
+        return len(self.documents)
@@ -0,0 +1,295 @@
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Literal
+import math
+
+from .constants import WAREHOUSES
+from .elements.fields import DECODERS, check_fields, decode_name, needs_details
+from .export import FIELD_TYPES
+from .merca import Mercadona
+from .utils.ratelimit import RateLimiter
+from .utils.transport import Transport
+
+# Fields a price matrix can hold.
+NUMERIC_FIELDS = [f for f, t in FIELD_TYPES.items() if t in (float, int)]
+
+MISSING = math.nan
+
+
+class PriceMatrix:
+    def __init__(
+        self,
+        product_ids: list[str],
+        warehouses: list[str],
+        fields: list[str],
+        values: dict[str, array],
+        names: dict[str, str] = None,
+        errors: dict[str, str] = None,
+    ) -> None:
+        """
+        Numeric fields of many products in many warehouses. Every field is stored in a flat array of doubles with a row per product and a column per warehouse, so a 5000 products × 39 warehouses matrix takes about 1.5MB per field. Products a warehouse doesn't sell are stored as NaN.
+
+        Args:
+            product_ids (list[str]): Product of every row.
+            warehouses (list[str]): Warehouse of every column.
+            fields (list[str]): Fields stored (e.g. ["unit_price"]). The first one is the default of every method.
+            values (dict[str, array]): Row-major array of every field.
+            names (dict[str, str], optional): Name of every product.
+            errors (dict[str, str], optional): Warehouses that couldn't be crawled, with the error. Their columns are empty.
+        """
+        self.product_ids = product_ids
+        self.warehouses = warehouses
+        self.fields = fields
+        self.values = values
+        self.names = names or {}
+        self.errors = errors or {}
+
+        self._rows = {id: i for i, id in enumerate(product_ids)}
+        self._columns = {w: i for i, w in enumerate(warehouses)}
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        """
+        (products, warehouses).
+        """
+        return len(self.product_ids), len(self.warehouses)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Bytes taken by the arrays of every field.
+        """
+        return sum(v.itemsize * len(v) for v in self.values.values())
+
+    def _row(self, product_id: str, field: str = None) -> array:
+        width = len(self.warehouses)
+        start = self._rows[str(product_id)] * width
+        return self.values[field or self.fields[0]][start : start + width]
+
+    def get(self, product_id: str, warehouse: str, field: str = None) -> float | None:
+        """
+        Returns the value of a product in a warehouse.
+
+        Args:
+            product_id (str): Product identifier.
+            warehouse (str): Warehouse code.
+            field (str, optional): Field to read. Defaults to the first field.
+
+        Returns:
+            float or None: The value, or None if the warehouse doesn't sell the product.
+        """
+        row = self._rows[str(product_id)]
+        value = self.values[field or self.fields[0]][
+            row * len(self.warehouses) + self._columns[warehouse]
+        ]
+        return None if math.isnan(value) else value
+
+    def row(self, product_id: str, field: str = None) -> dict[str, float]:
+        """
+        Returns the value of a product in every warehouse that sells it.
+        """
+        return {
+            w: v
+            for w, v in zip(self.warehouses, self._row(product_id, field))
+            if not math.isnan(v)
+        }
+
+    def column(self, warehouse: str, field: str = None) -> dict[str, float]:
+        """
+        Returns the value of every product sold by a warehouse.
+        """
+        values = self.values[field or self.fields[0]]
+        column = values[self._columns[warehouse] :: len(self.warehouses)]
+        return {
+            id: v for id, v in zip(self.product_ids, column) if not math.isnan(v)
+        }
+
+    def cheapest(self, product_id: str, field: str = None) -> tuple[str, float] | None:
+        """
+        Returns the warehouse with the lowest value of a product. Ties go to the first warehouse.
+
+        Args:
+            product_id (str): Product identifier.
+            field (str, optional): Field to compare. Defaults to the first field.
+
+        Returns:
+            tuple or None: The warehouse and its value, or None if no warehouse sells the product.
+        """
+        best = None
+        for warehouse, value in zip(self.warehouses, self._row(product_id, field)):
+            if not math.isnan(value) and (best is None or value < best[1]):
+                best = (warehouse, value)
+
+        return best
+
+    def cheapest_warehouses(self, field: str = None) -> dict[str, tuple[str, float]]:
+        """
+        Returns the cheapest warehouse of every product (see `cheapest`).
+        """
+        results = {}
+        for id in self.product_ids:
+            best = self.cheapest(id, field)
+            if best is not None:
+                results[id] = best
+
+        return results
+
+    def summary(self, field: str = None) -> dict[str, dict]:
+        """
+        Compares the warehouses.
+
+        Args:
+            field (str, optional): Field to compare. Defaults to the first field.
+
+        Returns:
+            dict: An entry per warehouse with the number of products it sells, the number of products it has the lowest value of (ties count for every tied warehouse), and its mean value relative to the lowest one over the products it sells (1.0 means always the cheapest).
+        """
+        width = len(self.warehouses)
+        products = [0] * width
+        cheapest = [0] * width
+        ratios = [0.0] * width
+
+        for id in self.product_ids:
+            row = self._row(id, field)
+            sold = [v for v in row if not math.isnan(v)]
+            if not sold:
+                continue
+
+            lowest = min(sold)
+            for i, value in enumerate(row):
+                if math.isnan(value):
+                    continue
+
+                products[i] += 1
+                cheapest[i] += value == lowest
+                ratios[i] += value / lowest if lowest else 1.0
+
+        return {
+            w: {
+                "products": products[i],
+                "cheapest": cheapest[i],
+                "relative_price": ratios[i] / products[i] if products[i] else None,
+            }
+            for i, w in enumerate(self.warehouses)
+        }
+
+    def __contains__(self, product_id: str) -> bool:
+        return str(product_id) in self._rows
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+    def __repr__(self) -> str:
+        return f"PriceMatrix(products={len(self.product_ids)}, warehouses={len(self.warehouses)}, fields={self.fields})"
+
+
+def _number(value) -> float:
+    if value is None:
+        return MISSING
+
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return MISSING
+
+
+def sweep_warehouses(
+    warehouses: list[str] = None,
+    fields: list[str] = None,
+    language: Literal["es", "en"] = "es",
+    concurrency: int = 4,
+    readahead: int = 2,
+    max_per_host: int = 16,
+    rate: float = None,
+    transport: Transport = None,
+) -> PriceMatrix:
+    """
+    Crawls the catalog of many warehouses at once and collects numeric fields of every product into a PriceMatrix. Every warehouse shares one transport, so the requests of every crawl are limited together per host.
+    Only the category endpoints are read, unless a field needs the product details.
+
+    Args:
+        warehouses (list[str], optional): Warehouse codes. Defaults to every known warehouse.
+        fields (list[str], optional): Numeric product fields to collect (see `NUMERIC_FIELDS`). Defaults to ["unit_price"].
+        language (str): Language of the product names. Defaults to "es".
+        concurrency (int): Number of warehouses crawled at once. Defaults to 4.
+        readahead (int): Number of categories of each warehouse fetched in the background (and product details fetched in parallel, if needed). Defaults to 2.
+        max_per_host (int): Maximum number of requests in flight per host when no transport is given. Defaults to 16.
+        rate (float, optional): Requests per second per host when no transport is given. Defaults to no pacing.
+        transport (Transport, optional): Transport every request is sent through. Defaults to a new transport limited by `max_per_host` and `rate`, closed when the sweep ends.
+
+    Returns:
+        PriceMatrix: The values of every product in every warehouse, with products in the order they were first found.
+    """
+    warehouses = list(dict.fromkeys(warehouses or WAREHOUSES))
+    fields = check_fields(fields or ["unit_price"])
+    for field in fields:
+        if field not in NUMERIC_FIELDS:
+            raise ValueError(
+                f"{field} isn't a numeric field, expected some of {NUMERIC_FIELDS}"
+            )
+
+    owned = transport is None
+    if owned:
+        transport = Transport(
+            pool_maxsize=max_per_host,
+            rate_limiter=RateLimiter(rate, max_concurrency=max_per_host),
+        )
+
+    details = needs_details(fields)
+    decoders = [DECODERS[f] for f in fields]
+
+    # Shared by every crawl: names don't depend on the warehouse.
+    names = {}
+
+    def crawl(warehouse: str) -> tuple[list[str], list[array], str | None]:
+        # Products of the warehouse, a column of values per field (in the same
+        # order as the products) and the error that stopped the crawl, if any.
+        ids = []
+        columns = [array("d") for _ in fields]
+
+        try:
+            client = Mercadona(warehouse, language, transport)
+            with ThreadPoolExecutor(max_workers=max(1, readahead)) as executor:
+                batches = client._iter_product_batches(
+                    executor, details, readahead=readahead
+                )
+                for batch in batches:
+                    for data in batch:
+                        id = str(data.get("id"))
+                        row = [_number(decode(data)) for decode in decoders]
+
+                        ids.append(id)
+                        for column, value in zip(columns, row):
+                            column.append(value)
+                        if id not in names:
+                            names[id] = decode_name(data)
+        except Exception as e:
+            # Any failure only loses this warehouse, keeping what it crawled.
+            print(f"Error sweeping warehouse {warehouse}: {e}")
+            return ids, columns, str(e)
+
+        return ids, columns, None
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            results = list(executor.map(crawl, warehouses))
+    finally:
+        if owned:
+            transport.close()
+
+    rows = {}
+    for ids, _, _ in results:
+        for id in ids:
+            rows.setdefault(id, len(rows))
+
+    width = len(warehouses)
+    matrix = {f: array("d", [MISSING]) * (len(rows) * width) for f in fields}
+
+    for column, (ids, columns, _) in enumerate(results):
+        for field, values in zip(fields, columns):
+            target = matrix[field]
+            for id, value in zip(ids, values):
+                target[rows[id] * width + column] = value
+
+    errors = {w: e for w, (_, _, e) in zip(warehouses, results) if e is not None}
+    return PriceMatrix(list(rows), warehouses, fields, matrix, names, errors)
@@ -0,0 +1,355 @@
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING
+from urllib.parse import urljoin
+import gzip, json, time
+
+from .constants import API_URL
+from .elements import Product
+
+if TYPE_CHECKING:
+    from .merca import Mercadona
+
+
+@dataclass(slots=True)
+class CategoryNode:
+    """
+    A category of any level in a CategoryTree.
+
+    Args:
+        id (str): Category identifier.
+        name (str): Category name.
+        level (int): Depth in the tree: 0 for the top sections, 1 for the categories listed by `Mercadona.get_categories()`, 2 and over for their subcategories.
+        parent (str, optional): Identifier of the parent category.
+        children (list[str]): Identifiers of the subcategories, in order.
+        products (list[str]): Identifiers of the products listed directly in this category, in order.
+        fetched_at (float, optional): When the category was last fetched, as a Unix timestamp. Only set for level 1 categories, which are the ones fetched from the API.
+    """
+
+    id: str
+    name: str | None = None
+    level: int = 0
+    parent: str | None = None
+    children: list[str] = field(default_factory=list)
+    products: list[str] = field(default_factory=list)
+    fetched_at: float | None = None
+
+
+class CategoryTree:
+    def __init__(
+        self, warehouse: str = None, language: str = None, transport=None
+    ) -> None:
+        """
+        Index of every category of a warehouse, of every level, with links to parents and children, the products of each one and the categories of each product. Lookups by id take constant time.
+        Build it with `build` (or `Mercadona.get_category_tree()`), save it to disk and keep it up to date with `refresh`, which only fetches the categories that are new or stale.
+
+        Args:
+            warehouse (str, optional): Warehouse the tree belongs to.
+            language (str, optional): Language of the category and product names.
+            transport (Transport, optional): Transport the products returned by `products` fetch missing data with. Set to the client's transport by `build` and `refresh`. Defaults to the shared default transport.
+        """
+        self.warehouse = warehouse
+        self.language = language
+        self.transport = transport
+
+        self.nodes = {}
+        self.roots = []
+        self.product_data = {}
+        self.product_categories = {}
+
+    @classmethod
+    def build(cls, client: "Mercadona", concurrency: int = None) -> "CategoryTree":
+        """
+        Builds the tree with one crawl of the catalog: the category list and every level 1 category.
+
+        Args:
+            client (Mercadona): Client the categories are fetched with.
+            concurrency (int, optional): Number of categories fetched in parallel. Defaults to one at a time.
+
+        Returns:
+            CategoryTree: The tree.
+        """
+        tree = cls(client.warehouse, client.language, client.transport)
+        tree.refresh(client, concurrency=concurrency)
+        return tree
+
+    def refresh(
+        self,
+        client: "Mercadona",
+        max_age: float = None,
+        ids: list[str] = None,
+        concurrency: int = None,
+    ) -> list[str]:
+        """
+        Updates the tree incrementally. The category list is always fetched again, which adds new categories and removes the ones that no longer exist, but only the level 1 categories that are new, older than `max_age` or in `ids` are fetched again.
+
+        Args:
+            client (Mercadona): Client the categories are fetched with.
+            max_age (float, optional): Seconds after which a category is fetched again. Defaults to never, unless it is in `ids`.
+            ids (list[str], optional): Level 1 categories to fetch again regardless of their age.
+            concurrency (int, optional): Number of categories fetched in parallel. Defaults to one at a time.
+
+        Returns:
+            list[str]: Identifiers of the categories that were fetched.
+        """
+        self.transport = client.transport
+
+        listing = client._get_with_context(urljoin(API_URL, "/api/categories/"))
+        if listing.get("err_code"):
+            print("Error fetching the category list.")
+            return []
+
+        self._update_listing(listing)
+
+        now = time.time()
+        ids = {str(i) for i in ids or []}
+        stale = [
+            node.id
+            for node in self.nodes.values()
+            if node.level == 1
+            and (
+                node.fetched_at is None
+                or node.id in ids
+                or (max_age is not None and now - node.fetched_at > max_age)
+            )
+        ]
+
+        def fetch(id: str) -> dict:
+            return client._get_with_context(urljoin(API_URL, f"/api/categories/{id}/"))
+
+        fetched = []
+        with ThreadPoolExecutor(max_workers=max(1, concurrency or 1)) as executor:
+            for id, data in zip(stale, executor.map(fetch, stale)):
+                if data.get("err_code"):
+                    print(f"Error fetching data for category {id}.")
+                    continue
+
+                self._update_category(self.nodes[id], data)
+                fetched.append(id)
+
+        return fetched
+
+    def _update_listing(self, listing: dict) -> None:
+        # Syncs levels 0 and 1 with the category list, keeping what is known
+        # about the categories that are still listed.
+        listed = set()
+        roots = []
+
+        for section in listing.get("results", []):
+            root = self._upsert(section, 0, None)
+            roots.append(root.id)
+            listed.add(root.id)
+
+            root.children = []
+            for category in section.get("categories", []):
+                node = self._upsert(category, 1, root.id)
+                root.children.append(node.id)
+                listed.add(node.id)
+
+        for node in list(self.nodes.values()):
+            if node.level <= 1 and node.id not in listed and node.id in self.nodes:
+                self._remove(node.id)
+
+        self.roots = roots
+
+    def _update_category(self, node: CategoryNode, data: dict) -> None:
+        # Replaces everything below a level 1 category with its fetched data.
+        for child in node.children:
+            self._remove(child)
+        self._unlink_products(node)
+
+        node.name = data.get("name", node.name)
+        node.fetched_at = time.time()
+        self._add_contents(node, data)
+
+    def _add_contents(self, node: CategoryNode, data: dict) -> None:
+        node.children = []
+        for subcategory in data.get("categories") or []:
+            child = self._upsert(subcategory, node.level + 1, node.id)
+            node.children.append(child.id)
+            self._add_contents(child, subcategory)
+
+        node.products = []
+        for product in data.get("products") or []:
+            product_id = str(product.get("id"))
+            node.products.append(product_id)
+            self.product_data[product_id] = product
+            self.product_categories.setdefault(product_id, []).append(node.id)
+
+    def _upsert(self, data: dict, level: int, parent: str | None) -> CategoryNode:
+        id = str(data.get("id"))
+        node = self.nodes.get(id)
+
+        if node is None:
+            node = CategoryNode(id, data.get("name"), level, parent)
+            self.nodes[id] = node
+        else:
+            node.name = data.get("name", node.name)
+            node.level = level
+            node.parent = parent
+
+        return node
+
+    def _remove(self, id: str) -> None:
+        # Removes a category and everything below it.
+        node = self.nodes.pop(id, None)
+        if node is None:
+            return
+
+        for child in node.children:
+            self._remove(child)
+        self._unlink_products(node)
+
+    def _unlink_products(self, node: CategoryNode) -> None:
+        for product_id in node.products:
+            categories = self.product_categories.get(product_id, [])
+            if node.id in categories:
+                categories.remove(node.id)
+
+            if not categories:
+                self.product_categories.pop(product_id, None)
+                self.product_data.pop(product_id, None)
+
+        node.products = []
+
+    def get(self, id: str) -> CategoryNode | None:
+        """
+        Returns a category of any level by its identifier.
+        """
+        return self.nodes.get(str(id))
+
+    def parent(self, id: str) -> CategoryNode | None:
+        """
+        Returns the parent of a category, or None for the top sections.
+        """
+        node = self.get(id)
+        return self.nodes.get(node.parent) if node and node.parent else None
+
+    def children(self, id: str) -> list[CategoryNode]:
+        """
+        Returns the subcategories of a category, in order.
+        """
+        node = self.get(id)
+        return [self.nodes[c] for c in node.children] if node else []
+
+    def ancestors(self, id: str) -> list[CategoryNode]:
+        """
+        Returns the path from the top section down to a category, both included.
+        """
+        path = []
+        node = self.get(id)
+        while node is not None:
+            path.append(node)
+            node = self.nodes.get(node.parent) if node.parent else None
+
+        return path[::-1]
+
+    def descendants(self, id: str) -> Iterator[CategoryNode]:
+        """
+        Yields every category below a category, depth first.
+        """
+        for child in self.children(id):
+            yield child
+            yield from self.descendants(child.id)
+
+    def product_ids(self, id: str, recursive: bool = True) -> list[str]:
+        """
+        Returns the identifiers of the products of a category.
+
+        Args:
+            id (str): Category identifier.
+            recursive (bool): Include the products of every subcategory. Defaults to True.
+
+        Returns:
+            list[str]: Product identifiers, in order and without repetitions.
+        """
+        node = self.get(id)
+        if node is None:
+            return []
+
+        nodes = [node, *self.descendants(node.id)] if recursive else [node]
+        return list(dict.fromkeys(p for n in nodes for p in n.products))
+
+    def products(self, id: str, recursive: bool = True, transport=None) -> list[Product]:
+        """
+        Returns the products of a category, built from the data stored in the tree without sending any request.
+
+        Args:
+            id (str): Category identifier.
+            recursive (bool): Include the products of every subcategory. Defaults to True.
+            transport (Transport, optional): Transport the products fetch missing data with. Defaults to the tree's transport: that of the client it was built or last refreshed with.
+
+        Returns:
+            list[Product]: The products, in order.
+        """
+        transport = transport or self.transport
+        return [
+            Product.get_or_create(
+                self.product_data[p], self.warehouse, self.language, transport
+            )
+            for p in self.product_ids(id, recursive)
+        ]
+
+    def categories_of(self, product_id: str) -> list[CategoryNode]:
+        """
+        Returns every category a product is listed in.
+        """
+        return [self.nodes[c] for c in self.product_categories.get(str(product_id), [])]
+
+    def save(self, path: str) -> None:
+        """
+        Saves the tree to a gzip-compressed file.
+
+        Args:
+            path (str): Path of the file.
+        """
+        payload = {
+            "warehouse": self.warehouse,
+            "language": self.language,
+            "roots": self.roots,
+            "nodes": [asdict(node) for node in self.nodes.values()],
+            "products": self.product_data,
+        }
+
+        with gzip.open(path, "wt", encoding="utf-8") as file:
+            json.dump(payload, file, separators=(",", ":"), ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str, transport=None) -> "CategoryTree":
+        """
+        Loads a tree saved with `save`.
+
+        Args:
+            path (str): Path of the file.
+            transport (Transport, optional): Transport the products returned by `products` fetch missing data with, until the tree is refreshed. Defaults to the shared default transport.
+
+        Returns:
+            CategoryTree: The tree.
+        """
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            payload = json.load(file)
+
+        tree = cls(payload["warehouse"], payload["language"], transport)
+        tree.roots = payload["roots"]
+        tree.product_data = payload["products"]
+
+        for node in payload["nodes"]:
+            node = CategoryNode(**node)
+            tree.nodes[node.id] = node
+            for product_id in node.products:
+                tree.product_categories.setdefault(product_id, []).append(node.id)
+
+        return tree
+
+    def __getitem__(self, id: str) -> CategoryNode:
+        return self.nodes[str(id)]
+
+    def __contains__(self, id: str) -> bool:
+        return str(id) in self.nodes
+
+    def __iter__(self) -> Iterator[CategoryNode]:
+        return iter(self.nodes.values())
+
+    def __len__(self) -> int:
+        return len(self.nodes)
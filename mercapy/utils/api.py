@@ -1,59 +1,398 @@
 import requests, json
+from urllib.parse import urlencode, urlparse
+
 from ..constants import *
+from .transport import Transport, get_default_transport
+from .async_transport import AsyncTransport
+from .decoding import DECODE_ERRORS, endpoint_kind
+from .instrumentation import RequestEvent
+
+ALGOLIA_URL = "https://7uzjkl1dj0-dsn.algolia.net/1/indexes/"
+
+# Headers required for every Algolia request
+ALGOLIA_HEADERS = {
+    "x-algolia-application-id": ALGOLIA_APP_ID,
+    "x-algolia-api-key": ALGOLIA_API_KEY,
+    "Content-Type": "application/json",
+}
+
+
+def _cache_key(url: str, params: dict = None) -> tuple[str, str, str]:
+    # Responses are cached by (endpoint, warehouse, language).
+    params = params or {}
+    return urlparse(url).path, params.get("wh"), params.get("lang")
+
+
+def _decode(transport: Transport | AsyncTransport, url: str, content: bytes):
+    # Parses a response body with the transport's decoder, using the schema of
+    # the endpoint it came from when the decoder is typed.
+    return transport.json_decoder.decode(content, endpoint_kind(url))
+
+
+def _decode_error(url: str, error: Exception) -> str:
+    return f"Invalid JSON received from {url}: {error}"
+
+
+def _flight_key(url: str, params: dict = None) -> tuple:
+    # Concurrent calls are coalesced by URL and parameters, which for the API
+    # means by (endpoint, warehouse, language).
+    return url, tuple(sorted((params or {}).items()))
+
+
+def _record_unsent(transport: Transport | AsyncTransport, url: str, **flags) -> None:
+    # Records a response that didn't need a request: a cache hit or a response
+    # shared from a call already in flight.
+    event = RequestEvent.start("GET", url)
+    event.status = 200
+    for name, value in flags.items():
+        setattr(event, name, value)
+    transport.instrumentation.record(event)
 
 
-def fetch_json(url: str, params: dict = None) -> dict:
+def fetch_json(url: str, params: dict = None, transport: Transport = None) -> dict:
     """
-    Fetches JSON data from a given URL.
+    Fetches JSON data from a given URL. Concurrent calls with the same URL and parameters share a single request, unless the transport was created with `coalesce=False`. Each of them gets a shallow copy of the result, so don't mutate nested values in place.
 
     Args:
         url (str): The URL to fetch data from.
         params (dict, optional): The parameters to send with the request. Defaults to None.
+        transport (Transport, optional): Transport used to send the request. Defaults to the shared default transport.
 
     Returns:
         dict: The JSON response as a dictionary, or an empty dictionary if there's an error.
     """
+    transport = transport or get_default_transport()
+
+    flight = transport.single_flight
+    if flight is None:
+        return _fetch_json(url, params, transport)
+
+    data, shared = flight.do(
+        _flight_key(url, params), lambda: _fetch_json(url, params, transport)
+    )
+    if shared:
+        _record_unsent(transport, url, coalesced=True)
+        # Every caller gets its own dictionary, so replacing keys in one result
+        # doesn't change the others. Nested values are still shared.
+        data = dict(data)
+
+    return data
+
+
+def _fetch_json(url: str, params: dict, transport: Transport) -> dict:
+    cache = transport.cache
+    if cache is not None:
+        key = _cache_key(url, params)
+        data = cache.get(*key)
+        if data is not None:
+            _record_unsent(transport, url, cache_hit=True)
+            return data
+
+    response = None
     try:
-        response = requests.get(url, params=params, allow_redirects=False)
+        response = transport.get(url, params=params, allow_redirects=False)
         response.raise_for_status()
 
-        return response.json()
+        data = _decode(transport, url, response.content)
     except requests.exceptions.RequestException as e:
+        # Without a response (e.g. the connection failed) there's no status code
+        # to report, so let the caller handle it.
+        if response is None:
+            raise
+
         return {"err_code": response.status_code, "err_message": e}
+    except DECODE_ERRORS as e:
+        return {"err_code": response.status_code, "err_message": _decode_error(url, e)}
+
+    if cache is not None:
+        cache.set(*key, data)
+
+    return data
+
+
+async def fetch_json_async(
+    url: str, params: dict = None, transport: AsyncTransport = None
+) -> dict:
+    """
+    Fetches JSON data from a given URL without blocking the event loop. Concurrent calls with the same URL and parameters share a single request, unless the transport was created with `coalesce=False`. Each of them gets a shallow copy of the result, so don't mutate nested values in place.
 
+    Args:
+        url (str): The URL to fetch data from.
+        params (dict, optional): The parameters to send with the request. Defaults to None.
+        transport (AsyncTransport, optional): Transport used to send the request. Defaults to a transport that only lives for this request.
 
-def query_algolia(query: str, warehouse: str, lang: str = "es") -> dict | None:
+    Returns:
+        dict: The JSON response as a dictionary, or an error dictionary if there's an error.
+    """
+    if transport is None:
+        async with AsyncTransport() as transport:
+            return await fetch_json_async(url, params, transport)
+
+    flight = transport.single_flight
+    if flight is None:
+        return await _fetch_json_async(url, params, transport)
+
+    data, shared = await flight.do(
+        _flight_key(url, params), lambda: _fetch_json_async(url, params, transport)
+    )
+    if shared:
+        _record_unsent(transport, url, coalesced=True)
+        # Every caller gets its own dictionary, so replacing keys in one result
+        # doesn't change the others. Nested values are still shared.
+        data = dict(data)
+
+    return data
+
+
+async def _fetch_json_async(url: str, params: dict, transport: AsyncTransport) -> dict:
+    cache = transport.cache
+    if cache is not None:
+        key = _cache_key(url, params)
+        data = cache.get(*key)
+        if data is not None:
+            _record_unsent(transport, url, cache_hit=True)
+            return data
+
+    response = await transport.get(url, params=params, allow_redirects=False)
+    if not response.ok:
+        return {"err_code": response.status, "err_message": response.reason}
+
+    try:
+        data = _decode(transport, url, response.content)
+    except DECODE_ERRORS as e:
+        return {"err_code": response.status, "err_message": _decode_error(url, e)}
+
+    if cache is not None:
+        cache.set(*key, data)
+
+    return data
+
+
+def algolia_params(
+    query: str,
+    hits_per_page: int = None,
+    page: int = None,
+    attributes: list[str] = None,
+) -> str:
+    """
+    Builds the URL-encoded parameter string of an Algolia query.
+
+    Args:
+        query (str): The query string.
+        hits_per_page (int, optional): Number of hits per page. Defaults to Algolia's default.
+        page (int, optional): Page to retrieve, starting at 0. Defaults to the first page.
+        attributes (list[str], optional): Hit attributes to retrieve. The product id is always retrieved. Defaults to every attribute.
+
+    Returns:
+        str: The parameter string.
+    """
+    params = {"query": query}
+
+    if hits_per_page is not None:
+        params["hitsPerPage"] = hits_per_page
+    if page is not None:
+        params["page"] = page
+    if attributes is not None:
+        attributes = list(dict.fromkeys(["id", *attributes]))
+        params["attributesToRetrieve"] = json.dumps(attributes)
+
+    return urlencode(params)
+
+
+def query_algolia(
+    query: str,
+    warehouse: str,
+    lang: str = "es",
+    transport: Transport = None,
+    hits_per_page: int = None,
+    page: int = None,
+    attributes: list[str] = None,
+) -> dict | None:
     """
     Queries Algolia for product data.
 
     Args:
         query (str): The query string.
         lang (str, optional): The language for the query. Defaults to "es".
+        transport (Transport, optional): Transport used to send the request. Defaults to the shared default transport.
+        hits_per_page (int, optional): Number of hits per page. Defaults to Algolia's default.
+        page (int, optional): Page to retrieve, starting at 0. Defaults to the first page.
+        attributes (list[str], optional): Hit attributes to retrieve. Defaults to every attribute.
 
     Returns:
         dict or None: The JSON response as a dictionary, or None if there's an error.
     """
-    url = f"https://7uzjkl1dj0-dsn.algolia.net/1/indexes/products_prod_{warehouse}_{lang}/query"
-
-    # Headers required for the request
-    headers = {
-        "x-algolia-application-id": ALGOLIA_APP_ID,
-        "x-algolia-api-key": ALGOLIA_API_KEY,
-        "Content-Type": "application/json",
-    }
+    transport = transport or get_default_transport()
+    url = f"{ALGOLIA_URL}products_prod_{warehouse}_{lang}/query"
 
     # Data payload for the request
-    payload = {"params": f"query={query}"}
+    payload = {"params": algolia_params(query, hits_per_page, page, attributes)}
 
     try:
-        with requests.post(url, headers=headers, data=json.dumps(payload)) as response:
+        with transport.post(
+            url, headers=ALGOLIA_HEADERS, data=json.dumps(payload)
+        ) as response:
             response.raise_for_status()
 
             # Check if the request was successful
             if response.ok:
-                return response.json()
+                return _decode(transport, url, response.content)
 
     except requests.exceptions.RequestException as e:
         print(f"An error occurred: {e}")
+    except DECODE_ERRORS as e:
+        print(f"An error occurred: {_decode_error(url, e)}")
 
     return None
+
+
+async def query_algolia_async(
+    query: str,
+    warehouse: str,
+    lang: str = "es",
+    transport: AsyncTransport = None,
+    hits_per_page: int = None,
+    page: int = None,
+    attributes: list[str] = None,
+) -> dict | None:
+    """
+    Queries Algolia for product data without blocking the event loop.
+
+    Args:
+        query (str): The query string.
+        lang (str, optional): The language for the query. Defaults to "es".
+        transport (AsyncTransport, optional): Transport used to send the request. Defaults to a transport that only lives for this request.
+        hits_per_page (int, optional): Number of hits per page. Defaults to Algolia's default.
+        page (int, optional): Page to retrieve, starting at 0. Defaults to the first page.
+        attributes (list[str], optional): Hit attributes to retrieve. Defaults to every attribute.
+
+    Returns:
+        dict or None: The JSON response as a dictionary, or None if there's an error.
+    """
+    if transport is None:
+        async with AsyncTransport() as transport:
+            return await query_algolia_async(
+                query, warehouse, lang, transport, hits_per_page, page, attributes
+            )
+
+    url = f"{ALGOLIA_URL}products_prod_{warehouse}_{lang}/query"
+    payload = {"params": algolia_params(query, hits_per_page, page, attributes)}
+
+    response = await transport.post(
+        url, headers=ALGOLIA_HEADERS, data=json.dumps(payload)
+    )
+    if not response.ok:
+        print(f"An error occurred: {response.status} {response.reason}")
+        return None
+
+    try:
+        return _decode(transport, url, response.content)
+    except DECODE_ERRORS as e:
+        print(f"An error occurred: {_decode_error(url, e)}")
+        return None
+
+
+def _algolia_batch_payload(
+    queries: list[str],
+    warehouse: str,
+    lang: str,
+    hits_per_page: int = None,
+    attributes: list[str] = None,
+) -> dict:
+    index_name = f"products_prod_{warehouse}_{lang}"
+    batch = [
+        {
+            "indexName": index_name,
+            "params": algolia_params(q, hits_per_page, attributes=attributes),
+        }
+        for q in queries
+    ]
+    return {"requests": batch, "strategy": "none"}
+
+
+def query_algolia_batch(
+    queries: list[str],
+    warehouse: str,
+    lang: str = "es",
+    transport: Transport = None,
+    hits_per_page: int = None,
+    attributes: list[str] = None,
+) -> list[dict] | None:
+    """
+    Sends many Algolia queries in a single request using the multi-index endpoint.
+
+    Args:
+        queries (list[str]): The query strings.
+        lang (str, optional): The language for the queries. Defaults to "es".
+        transport (Transport, optional): Transport used to send the request. Defaults to the shared default transport.
+        hits_per_page (int, optional): Number of hits per query. Defaults to Algolia's default.
+        attributes (list[str], optional): Hit attributes to retrieve. Defaults to every attribute.
+
+    Returns:
+        list[dict] or None: One result per query, in the same order, or None if there's an error.
+    """
+    transport = transport or get_default_transport()
+    url = f"{ALGOLIA_URL}*/queries"
+    payload = _algolia_batch_payload(
+        queries, warehouse, lang, hits_per_page, attributes
+    )
+
+    try:
+        with transport.post(
+            url, headers=ALGOLIA_HEADERS, data=json.dumps(payload)
+        ) as response:
+            response.raise_for_status()
+            return _decode(transport, url, response.content).get("results", [])
+
+    except requests.exceptions.RequestException as e:
+        print(f"An error occurred: {e}")
+    except DECODE_ERRORS as e:
+        print(f"An error occurred: {_decode_error(url, e)}")
+
+    return None
+
+
+async def query_algolia_batch_async(
+    queries: list[str],
+    warehouse: str,
+    lang: str = "es",
+    transport: AsyncTransport = None,
+    hits_per_page: int = None,
+    attributes: list[str] = None,
+) -> list[dict] | None:
+    """
+    Sends many Algolia queries in a single request without blocking the event loop.
+
+    Args:
+        queries (list[str]): The query strings.
+        lang (str, optional): The language for the queries. Defaults to "es".
+        transport (AsyncTransport, optional): Transport used to send the request. Defaults to a transport that only lives for this request.
+        hits_per_page (int, optional): Number of hits per query. Defaults to Algolia's default.
+        attributes (list[str], optional): Hit attributes to retrieve. Defaults to every attribute.
+
+    Returns:
+        list[dict] or None: One result per query, in the same order, or None if there's an error.
+    """
+    if transport is None:
+        async with AsyncTransport() as transport:
+            return await query_algolia_batch_async(
+                queries, warehouse, lang, transport, hits_per_page, attributes
+            )
+
+    url = f"{ALGOLIA_URL}*/queries"
+    payload = _algolia_batch_payload(
+        queries, warehouse, lang, hits_per_page, attributes
+    )
+
+    response = await transport.post(
+        url, headers=ALGOLIA_HEADERS, data=json.dumps(payload)
+    )
+    if not response.ok:
+        print(f"An error occurred: {response.status} {response.reason}")
+        return None
+
+    try:
+        return _decode(transport, url, response.content).get("results", [])
+    except DECODE_ERRORS as e:
+        print(f"An error occurred: {_decode_error(url, e)}")
+        return None
@@ -0,0 +1,195 @@
+import asyncio, time
+from dataclasses import dataclass, field
+
+from .cache import ResponseCache
+from .decoding import JSONDecoder
+from .identity import IdentityMap
+from .instrumentation import Instrumentation, RequestEvent
+from .ratelimit import RateLimiter, parse_retry_after
+from .singleflight import AsyncSingleFlight
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+@dataclass
+class AsyncResponse:
+    """
+    Response received by an AsyncTransport, with its body already read.
+
+    Args:
+        status (int): HTTP status code.
+        headers (dict): Response headers, looked up case-insensitively.
+        content (bytes): Raw response body.
+        reason (str): HTTP reason phrase.
+    """
+
+    status: int
+    headers: dict = field(repr=False)
+    content: bytes = field(repr=False)
+    reason: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    def json(self):
+        return JSONDecoder().decode(self.content)
+
+
+class AsyncTransport:
+    def __init__(
+        self,
+        concurrency: int = 32,
+        pool_maxsize: int = 100,
+        timeout: float = 30,
+        keep_alive: bool = True,
+        headers: dict = None,
+        cache: ResponseCache = None,
+        identity_map: IdentityMap = None,
+        rate_limiter: RateLimiter = None,
+        max_retries: int = 3,
+        json_decoder: JSONDecoder = None,
+        instrumentation: Instrumentation = None,
+        coalesce: bool = True,
+    ) -> None:
+        """
+        Asynchronous HTTP transport backed by an aiohttp session. Connections are pooled and kept alive, and no more than `concurrency` requests are in flight at once.
+        Requests are paced by the transport's rate limiter, which also adapts the number of requests in flight per host (halving it on 429s) without blocking the event loop, and requests answered with 429 Too Many Requests are retried after the Retry-After delay, or a jittered backoff if the server doesn't send one.
+
+        Args:
+            concurrency (int): Maximum number of requests in flight at the same time. Defaults to 32.
+            pool_maxsize (int): Maximum number of open connections. Defaults to 100.
+            timeout (float): Total timeout in seconds for every request. Defaults to 30.
+            keep_alive (bool): Whether connections are kept open between requests. Defaults to True.
+            headers (dict, optional): Extra headers sent with every request.
+            cache (ResponseCache, optional): Cache consulted by `fetch_json_async` before sending a request. Defaults to no cache.
+            identity_map (IdentityMap, optional): Map shared by every item created with this transport, so the same product, category or season is only instantiated and fetched once. Defaults to no map.
+            rate_limiter (RateLimiter, optional): Limiter pacing every request. Defaults to a limiter that only adapts concurrency (up to `concurrency` per host) and honours Retry-After.
+            max_retries (int): Times a throttled request is retried before giving up. Defaults to 3.
+            json_decoder (JSONDecoder, optional): Decoder used to parse response bodies. Defaults to an untyped decoder using the fastest JSON library installed.
+            instrumentation (Instrumentation, optional): Collects an event for every request. Defaults to a new instance owned by this transport.
+            coalesce (bool): Whether concurrent `fetch_json_async` calls for the same URL and parameters share a single request and its result. Defaults to True.
+        """
+        if aiohttp is None:
+            raise ImportError(
+                "AsyncTransport requires aiohttp. Install it with `pip install mercapy[async]`."
+            )
+
+        self.concurrency = concurrency
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+        self.headers = headers or {}
+        self.cache = cache
+        self.identity_map = identity_map
+        self.rate_limiter = rate_limiter or RateLimiter(max_concurrency=concurrency)
+        self.max_retries = max_retries
+        self.json_decoder = json_decoder or JSONDecoder()
+        self.instrumentation = instrumentation or Instrumentation()
+        self.single_flight = AsyncSingleFlight() if coalesce else None
+
+        self._session = None
+        self._semaphore = None
+
+    def _get_session(self):
+        # The session and semaphore are bound to the running event loop, so they
+        # are only created once a request is made from inside it.
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_maxsize, force_close=not self.keep_alive
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        return self._session
+
+    async def request(self, method: str, url: str, **kwargs) -> AsyncResponse:
+        """
+        Sends a request through the pooled session.
+
+        Args:
+            method (str): HTTP method (e.g. "GET").
+            url (str): The URL to send the request to.
+            **kwargs: Any other argument accepted by `aiohttp.ClientSession.request`.
+
+        Returns:
+            AsyncResponse: The response received.
+        """
+        self._get_session()
+        event = RequestEvent.start(method, url)
+
+        attempt = 0
+        try:
+            while True:
+                waited_at = time.perf_counter()
+                await self.rate_limiter.acquire_async(url)
+
+                status = retry_after = None
+                try:
+                    async with self._semaphore:
+                        sent_at = time.perf_counter()
+                        event.wait += sent_at - waited_at
+                        try:
+                            result = await self._send(method, url, **kwargs)
+                        finally:
+                            event.latency += time.perf_counter() - sent_at
+
+                    status = result.status
+                    retry_after = parse_retry_after(result.headers.get("Retry-After"))
+                finally:
+                    self.rate_limiter.release(url, status, retry_after)
+
+                if result.status != 429 or attempt >= self.max_retries:
+                    event.status = result.status
+                    event.bytes = len(result.content)
+                    return result
+
+                attempt += 1
+                event.retries = attempt
+                if retry_after is None:
+                    delay = self.rate_limiter.backoff(attempt)
+                    await asyncio.sleep(delay)
+                    event.backoff += delay
+        except Exception as e:
+            event.error = str(e)
+            raise
+        finally:
+            self.instrumentation.record(event)
+
+    async def _send(self, method: str, url: str, **kwargs) -> AsyncResponse:
+        # Sends a single request, without rate limiting or retries. Overridden by
+        # transports that don't talk to the network (e.g. AsyncReplayTransport).
+        async with self._get_session().request(method, url, **kwargs) as response:
+            content = await response.read()
+            return AsyncResponse(
+                response.status, response.headers.copy(), content, response.reason
+            )
+
+    async def get(self, url: str, **kwargs) -> AsyncResponse:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> AsyncResponse:
+        return await self.request("POST", url, **kwargs)
+
+    async def put(self, url: str, **kwargs) -> AsyncResponse:
+        return await self.request("PUT", url, **kwargs)
+
+    async def close(self) -> None:
+        """
+        Closes every pooled connection.
+        """
+        if self._session is not None:
+            await self._session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
@@ -0,0 +1,175 @@
+import json, sqlite3, threading, time
+
+# Seconds a response stays fresh, by endpoint prefix. Categories rarely change,
+# while product prices and the home page do.
+DEFAULT_TTLS = {
+    "/api/categories/": 24 * 60 * 60,
+    "/api/products/": 60 * 60,
+    "/api/home/": 30 * 60,
+}
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        path: str = "mercapy_cache.sqlite",
+        ttls: dict = None,
+        default_ttl: float = 60 * 60,
+        max_entries: int = 10_000,
+    ) -> None:
+        """
+        Persistent cache of API responses stored in a local SQLite database. Entries are keyed by (endpoint, warehouse, language), expire after a per-endpoint TTL and the least recently used ones are evicted once the cache is full.
+
+        Args:
+            path (str): Path of the SQLite database. Use ":memory:" for a cache that isn't persisted. Defaults to "mercapy_cache.sqlite".
+            ttls (dict, optional): Seconds a response stays fresh, by endpoint prefix. The longest matching prefix wins. Defaults to DEFAULT_TTLS.
+            default_ttl (float): Seconds a response stays fresh when no prefix matches. Defaults to one hour.
+            max_entries (int): Maximum number of responses stored. Defaults to 10000.
+        """
+        self.path = path
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                endpoint TEXT NOT NULL,
+                warehouse TEXT NOT NULL,
+                language TEXT NOT NULL,
+                data TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (endpoint, warehouse, language)
+            )
+            """
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access)"
+        )
+        self._connection.commit()
+
+    def get_ttl(self, endpoint: str) -> float:
+        """
+        Returns how many seconds a response from the given endpoint stays fresh.
+
+        Args:
+            endpoint (str): API endpoint (e.g. "/api/products/12345/").
+
+        Returns:
+            float: TTL in seconds.
+        """
+        matches = [p for p in self.ttls if endpoint.startswith(p)]
+        if not matches:
+            return self.default_ttl
+
+        return self.ttls[max(matches, key=len)]
+
+    def get(self, endpoint: str, warehouse: str, language: str) -> dict | None:
+        """
+        Looks up a fresh response.
+
+        Args:
+            endpoint (str): API endpoint (e.g. "/api/products/12345/").
+            warehouse (str): Warehouse code the response belongs to.
+            language (str): Language the response is in.
+
+        Returns:
+            dict or None: The cached response, or None if there isn't a fresh one.
+        """
+        key = (endpoint, warehouse or "", language or "")
+        now = time.time()
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT data, expires_at FROM responses "
+                "WHERE endpoint = ? AND warehouse = ? AND language = ?",
+                key,
+            ).fetchone()
+
+            if row is None or row[1] <= now:
+                self.misses += 1
+                return None
+
+            self._connection.execute(
+                "UPDATE responses SET last_access = ? "
+                "WHERE endpoint = ? AND warehouse = ? AND language = ?",
+                (now, *key),
+            )
+            self._connection.commit()
+            self.hits += 1
+
+        return json.loads(row[0])
+
+    def set(self, endpoint: str, warehouse: str, language: str, data: dict) -> None:
+        """
+        Stores a response, evicting the least recently used ones if the cache is full.
+
+        Args:
+            endpoint (str): API endpoint (e.g. "/api/products/12345/").
+            warehouse (str): Warehouse code the response belongs to.
+            language (str): Language the response is in.
+            data (dict): The response to store.
+        """
+        key = (endpoint, warehouse or "", language or "")
+        now = time.time()
+        expires_at = now + self.get_ttl(endpoint)
+
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (*key, json.dumps(data), expires_at, now),
+            )
+
+            overflow = self._count() - self.max_entries
+            if overflow > 0:
+                self._connection.execute(
+                    "DELETE FROM responses WHERE rowid IN "
+                    "(SELECT rowid FROM responses ORDER BY last_access LIMIT ?)",
+                    (overflow,),
+                )
+                self.evictions += overflow
+
+            self._connection.commit()
+
+    def clear(self) -> None:
+        """
+        Removes every stored response and resets the counters.
+        """
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+            self._connection.commit()
+
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: Number of hits, misses, evictions and stored entries, and the hit ratio.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self),
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def _count(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count()
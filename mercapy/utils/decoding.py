@@ -0,0 +1,235 @@
+from typing import Any, TypedDict
+import json, re
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Exceptions raised by `JSONDecoder.decode` on a malformed document, whichever
+# backend is used (json's and orjson's errors are ValueErrors).
+DECODE_ERRORS = (ValueError, msgspec.DecodeError) if msgspec is not None else (ValueError,)
+
+# Kind of payload returned by each endpoint, used to pick a typed schema.
+ENDPOINT_KINDS = [
+    (re.compile(r"/api/products/[^/]+/$"), "product"),
+    (re.compile(r"/api/categories/$"), "categories"),
+    (re.compile(r"/api/categories/[^/]+/$"), "category"),
+    (re.compile(r"/api/home/seasons/[^/]+/$"), "season"),
+    (re.compile(r"/1/indexes/\*/queries$"), "algolia_batch"),
+    (re.compile(r"/1/indexes/[^/]+/query$"), "algolia"),
+]
+
+
+def endpoint_kind(url: str) -> str | None:
+    """
+    Returns the kind of payload an API URL responds with.
+
+    Args:
+        url (str): The URL or endpoint (e.g. "/api/products/12345/").
+
+    Returns:
+        str or None: One of "product", "categories", "category", "season", "algolia" or "algolia_batch", or None if the endpoint has no typed schema.
+    """
+    path = url.split("?", 1)[0]
+    for pattern, kind in ENDPOINT_KINDS:
+        if pattern.search(path):
+            return kind
+
+    return None
+
+
+if msgspec is not None:
+    # Only the fields read by mercapy are declared; anything else in a payload is
+    # skipped while parsing instead of being turned into Python objects. They are
+    # TypedDicts so payloads are decoded straight into plain dictionaries. Leaf
+    # values are typed as Any because the API isn't consistent about them (e.g.
+    # prices come as strings or numbers).
+
+    class _PriceInstructions(TypedDict, total=False):
+        unit_price: Any
+        bulk_price: Any
+        reference_price: Any
+        reference_format: Any
+        previous_unit_price: Any
+        price_decreased: Any
+        iva: Any
+        is_new: Any
+        is_pack: Any
+        pack_size: Any
+        total_units: Any
+        unit_size: Any
+        size_format: Any
+        unit_name: Any
+        selling_method: Any
+        min_bunch_amount: Any
+        approx_size: Any
+
+    class _Supplier(TypedDict, total=False):
+        name: Any
+
+    class _Details(TypedDict, total=False):
+        legal_name: Any
+        description: Any
+        origin: Any
+        brand: Any
+        suppliers: list[_Supplier] | None
+        alcohol_by_volume: Any
+        storage_instructions: Any
+        usage_instructions: Any
+        mandatory_mentions: Any
+
+    class _PhotoSchema(TypedDict, total=False):
+        regular: Any
+        zoom: Any
+        thumbnail: Any
+        perspective: Any
+
+    class _Badges(TypedDict, total=False):
+        requires_age_check: Any
+        is_water: Any
+
+    class _CategoryRef(TypedDict, total=False):
+        id: Any
+        name: Any
+        level: Any
+        order: Any
+        categories: "list[_CategoryRef] | None"
+
+    class _ProductSchema(TypedDict, total=False):
+        id: Any
+        display_name: Any
+        slug: Any
+        brand: Any
+        ean: Any
+        thumbnail: Any
+        share_url: Any
+        packaging: Any
+        published: Any
+        limit: Any
+        status: Any
+        badges: _Badges | None
+        price_instructions: _PriceInstructions | None
+        details: _Details | None
+        photos: list[_PhotoSchema] | None
+        categories: list[_CategoryRef] | None
+
+    class _SubcategorySchema(TypedDict, total=False):
+        id: Any
+        name: Any
+        order: Any
+        layout: Any
+        published: Any
+        is_extended: Any
+        products: list[_ProductSchema] | None
+        categories: "list[_SubcategorySchema] | None"
+
+    class _CategorySchema(TypedDict, total=False):
+        id: Any
+        name: Any
+        order: Any
+        layout: Any
+        published: Any
+        is_extended: Any
+        categories: list[_SubcategorySchema] | None
+
+    class _CategoriesSchema(TypedDict, total=False):
+        count: Any
+        next: Any
+        previous: Any
+        results: list[_CategorySchema] | None
+
+    class _SeasonSchema(TypedDict, total=False):
+        id: Any
+        title: Any
+        layout: Any
+        bg_colors: Any
+        items: list[_ProductSchema] | None
+
+    class _AlgoliaHit(_ProductSchema, total=False):
+        objectID: Any
+
+    class _AlgoliaSchema(TypedDict, total=False):
+        hits: list[_AlgoliaHit] | None
+        nbHits: Any
+        page: Any
+        nbPages: Any
+        hitsPerPage: Any
+        query: Any
+        params: Any
+
+    class _AlgoliaBatchSchema(TypedDict, total=False):
+        results: list[_AlgoliaSchema] | None
+
+    SCHEMAS = {
+        "product": _ProductSchema,
+        "categories": _CategoriesSchema,
+        "category": _CategorySchema,
+        "season": _SeasonSchema,
+        "algolia": _AlgoliaSchema,
+        "algolia_batch": _AlgoliaBatchSchema,
+    }
+else:
+    SCHEMAS = {}
+
+
+class JSONDecoder:
+    def __init__(self, typed: bool = False) -> None:
+        """
+        Decodes API responses with the fastest JSON library installed: msgspec, then orjson, then the standard library.
+        In typed mode (requires msgspec) product, category, season and Algolia payloads are decoded straight into dictionaries that only keep the fields mercapy reads. The rest of the payload is skipped while parsing, so don't use it if you read the raw data yourself.
+
+        Args:
+            typed (bool): Parse known payloads against their schemas. Ignored if msgspec isn't installed. Defaults to False.
+        """
+        self.typed = typed and msgspec is not None
+        self._decoders = {}
+
+    @property
+    def backend(self) -> str:
+        """
+        Name of the library used to decode responses.
+        """
+        if msgspec is not None:
+            return "msgspec"
+        if orjson is not None:
+            return "orjson"
+        return "json"
+
+    def decode(self, content: bytes | str, kind: str = None) -> Any:
+        """
+        Decodes a JSON document.
+
+        Args:
+            content (bytes | str): The JSON document.
+            kind (str, optional): Kind of payload (see `endpoint_kind`), used to pick a schema in typed mode.
+
+        Returns:
+            Any: The decoded document, made of dictionaries and lists.
+        """
+        if self.typed and kind in SCHEMAS:
+            try:
+                return self._get_decoder(kind).decode(content)
+            except msgspec.ValidationError:
+                # The payload doesn't have the expected shape, keep all of it.
+                pass
+
+        if msgspec is not None:
+            return msgspec.json.decode(content)
+        if orjson is not None:
+            return orjson.loads(content)
+        return json.loads(content)
+
+    def _get_decoder(self, kind: str):
+        decoder = self._decoders.get(kind)
+        if decoder is None:
+            decoder = msgspec.json.Decoder(SCHEMAS[kind])
+            self._decoders[kind] = decoder
+
+        return decoder
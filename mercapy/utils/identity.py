@@ -0,0 +1,57 @@
+from collections import OrderedDict
+import threading
+
+
+class IdentityMap:
+    def __init__(self, maxsize: int = 10_000) -> None:
+        """
+        Keeps at most one instance per product, category or season, so every reference to the same item shares its data and only fetches it once.
+        When more than `maxsize` items are stored, the least recently used one is forgotten.
+
+        Args:
+            maxsize (int): Maximum number of items kept. Defaults to 10000.
+        """
+        self.maxsize = maxsize
+
+        self.hits = 0
+        self.misses = 0
+
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_add(self, key: tuple, factory):
+        """
+        Returns the item stored under `key`, creating it with `factory` if there isn't one.
+
+        Args:
+            key (tuple): Identity of the item, as (type, id, warehouse, language).
+            factory (callable): Called without arguments to create the item when missing.
+
+        Returns:
+            tuple: The item and whether it was already stored.
+        """
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return item, True
+
+            item = factory()
+            self._items[key] = item
+            self.misses += 1
+
+            if len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+            return item, False
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def __contains__(self, key: tuple) -> bool:
+        return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
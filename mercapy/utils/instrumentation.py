@@ -0,0 +1,230 @@
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+import threading, time
+
+
+def endpoint_template(url: str) -> str:
+    """
+    Returns the endpoint of a URL with its identifiers replaced by "{id}", so requests to the same endpoint are grouped together.
+
+    Args:
+        url (str): The URL (e.g. "https://tienda.mercadona.es/api/products/12345/").
+
+    Returns:
+        str: The endpoint template (e.g. "/api/products/{id}/").
+    """
+    # The first segment is kept as is, as it may be a version (e.g. Algolia's /1/).
+    root, *segments = urlsplit(url).path.lstrip("/").split("/")
+    segments = ["{id}" if any(c.isdigit() for c in s) else s for s in segments]
+    return "/" + "/".join([root, *segments])
+
+
+def percentile(values: list[float], p: float) -> float | None:
+    """
+    Nearest-rank percentile of already sorted values.
+
+    Args:
+        values (list[float]): Sorted values.
+        p (float): Percentile, between 0 and 100.
+
+    Returns:
+        float or None: The percentile, or None if there are no values.
+    """
+    if not values:
+        return None
+
+    i = round(p / 100 * len(values)) - 1
+    return values[min(len(values) - 1, max(0, i))]
+
+
+@dataclass
+class RequestEvent:
+    """
+    Describes an HTTP call made by a transport, including every retry, a response served from the cache, or a response shared from an identical call already in flight.
+
+    Args:
+        method (str): HTTP method.
+        url (str): The URL requested, without query parameters.
+        endpoint (str): The endpoint template (see `endpoint_template`).
+        status (int | None): Status code of the final response, or None if no response was received.
+        latency (float): Seconds spent waiting for responses, summed over every attempt.
+        bytes (int): Size of the final response body.
+        retries (int): Times the request was retried after a 429.
+        backoff (float): Seconds slept between retries.
+        wait (float): Seconds the rate limiter held the request back.
+        cache_hit (bool): Whether the response was served from the cache.
+        coalesced (bool): Whether the response was shared from an identical call already in flight, without sending a request.
+        error (str | None): The exception raised if no response was received.
+        timestamp (float): When the request was started, as a Unix timestamp.
+    """
+
+    method: str
+    url: str
+    endpoint: str
+    status: int | None = None
+    latency: float = 0.0
+    bytes: int = 0
+    retries: int = 0
+    backoff: float = 0.0
+    wait: float = 0.0
+    cache_hit: bool = False
+    coalesced: bool = False
+    error: str | None = None
+    timestamp: float = field(default_factory=time.time)
+
+    @classmethod
+    def start(cls, method: str, url: str) -> "RequestEvent":
+        return cls(method, url.split("?", 1)[0], endpoint_template(url))
+
+
+class _EndpointStats:
+    def __init__(self, max_samples: int) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.retries = 0
+        self.bytes = 0
+        self.latency = 0.0
+        self.backoff = 0.0
+        self.wait = 0.0
+        self.samples = deque(maxlen=max_samples)
+
+    def add(self, event: RequestEvent) -> None:
+        self.requests += 1
+        self.retries += event.retries
+        self.bytes += event.bytes
+        self.backoff += event.backoff
+        self.wait += event.wait
+
+        if event.cache_hit:
+            self.cache_hits += 1
+            return
+
+        if event.coalesced:
+            self.coalesced += 1
+            return
+
+        if event.status is None or event.status >= 400:
+            self.errors += 1
+
+        self.latency += event.latency
+        self.samples.append(event.latency)
+
+    def summary(self) -> dict:
+        samples = sorted(self.samples)
+        sent = self.requests - self.cache_hits - self.coalesced
+
+        def ms(value):
+            return None if value is None else value * 1000
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "cache_hits": self.cache_hits,
+            "coalesced": self.coalesced,
+            "retries": self.retries,
+            "bytes": self.bytes,
+            "latency_s": self.latency,
+            "backoff_s": self.backoff,
+            "wait_s": self.wait,
+            "mean_ms": ms(self.latency / sent) if sent else None,
+            "p50_ms": ms(percentile(samples, 50)),
+            "p95_ms": ms(percentile(samples, 95)),
+            "p99_ms": ms(percentile(samples, 99)),
+        }
+
+
+# Counters summed over every endpoint for the "total" stats.
+_TOTALS = [
+    "requests",
+    "errors",
+    "cache_hits",
+    "coalesced",
+    "retries",
+    "bytes",
+    "latency",
+    "backoff",
+    "wait",
+]
+
+
+class Instrumentation:
+    def __init__(
+        self,
+        hooks: list[Callable[[RequestEvent], None]] = None,
+        max_samples: int = 10_000,
+    ) -> None:
+        """
+        Collects an event for every request sent by a transport, every response served from its cache and every response shared from a call already in flight. Events are passed to every hook and aggregated into per-endpoint stats.
+
+        Args:
+            hooks (list[Callable], optional): Functions called with every RequestEvent. Exceptions raised by hooks are printed and ignored.
+            max_samples (int): Latencies kept per endpoint to compute percentiles; older ones are discarded. Defaults to 10000.
+        """
+        self.hooks = list(hooks or [])
+        self.max_samples = max_samples
+
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook: Callable[[RequestEvent], None]) -> None:
+        """
+        Registers a function called with every RequestEvent.
+        """
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook: Callable[[RequestEvent], None]) -> None:
+        """
+        Unregisters a function added with `add_hook`.
+        """
+        self.hooks.remove(hook)
+
+    def record(self, event: RequestEvent) -> None:
+        """
+        Aggregates an event into the stats and passes it to every hook.
+
+        Args:
+            event (RequestEvent): The event.
+        """
+        with self._lock:
+            stats = self._endpoints.get(event.endpoint)
+            if stats is None:
+                stats = _EndpointStats(self.max_samples)
+                self._endpoints[event.endpoint] = stats
+            stats.add(event)
+
+        for hook in self.hooks:
+            try:
+                hook(event)
+            except Exception as e:
+                print(f"Error in request hook {hook}: {e}")
+
+    def stats(self) -> dict:
+        """
+        Returns the stats aggregated so far.
+
+        Returns:
+            dict: A "total" entry and an entry per endpoint in "endpoints", each with the number of requests, errors, cache hits, coalesced calls and retries, the bytes received, the seconds spent waiting for responses, in backoff and held back by the rate limiter, and the mean, p50, p95 and p99 latencies in milliseconds.
+        """
+        with self._lock:
+            total = _EndpointStats(self.max_samples * max(1, len(self._endpoints)))
+            endpoints = {}
+
+            for endpoint, stats in sorted(self._endpoints.items()):
+                endpoints[endpoint] = stats.summary()
+
+                for name in _TOTALS:
+                    setattr(total, name, getattr(total, name) + getattr(stats, name))
+                total.samples.extend(stats.samples)
+
+        return {"total": total.summary(), "endpoints": endpoints}
+
+    def reset(self) -> None:
+        """
+        Discards the stats aggregated so far.
+        """
+        with self._lock:
+            self._endpoints.clear()
@@ -0,0 +1,383 @@
+"""
+Offline postcode -> warehouse lookup.
+
+Usage:
+    mercapy-postcodes refresh [--output postcodes.bin] [--concurrency 8] [--rate 10] [--checkpoint refresh.json] [--seeds 28001 46001 ...]
+    mercapy-postcodes lookup 28001 46001 ...
+"""
+
+import argparse, json, os, struct, threading, time, zlib
+
+from .transport import Transport
+
+# Every 5-digit postcode has a byte in the table.
+TABLE_SIZE = 100_000
+
+# Byte values of postcodes that aren't mapped to a warehouse. Mapped postcodes
+# store the index of their warehouse code plus FIRST_CODE.
+UNKNOWN = 0
+NO_WAREHOUSE = 1
+FIRST_CODE = 2
+
+_MAGIC = b"MPCT"
+_VERSION = 1
+# Magic, version, generation timestamp and number of warehouse codes.
+_HEADER = struct.Struct("<4sBdH")
+
+# Both files live in the user's cache, which is writable wherever the package
+# is installed.
+_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "mercapy"
+)
+DEFAULT_TABLE_PATH = os.path.join(_CACHE_DIR, "postcodes.bin")
+DEFAULT_CACHE_PATH = os.path.join(_CACHE_DIR, "postcodes.json")
+
+
+def is_spanish_postcode(postcode: str) -> bool:
+    """
+    Whether a string is a valid Spanish postcode: 5 digits, starting with a province number between 01 and 52.
+    """
+    return len(postcode) == 5 and postcode.isdigit() and 1 <= int(postcode[:2]) <= 52
+
+
+def neighbouring_postcodes(postcode: str) -> list[str]:
+    """
+    Returns the postcodes that differ from a postcode by one unit in a single digit (e.g. 28001 -> 18001, 38001, 29001, 27001...), keeping only valid Spanish postcodes.
+
+    Args:
+        postcode (str): A 5-digit postcode.
+
+    Returns:
+        list[str]: The neighbouring postcodes.
+    """
+    neighbours = []
+    for i, digit in enumerate(postcode):
+        for change in (-1, 1):
+            neighbour = f"{postcode[:i]}{(int(digit) + change) % 10}{postcode[i + 1 :]}"
+            if is_spanish_postcode(neighbour):
+                neighbours.append(neighbour)
+
+    return neighbours
+
+
+class PostcodeTable:
+    def __init__(
+        self, codes: list[str] = None, values: bytearray = None, generated_at: float = None
+    ) -> None:
+        """
+        Compact postcode -> warehouse table: one byte per 5-digit postcode, indexing a list of warehouse codes, so a lookup is a single array access and the whole table takes 100KB in memory (much less on disk, compressed).
+        Postcodes are either unknown, known not to be served by any warehouse, or mapped to a warehouse.
+
+        Args:
+            codes (list[str], optional): Warehouse codes the table refers to.
+            values (bytearray, optional): Byte of every postcode. Defaults to every postcode unknown.
+            generated_at (float, optional): When the table was generated, as a Unix timestamp.
+        """
+        self.codes = list(codes or [])
+        self.values = values if values is not None else bytearray(TABLE_SIZE)
+        self.generated_at = generated_at
+
+        self._indexes = {code: i for i, code in enumerate(self.codes)}
+
+    def _index(self, postcode: str) -> int | None:
+        if len(postcode) != 5 or not postcode.isdigit():
+            return None
+
+        return int(postcode)
+
+    def set(self, postcode: str, warehouse: str | None) -> None:
+        """
+        Maps a postcode to a warehouse code, or to no warehouse if None.
+        """
+        i = self._index(postcode)
+        if i is None:
+            raise ValueError(f"Invalid postcode {postcode!r}, expected 5 digits")
+
+        if warehouse is None:
+            self.values[i] = NO_WAREHOUSE
+            return
+
+        code = self._indexes.get(warehouse)
+        if code is None:
+            if len(self.codes) >= 256 - FIRST_CODE:
+                raise ValueError("A postcode table can't hold more than 254 warehouses")
+
+            code = len(self.codes)
+            self.codes.append(warehouse)
+            self._indexes[warehouse] = code
+
+        self.values[i] = code + FIRST_CODE
+
+    def get(self, postcode: str, default=None) -> str | None:
+        """
+        Returns the warehouse of a postcode, or `default` if the postcode is unknown or isn't served by any warehouse.
+        """
+        i = self._index(postcode)
+        value = self.values[i] if i is not None else UNKNOWN
+
+        return self.codes[value - FIRST_CODE] if value >= FIRST_CODE else default
+
+    def __getitem__(self, postcode: str) -> str | None:
+        # None for postcodes known not to be served, KeyError for unknown ones.
+        i = self._index(postcode)
+        value = self.values[i] if i is not None else UNKNOWN
+
+        if value == UNKNOWN:
+            raise KeyError(postcode)
+
+        return self.codes[value - FIRST_CODE] if value >= FIRST_CODE else None
+
+    def __contains__(self, postcode: str) -> bool:
+        i = self._index(postcode)
+        return i is not None and self.values[i] != UNKNOWN
+
+    def __len__(self) -> int:
+        # Number of known postcodes.
+        return TABLE_SIZE - self.values.count(UNKNOWN)
+
+    def save(self, path: str = DEFAULT_TABLE_PATH) -> None:
+        """
+        Saves the table to a binary file: a small header with the warehouse codes followed by the zlib-compressed postcode bytes.
+
+        Args:
+            path (str): Path of the file. Defaults to "~/.cache/mercapy/postcodes.bin", where `mercapy-postcodes refresh` writes it.
+        """
+        codes = "\0".join(self.codes).encode("ascii")
+        header = _HEADER.pack(
+            _MAGIC, _VERSION, self.generated_at or time.time(), len(self.codes)
+        )
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(path + ".part", "wb") as file:
+            file.write(header)
+            file.write(struct.pack("<I", len(codes)))
+            file.write(codes)
+            file.write(zlib.compress(bytes(self.values), 9))
+        os.replace(path + ".part", path)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_TABLE_PATH) -> "PostcodeTable":
+        """
+        Loads a table saved with `save`.
+
+        Args:
+            path (str): Path of the file. Defaults to "~/.cache/mercapy/postcodes.bin", where `mercapy-postcodes refresh` writes it.
+
+        Returns:
+            PostcodeTable: The table.
+        """
+        with open(path, "rb") as file:
+            content = file.read()
+
+        magic, version, generated_at, count = _HEADER.unpack_from(content)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} isn't a postcode table")
+
+        offset = _HEADER.size
+        (length,) = struct.unpack_from("<I", content, offset)
+        offset += 4
+        codes = content[offset : offset + length].decode("ascii").split("\0")
+        values = bytearray(zlib.decompress(content[offset + length :]))
+
+        if len(values) != TABLE_SIZE:
+            raise ValueError(f"{path} is corrupted")
+
+        return cls(codes if count else [], values, generated_at)
+
+
+class PostcodeCache:
+    def __init__(
+        self, path: str | None = DEFAULT_CACHE_PATH, negative_ttl: float = 86400
+    ) -> None:
+        """
+        Persistent cache of postcodes looked up through the API because the table didn't know them. Every new entry is written to disk straight away.
+        Warehouses are kept forever, but postcodes the API didn't map to any warehouse are only trusted for `negative_ttl` seconds, since the API may just have failed to answer properly, and are asked again afterwards.
+
+        Args:
+            path (str, optional): Path of the JSON file. None keeps the cache in memory only. Defaults to "~/.cache/mercapy/postcodes.json".
+            negative_ttl (float): Seconds a postcode without a warehouse is cached for. Defaults to a day.
+        """
+        self.path = path
+        self.negative_ttl = negative_ttl
+
+        # Postcode -> warehouse code, or the Unix timestamp at which the postcode
+        # was found not to be served by any warehouse.
+        self._entries = {}
+        self._lock = threading.Lock()
+
+        if path is not None and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as file:
+                    self._entries = json.load(file)
+            except (OSError, ValueError) as e:
+                print(f"Error reading the postcode cache {path}: {e}")
+
+    def set(self, postcode: str, warehouse: str | None) -> None:
+        """
+        Stores the warehouse of a postcode, or None if it isn't served by any warehouse.
+        """
+        with self._lock:
+            self._entries[postcode] = time.time() if warehouse is None else warehouse
+            if self.path is None:
+                return
+
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.path + ".part", "w", encoding="utf-8") as file:
+                    json.dump(self._entries, file)
+                os.replace(self.path + ".part", self.path)
+            except OSError as e:
+                print(f"Error writing the postcode cache {self.path}: {e}")
+
+    def _lookup(self, postcode: str) -> tuple[str | None, bool]:
+        # The warehouse of a postcode and whether the cache knows it. Expired
+        # negative entries (and those without a timestamp, written by older
+        # versions) are unknown.
+        entry = self._entries.get(postcode)
+        if isinstance(entry, str):
+            return entry, True
+        if isinstance(entry, (int, float)):
+            return None, time.time() - entry < self.negative_ttl
+
+        return None, False
+
+    def get(self, postcode: str, default=None) -> str | None:
+        warehouse, _ = self._lookup(postcode)
+        return default if warehouse is None else warehouse
+
+    def __getitem__(self, postcode: str) -> str | None:
+        warehouse, found = self._lookup(postcode)
+        if not found:
+            raise KeyError(postcode)
+
+        return warehouse
+
+    def __contains__(self, postcode: str) -> bool:
+        return self._lookup(postcode)[1]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self.path is not None and os.path.exists(self.path):
+                os.remove(self.path)
+
+
+_default_table = None
+_default_cache = None
+
+
+def get_default_table() -> PostcodeTable:
+    """
+    Returns the table stored in "~/.cache/mercapy/postcodes.bin" by `mercapy-postcodes refresh`, loading it on first use. If there's none, an empty table is returned and every postcode is looked up through the API.
+
+    Returns:
+        PostcodeTable: The shared default table.
+    """
+    global _default_table
+
+    if _default_table is None:
+        try:
+            _default_table = PostcodeTable.load()
+        except (OSError, ValueError):
+            _default_table = PostcodeTable()
+
+    return _default_table
+
+
+def get_default_cache() -> PostcodeCache:
+    """
+    Returns the cache of postcodes missing from the table, stored in "~/.cache/mercapy/postcodes.json".
+
+    Returns:
+        PostcodeCache: The shared default cache.
+    """
+    global _default_cache
+
+    if _default_cache is None:
+        _default_cache = PostcodeCache()
+
+    return _default_cache
+
+
+def build_table(
+    seeds: list[str] = None,
+    concurrency: int = 8,
+    transport: Transport = None,
+    verbose: bool = False,
+    rate: float = None,
+    checkpoint: str = None,
+) -> PostcodeTable:
+    """
+    Builds a table by querying the API: starting from the seed postcodes, every postcode served by a warehouse has its neighbours (see `neighbouring_postcodes`) queried too, until no new postcode is found. See `mercapy.discovery.WarehouseDiscovery`.
+
+    Args:
+        seeds (list[str], optional): Postcodes to start from. Defaults to the first postcode of every province (01001, 02001... 52001).
+        concurrency (int): Number of postcodes queried in parallel. Defaults to 8.
+        transport (Transport, optional): Transport every request is sent through. Defaults to a new transport limited by `concurrency` and `rate`.
+        verbose (bool): Print the progress. Defaults to False.
+        rate (float, optional): Maximum queries per second when no transport is given. Defaults to no pacing.
+        checkpoint (str, optional): Path of the file the progress is saved to, so an interrupted build can be resumed. Defaults to not saving it.
+
+    Returns:
+        PostcodeTable: The table. Postcodes that weren't reached stay unknown.
+    """
+    from ..discovery import WarehouseDiscovery
+
+    discovery = WarehouseDiscovery(
+        seeds,
+        concurrency,
+        rate,
+        transport,
+        checkpoint=checkpoint,
+        verbose=verbose,
+    )
+    discovery.run()
+    return discovery.to_table()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    refresh = commands.add_parser("refresh", help="Rebuild the table from the API")
+    refresh.add_argument("--output", default=DEFAULT_TABLE_PATH)
+    refresh.add_argument("--concurrency", type=int, default=8)
+    refresh.add_argument("--seeds", nargs="*", help="Postcodes to start from")
+    refresh.add_argument("--rate", type=float, help="Maximum queries per second")
+    refresh.add_argument(
+        "--checkpoint", help="File the progress is saved to and resumed from"
+    )
+
+    lookup = commands.add_parser("lookup", help="Look postcodes up in the table")
+    lookup.add_argument("postcodes", nargs="+")
+    lookup.add_argument("--table", default=DEFAULT_TABLE_PATH)
+
+    args = parser.parse_args()
+
+    if args.command == "refresh":
+        table = build_table(
+            args.seeds,
+            args.concurrency,
+            verbose=True,
+            rate=args.rate,
+            checkpoint=args.checkpoint,
+        )
+        table.save(args.output)
+        print(
+            f"{len(table)} postcodes and {len(table.codes)} warehouses written to {args.output}"
+        )
+        return
+
+    table = PostcodeTable.load(args.table)
+    for postcode in args.postcodes:
+        print(postcode, table.get(postcode, "unknown" if postcode not in table else None))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+from email.utils import parsedate_to_datetime
+from collections import deque
+from urllib.parse import urlparse
+import asyncio, random, threading, time
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Parses the value of a Retry-After header.
+
+    Args:
+        value (str, optional): Either a number of seconds or an HTTP date.
+
+    Returns:
+        float or None: Seconds to wait, or None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """
+    Exponential backoff with full jitter, so clients that were throttled at the same time don't retry at the same time.
+
+    Args:
+        attempt (int): Retry number, starting at 1.
+        base (float): Delay of the first retry before jitter, in seconds. Defaults to 1.
+        cap (float): Maximum delay in seconds. Defaults to 60.
+
+    Returns:
+        float: Seconds to wait before retrying.
+    """
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+def _wake_waiter(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class _HostLimit:
+    # Token bucket plus an AIMD concurrency window for a single host.
+
+    def __init__(self, rate, burst, min_concurrency, max_concurrency):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(max_concurrency)
+        self.in_flight = 0
+        self.decreased_at = 0.0
+
+        self.condition = threading.Condition()
+        # Futures of the coroutines waiting for a slot in the window, woken
+        # (from any thread) whenever a request is released.
+        self.waiters = deque()
+
+    def wake(self) -> None:
+        # Must be called with the condition held.
+        self.condition.notify_all()
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            waiter.get_loop().call_soon_threadsafe(_wake_waiter, waiter)
+
+    def reserve(self) -> float:
+        # Takes a token if one is available and the host isn't blocked by a
+        # Retry-After, otherwise returns how long to wait before trying again.
+        with self.condition:
+            now = time.monotonic()
+            if self.blocked_until > now:
+                return self.blocked_until - now
+
+            if self.rate is None:
+                return 0.0
+
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated_at) * self.rate
+            )
+            self.updated_at = now
+
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+
+            return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        rate: float | None = None,
+        burst: int = 10,
+        per_host: bool = True,
+        min_concurrency: int = 1,
+        max_concurrency: int = 64,
+        backoff_base: float = 1.0,
+        backoff_cap: float = 60.0,
+    ) -> None:
+        """
+        Rate limiter shared by every request sent through a transport.
+        Requests are paced by a token bucket, every request waits while a host is blocked by a Retry-After header, and the number of requests in flight adapts to the server: it grows by one per window of successful requests and halves whenever a 429 is received (AIMD).
+
+        Args:
+            rate (float, optional): Requests per second allowed by the token bucket. Defaults to None: no pacing, only the adaptive concurrency applies.
+            burst (int): Requests that can be sent at once before pacing kicks in. Defaults to 10.
+            per_host (bool): Keep separate limits for every host. Defaults to True.
+            min_concurrency (int): Requests in flight allowed however many 429s are received. Defaults to 1.
+            max_concurrency (int): Requests in flight allowed when no 429s are received. Defaults to 64.
+            backoff_base (float): Delay of the first retry when the server doesn't send a Retry-After header, in seconds. Defaults to 1.
+            backoff_cap (float): Maximum delay between retries, in seconds. Defaults to 60.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.per_host = per_host
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+        self.throttled = 0
+        self.waited = 0.0
+
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _get_host(self, url: str) -> _HostLimit:
+        host = urlparse(url).netloc if self.per_host else "*"
+
+        with self._lock:
+            limit = self._hosts.get(host)
+            if limit is None:
+                limit = _HostLimit(
+                    self.rate, self.burst, self.min_concurrency, self.max_concurrency
+                )
+                self._hosts[host] = limit
+
+        return limit
+
+    def reserve(self, url: str) -> float:
+        """
+        Takes a token for a request to `url` without blocking.
+
+        Args:
+            url (str): URL the request is sent to.
+
+        Returns:
+            float: 0 if the request can be sent now, otherwise seconds to wait before calling again.
+        """
+        return self._get_host(url).reserve()
+
+    def acquire(self, url: str) -> float:
+        """
+        Blocks until a request to `url` is allowed by the token bucket and the concurrency window. Must be followed by `release`.
+
+        Args:
+            url (str): URL the request is sent to.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        limit = self._get_host(url)
+        started_at = time.monotonic()
+
+        while (delay := limit.reserve()) > 0:
+            time.sleep(delay)
+
+        with limit.condition:
+            while limit.in_flight >= int(limit.concurrency):
+                limit.condition.wait()
+            limit.in_flight += 1
+
+        return self._record_wait(started_at)
+
+    async def acquire_async(self, url: str) -> float:
+        """
+        Awaitable counterpart of `acquire`: waits without blocking the event loop until a request to `url` is allowed by the token bucket and the concurrency window. Must be followed by `release`.
+
+        Args:
+            url (str): URL the request is sent to.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        limit = self._get_host(url)
+        started_at = time.monotonic()
+
+        while (delay := limit.reserve()) > 0:
+            await asyncio.sleep(delay)
+
+        loop = asyncio.get_running_loop()
+        while True:
+            with limit.condition:
+                if limit.in_flight < int(limit.concurrency):
+                    limit.in_flight += 1
+                    break
+
+                waiter = loop.create_future()
+                limit.waiters.append(waiter)
+
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                with limit.condition:
+                    if waiter in limit.waiters:
+                        limit.waiters.remove(waiter)
+                raise
+
+        return self._record_wait(started_at)
+
+    def _record_wait(self, started_at: float) -> float:
+        waited = time.monotonic() - started_at
+        if waited > 0.001:
+            self.throttled += 1
+            self.waited += waited
+
+        return waited
+
+    def release(self, url: str, status: int = None, retry_after: float = None) -> None:
+        """
+        Reports the outcome of a request sent after `acquire` or `acquire_async`, freeing its slot in the concurrency window.
+
+        Args:
+            url (str): URL the request was sent to.
+            status (int, optional): Status code received, or None if the request failed.
+            retry_after (float, optional): Seconds the server asked to wait.
+        """
+        limit = self._get_host(url)
+
+        with limit.condition:
+            limit.in_flight = max(0, limit.in_flight - 1)
+            self._feedback(limit, status, retry_after)
+            limit.wake()
+
+    def feedback(self, url: str, status: int = None, retry_after: float = None) -> None:
+        """
+        Reports the outcome of a request sent after `reserve`, adapting the limits without touching the requests in flight.
+
+        Args:
+            url (str): URL the request was sent to.
+            status (int, optional): Status code received, or None if the request failed.
+            retry_after (float, optional): Seconds the server asked to wait.
+        """
+        limit = self._get_host(url)
+
+        with limit.condition:
+            self._feedback(limit, status, retry_after)
+            limit.wake()
+
+    def _feedback(self, limit: _HostLimit, status, retry_after) -> None:
+        now = time.monotonic()
+
+        if status == 429:
+            if retry_after:
+                limit.blocked_until = max(limit.blocked_until, now + retry_after)
+
+            # Many requests in flight get throttled at once; only halve the
+            # window once per burst of 429s.
+            if now - limit.decreased_at > 1.0:
+                limit.concurrency = max(limit.min_concurrency, limit.concurrency / 2)
+                limit.decreased_at = now
+        elif status is not None and status < 500:
+            limit.concurrency = min(
+                limit.max_concurrency, limit.concurrency + 1 / limit.concurrency
+            )
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Seconds to wait before retrying a throttled request that had no Retry-After header.
+
+        Args:
+            attempt (int): Retry number, starting at 1.
+
+        Returns:
+            float: Jittered delay in seconds.
+        """
+        return backoff_delay(attempt, self.backoff_base, self.backoff_cap)
+
+    def concurrency(self, url: str) -> int:
+        """
+        Returns how many requests to the host of `url` are currently allowed in flight.
+        """
+        return int(self._get_host(url).concurrency)
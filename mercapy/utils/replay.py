@@ -0,0 +1,558 @@
+from base64 import b64decode, b64encode
+from collections import Counter
+from dataclasses import dataclass, field
+from hashlib import sha1
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+import asyncio, gzip, json, os, random, threading, time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from .async_transport import AsyncResponse, AsyncTransport, aiohttp
+from .transport import Transport
+
+# Headers that describe how a response was sent rather than what it contains,
+# so they are not recorded.
+_SKIPPED_HEADERS = {
+    "connection",
+    "content-encoding",
+    "content-length",
+    "date",
+    "keep-alive",
+    "set-cookie",
+    "transfer-encoding",
+}
+
+# Header the stub server reads the original host of a request from.
+HOST_HEADER = "X-Mercapy-Host"
+
+
+def exchange_key(method: str, url: str, body: bytes | str = None) -> str:
+    """
+    Returns the key a request is recorded under: its method, host, path, sorted query parameters and a hash of its body.
+
+    Args:
+        method (str): HTTP method (e.g. "GET").
+        url (str): Full URL, including the query string.
+        body (bytes | str, optional): Request body.
+
+    Returns:
+        str: The key (e.g. "GET tienda.mercadona.es/api/products/12345/?lang=es&wh=mad1").
+    """
+    parts = urlsplit(url)
+    key = f"{method.upper()} {parts.netloc}{parts.path}"
+
+    if parts.query:
+        key += "?" + "&".join(sorted(parts.query.split("&")))
+    if body:
+        if isinstance(body, str):
+            body = body.encode()
+        key += " #" + sha1(body).hexdigest()[:16]
+
+    return key
+
+
+def _prepare(method: str, url: str, **kwargs) -> tuple[str, bytes | str | None]:
+    # Full URL and body of a request as requests would send them.
+    prepared = requests.Request(
+        method,
+        url,
+        params=kwargs.get("params"),
+        data=kwargs.get("data"),
+        json=kwargs.get("json"),
+    ).prepare()
+    return prepared.url, prepared.body
+
+
+class FixtureArchive:
+    def __init__(self, path: str = None) -> None:
+        """
+        Recorded responses, keyed by request (see `exchange_key`). Saved as a gzip-compressed JSON file.
+
+        Args:
+            path (str, optional): File the archive is saved to by default.
+        """
+        self.path = path
+        self.exchanges = {}
+
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        key: str,
+        status: int,
+        headers: dict,
+        content: bytes,
+        reason: str = "",
+    ) -> None:
+        """
+        Records a response, replacing any previous response to the same request.
+
+        Args:
+            key (str): Key of the request.
+            status (int): HTTP status code.
+            headers (dict): Response headers.
+            content (bytes): Response body.
+            reason (str): HTTP reason phrase.
+        """
+        try:
+            body, encoding = content.decode("utf-8"), "text"
+        except UnicodeDecodeError:
+            body, encoding = b64encode(content).decode("ascii"), "base64"
+
+        exchange = {
+            "status": status,
+            "reason": reason,
+            "headers": {
+                k: v for k, v in headers.items() if k.lower() not in _SKIPPED_HEADERS
+            },
+            "encoding": encoding,
+            "body": body,
+        }
+
+        with self._lock:
+            self.exchanges[key] = exchange
+
+    def lookup(self, key: str) -> tuple[int, dict, bytes, str] | None:
+        """
+        Returns the response recorded for a request.
+
+        Args:
+            key (str): Key of the request.
+
+        Returns:
+            tuple or None: (status, headers, content, reason), or None if the request wasn't recorded.
+        """
+        exchange = self.exchanges.get(key)
+        if exchange is None:
+            return None
+
+        if exchange["encoding"] == "base64":
+            content = b64decode(exchange["body"])
+        else:
+            content = exchange["body"].encode("utf-8")
+
+        return exchange["status"], exchange["headers"], content, exchange["reason"]
+
+    def save(self, path: str = None) -> None:
+        """
+        Saves the archive.
+
+        Args:
+            path (str, optional): Path of the file. Defaults to the archive's path.
+        """
+        path = path or self.path
+        if path is None:
+            raise ValueError("No path given to save the archive to.")
+
+        with self._lock:
+            payload = {"version": 1, "exchanges": self.exchanges}
+            with gzip.open(path, "wt", encoding="utf-8") as file:
+                json.dump(payload, file, separators=(",", ":"), ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "FixtureArchive":
+        """
+        Loads an archive saved with `save`.
+
+        Args:
+            path (str): Path of the file.
+
+        Returns:
+            FixtureArchive: The archive.
+        """
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            payload = json.load(file)
+
+        archive = cls(path)
+        archive.exchanges = payload["exchanges"]
+        return archive
+
+    @classmethod
+    def open(cls, archive: "FixtureArchive | str") -> "FixtureArchive":
+        # Accepts either an archive or the path of one, which doesn't need to
+        # exist yet.
+        if isinstance(archive, FixtureArchive):
+            return archive
+        if os.path.exists(archive):
+            return cls.load(archive)
+        return cls(archive)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.exchanges
+
+    def __len__(self) -> int:
+        return len(self.exchanges)
+
+
+@dataclass
+class Faults:
+    """
+    Latency and failures injected into replayed responses.
+
+    Args:
+        latency (float): Seconds every response is delayed. Defaults to 0.
+        jitter (float): Maximum extra random delay in seconds. Defaults to 0.
+        throttle_rate (float): Fraction of requests answered with 429 Too Many Requests. Defaults to 0.
+        throttle_first (int): Number of requests to each endpoint answered with 429 before the recorded response is served. Defaults to 0.
+        retry_after (float, optional): Retry-After sent with injected 429s. Defaults to no header.
+        error_rate (float): Fraction of requests answered with `error_status`. Defaults to 0.
+        error_status (int): Status code of injected errors. Defaults to 500.
+        seed (int, optional): Seed of the random generator, for reproducible runs.
+    """
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    throttle_rate: float = 0.0
+    throttle_first: int = 0
+    retry_after: float | None = None
+    error_rate: float = 0.0
+    error_status: int = 500
+    seed: int | None = None
+
+    _random: random.Random = field(init=False, repr=False)
+    _seen: Counter = field(init=False, repr=False)
+    _lock: threading.Lock = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._random = random.Random(self.seed)
+        self._seen = Counter()
+        self._lock = threading.Lock()
+
+    def draw(self, key: str) -> tuple[float, int | None]:
+        """
+        Decides how a request is answered.
+
+        Args:
+            key (str): Key of the request.
+
+        Returns:
+            tuple: Seconds to wait before answering, and the status code to answer with instead of the recorded response (or None).
+        """
+        with self._lock:
+            self._seen[key] += 1
+            seen = self._seen[key]
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            roll = self._random.random()
+
+        if seen <= self.throttle_first or roll < self.throttle_rate:
+            return delay, 429
+        if roll < self.throttle_rate + self.error_rate:
+            return delay, self.error_status
+
+        return delay, None
+
+    def response(self, status: int) -> tuple[int, dict, bytes, str]:
+        # Response sent instead of the recorded one.
+        headers = {"Content-Type": "application/json"}
+        if status == 429:
+            if self.retry_after is not None:
+                headers["Retry-After"] = str(self.retry_after)
+            body, reason = {"detail": "Too many requests"}, "Too Many Requests"
+        else:
+            body, reason = {"detail": "Injected error"}, "Injected Error"
+
+        return status, headers, json.dumps(body).encode(), reason
+
+
+class RecordingTransport(Transport):
+    def __init__(self, archive: FixtureArchive | str, **kwargs) -> None:
+        """
+        Transport that sends requests as usual and records every response it receives (from `fetch_json`, `query_algolia`, `get_warehouse_code`, photos...), to be replayed later by a ReplayTransport or a StubServer.
+
+        Args:
+            archive (FixtureArchive | str): Archive to record to, or the path of one. Existing archives are extended, and archives with a path are saved when the transport is closed.
+            **kwargs: Any other argument accepted by Transport.
+        """
+        super().__init__(**kwargs)
+        self.archive = FixtureArchive.open(archive)
+
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        response = super()._send(method, url, **kwargs)
+
+        key = exchange_key(method, *_prepare(method, url, **kwargs))
+        self.archive.record(
+            key,
+            response.status_code,
+            response.headers,
+            response.content,
+            response.reason or "",
+        )
+
+        return response
+
+    def save(self, path: str = None) -> None:
+        """
+        Saves the recorded responses.
+
+        Args:
+            path (str, optional): Path of the file. Defaults to the archive's path.
+        """
+        self.archive.save(path)
+
+    def close(self) -> None:
+        super().close()
+        if self.archive.path is not None:
+            self.archive.save()
+
+
+class ReplayTransport(Transport):
+    def __init__(
+        self, archive: FixtureArchive | str, faults: Faults = None, **kwargs
+    ) -> None:
+        """
+        Transport that answers every request from recorded responses, without touching the network.
+        Requests still go through the rate limiter and the retry logic, so injected 429s are retried like real ones. Requests that weren't recorded fail with a ConnectionError.
+
+        Args:
+            archive (FixtureArchive | str): Archive to replay, or the path of one.
+            faults (Faults, optional): Latency and failures to inject. Defaults to none.
+            **kwargs: Any other argument accepted by Transport.
+        """
+        super().__init__(**kwargs)
+        self.archive = FixtureArchive.open(archive)
+        self.faults = faults or Faults()
+
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        full_url, body = _prepare(method, url, **kwargs)
+        key = exchange_key(method, full_url, body)
+
+        delay, status = self.faults.draw(key)
+        if delay:
+            time.sleep(delay)
+
+        if status is not None:
+            recorded = self.faults.response(status)
+        else:
+            recorded = self.archive.lookup(key)
+            if recorded is None:
+                raise requests.exceptions.ConnectionError(
+                    f"No recorded response for {key}"
+                )
+
+        status, headers, content, reason = recorded
+
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response.reason = reason
+        response.url = full_url
+        response.encoding = "utf-8"
+        response._content = content
+        response._content_consumed = True
+
+        return response
+
+
+class AsyncReplayTransport(AsyncTransport):
+    def __init__(
+        self, archive: FixtureArchive | str, faults: Faults = None, **kwargs
+    ) -> None:
+        """
+        Asynchronous counterpart of ReplayTransport: answers every request from recorded responses, without touching the network, so AsyncMercadona can be run offline.
+        Requests still go through the rate limiter and the retry logic. Requests that weren't recorded fail with a ClientConnectionError.
+
+        Args:
+            archive (FixtureArchive | str): Archive to replay, or the path of one.
+            faults (Faults, optional): Latency and failures to inject. Defaults to none.
+            **kwargs: Any other argument accepted by AsyncTransport.
+        """
+        super().__init__(**kwargs)
+        self.archive = FixtureArchive.open(archive)
+        self.faults = faults or Faults()
+
+    async def _send(self, method: str, url: str, **kwargs) -> AsyncResponse:
+        full_url, body = _prepare(method, url, **kwargs)
+        key = exchange_key(method, full_url, body)
+
+        delay, status = self.faults.draw(key)
+        if delay:
+            await asyncio.sleep(delay)
+
+        if status is not None:
+            recorded = self.faults.response(status)
+        else:
+            recorded = self.archive.lookup(key)
+            if recorded is None:
+                raise aiohttp.ClientConnectionError(f"No recorded response for {key}")
+
+        status, headers, content, reason = recorded
+        return AsyncResponse(status, CaseInsensitiveDict(headers), content, reason)
+
+
+class StubServer:
+    def __init__(
+        self,
+        archive: FixtureArchive | str,
+        faults: Faults = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        """
+        Local HTTP server answering with recorded responses, with optional latency and failures. Unlike a ReplayTransport, requests go through real sockets, so connection pooling and timeouts are exercised too.
+        Clients reach it through the transport returned by `transport()` (or `async_transport()`), which sends every request to the server instead of its original host.
+
+        Args:
+            archive (FixtureArchive | str): Archive to serve, or the path of one.
+            faults (Faults, optional): Latency and failures to inject. Defaults to none.
+            host (str): Address to listen on. Defaults to "127.0.0.1".
+            port (int): Port to listen on. Defaults to any free port.
+        """
+        self.archive = FixtureArchive.open(archive)
+        self.faults = faults or Faults()
+        self.host = host
+        self.port = port
+
+        self.requests = 0
+        self.misses = 0
+
+        self._server = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        """
+        Base URL of the running server.
+        """
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "StubServer":
+        """
+        Starts serving in a background thread.
+        """
+        self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+        return self
+
+    def stop(self) -> None:
+        """
+        Stops the server.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def transport(self, **kwargs) -> Transport:
+        """
+        Returns a transport that sends every request to this server.
+
+        Args:
+            **kwargs: Any argument accepted by Transport.
+
+        Returns:
+            Transport: The transport.
+        """
+        return _StubTransport(self.url, **kwargs)
+
+    def async_transport(self, **kwargs) -> AsyncTransport:
+        """
+        Returns an asynchronous transport that sends every request to this server.
+
+        Args:
+            **kwargs: Any argument accepted by AsyncTransport.
+
+        Returns:
+            AsyncTransport: The transport.
+        """
+        return _AsyncStubTransport(self.url, **kwargs)
+
+    def _answer(self, method: str, url: str, body: bytes) -> tuple:
+        key = exchange_key(method, url, body)
+
+        with self._lock:
+            self.requests += 1
+
+        delay, status = self.faults.draw(key)
+        if delay:
+            time.sleep(delay)
+
+        if status is not None:
+            return self.faults.response(status)
+
+        recorded = self.archive.lookup(key)
+        if recorded is None:
+            with self._lock:
+                self.misses += 1
+            body = json.dumps({"detail": f"No recorded response for {key}"}).encode()
+            return 404, {"Content-Type": "application/json"}, body, "Not Found"
+
+        return recorded
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else None
+                host = self.headers.get(HOST_HEADER) or self.headers.get("Host")
+
+                status, headers, content, reason = server._answer(
+                    self.command, f"http://{host}{self.path}", body
+                )
+
+                self.send_response(status, reason)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+        return Handler
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def _stub_request(base_url: str, url: str, kwargs: dict) -> str:
+    # Points a request at a StubServer, passing the original host along so the
+    # server can find the recorded response.
+    parts = urlsplit(url)
+    stub_url = base_url + parts.path
+    if parts.query:
+        stub_url += "?" + parts.query
+
+    kwargs["headers"] = {**(kwargs.get("headers") or {}), HOST_HEADER: parts.netloc}
+    return stub_url
+
+
+class _StubTransport(Transport):
+    # Sends every request to a StubServer.
+
+    def __init__(self, base_url: str, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.base_url = base_url
+
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        stub_url = _stub_request(self.base_url, url, kwargs)
+        return super()._send(method, stub_url, **kwargs)
+
+
+class _AsyncStubTransport(AsyncTransport):
+    # Sends every request to a StubServer, without blocking the event loop.
+
+    def __init__(self, base_url: str, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.base_url = base_url
+
+    async def _send(self, method: str, url: str, **kwargs) -> AsyncResponse:
+        stub_url = _stub_request(self.base_url, url, kwargs)
+        return await super()._send(method, stub_url, **kwargs)
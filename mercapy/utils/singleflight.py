@@ -0,0 +1,94 @@
+from collections.abc import Awaitable, Callable
+import asyncio, threading
+
+
+class _Call:
+    # A call in flight and its outcome, once it finishes.
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        """
+        Coalesces concurrent calls with the same key: while a call is in flight, every other thread asking for the same key waits for it and gets its result (or exception) instead of making the call again.
+        Only calls that overlap are shared; once a call finishes, the next one with the same key runs again.
+        """
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func: Callable) -> tuple[object, bool]:
+        """
+        Calls `func`, unless a call with the same key is already in flight, in which case its result is shared.
+
+        Args:
+            key (Hashable): Identity of the call.
+            func (Callable): Called without arguments.
+
+        Returns:
+            tuple: The result and whether it was shared from a call made by another thread.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+class AsyncSingleFlight:
+    def __init__(self) -> None:
+        """
+        Asynchronous counterpart of SingleFlight: concurrent coroutines awaiting the same key share one call.
+        """
+        self._calls = {}
+
+    async def do(self, key, func: Callable[[], Awaitable]) -> tuple[object, bool]:
+        """
+        Awaits `func()`, unless a call with the same key is already in flight, in which case its result is shared.
+
+        Args:
+            key (Hashable): Identity of the call.
+            func (Callable): Called without arguments, returning an awaitable.
+
+        Returns:
+            tuple: The result and whether it was shared from a call made by another coroutine.
+        """
+        future = self._calls.get(key)
+        if future is not None:
+            # Shielded so a cancelled follower doesn't cancel the shared call.
+            return await asyncio.shield(future), True
+
+        future = asyncio.ensure_future(func())
+        self._calls[key] = future
+        try:
+            return await asyncio.shield(future), False
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def __len__(self) -> int:
+        return len(self._calls)
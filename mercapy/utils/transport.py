@@ -0,0 +1,174 @@
+import requests, time
+from requests.adapters import HTTPAdapter
+
+from .cache import ResponseCache
+from .decoding import JSONDecoder
+from .identity import IdentityMap
+from .instrumentation import Instrumentation, RequestEvent
+from .ratelimit import RateLimiter, parse_retry_after
+from .singleflight import SingleFlight
+
+# (connect, read) timeouts in seconds.
+DEFAULT_TIMEOUT = (5, 30)
+
+
+class Transport:
+    def __init__(
+        self,
+        pool_connections: int = 4,
+        pool_maxsize: int = 16,
+        timeout: float | tuple[float, float] = DEFAULT_TIMEOUT,
+        keep_alive: bool = True,
+        headers: dict = None,
+        cache: ResponseCache = None,
+        identity_map: IdentityMap = None,
+        rate_limiter: RateLimiter = None,
+        max_retries: int = 3,
+        json_decoder: JSONDecoder = None,
+        instrumentation: Instrumentation = None,
+        coalesce: bool = True,
+    ) -> None:
+        """
+        HTTP transport shared by every request made on behalf of a client. Connections are pooled and kept alive, so consecutive requests to the same host reuse an already open TCP+TLS connection.
+        Every request goes through the transport's rate limiter, and requests answered with 429 Too Many Requests are retried after the Retry-After delay, or a jittered backoff if the server doesn't send one.
+
+        Args:
+            pool_connections (int): Number of hosts to keep a connection pool for. Defaults to 4.
+            pool_maxsize (int): Maximum number of open connections kept per host. Should be at least the number of threads using the transport. Defaults to 16.
+            timeout (float | tuple): Timeout in seconds for every request, either a single value or a (connect, read) tuple. Defaults to (5, 30).
+            keep_alive (bool): Whether connections are kept open between requests. Defaults to True.
+            headers (dict, optional): Extra headers sent with every request.
+            cache (ResponseCache, optional): Cache consulted by `fetch_json` before sending a request. Defaults to no cache.
+            identity_map (IdentityMap, optional): Map shared by every item created with this transport, so the same product, category or season is only instantiated and fetched once. Defaults to no map.
+            rate_limiter (RateLimiter, optional): Limiter every request waits on. Defaults to a limiter that only adapts concurrency and honours Retry-After.
+            max_retries (int): Times a throttled request is retried before giving up. Defaults to 3.
+            json_decoder (JSONDecoder, optional): Decoder used to parse response bodies. Defaults to an untyped decoder using the fastest JSON library installed.
+            instrumentation (Instrumentation, optional): Collects an event for every request. Defaults to a new instance owned by this transport.
+            coalesce (bool): Whether concurrent `fetch_json` calls for the same URL and parameters (i.e. endpoint, warehouse and language) share a single request and its result. Defaults to True.
+        """
+        self.timeout = timeout
+        self.cache = cache
+        self.identity_map = identity_map
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.max_retries = max_retries
+        self.json_decoder = json_decoder or JSONDecoder()
+        self.instrumentation = instrumentation or Instrumentation()
+        self.single_flight = SingleFlight() if coalesce else None
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections, pool_maxsize=pool_maxsize
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        if not keep_alive:
+            self.session.headers["Connection"] = "close"
+        if headers:
+            self.session.headers.update(headers)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a request through the pooled session.
+
+        Args:
+            method (str): HTTP method (e.g. "GET").
+            url (str): The URL to send the request to.
+            **kwargs: Any other argument accepted by `requests.Session.request`.
+
+        Returns:
+            requests.Response: The response received.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        event = RequestEvent.start(method, url)
+
+        attempt = 0
+        try:
+            while True:
+                event.wait += self.rate_limiter.acquire(url)
+
+                status = retry_after = None
+                sent_at = time.perf_counter()
+                try:
+                    response = self._send(method, url, **kwargs)
+                    status = response.status_code
+                    retry_after = parse_retry_after(
+                        response.headers.get("Retry-After")
+                    )
+                finally:
+                    event.latency += time.perf_counter() - sent_at
+                    self.rate_limiter.release(url, status, retry_after)
+
+                if status != 429 or attempt >= self.max_retries:
+                    event.status = status
+                    event.bytes = _response_size(response, kwargs.get("stream"))
+                    return response
+
+                attempt += 1
+                event.retries = attempt
+                response.close()
+
+                # With a Retry-After the limiter already holds back every request
+                # to the host, so only sleep when the server didn't say how long
+                # to wait.
+                if retry_after is None:
+                    delay = self.rate_limiter.backoff(attempt)
+                    time.sleep(delay)
+                    event.backoff += delay
+        except Exception as e:
+            event.error = str(e)
+            raise
+        finally:
+            self.instrumentation.record(event)
+
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        # Sends a single request, without rate limiting or retries. Overridden by
+        # transports that don't talk to the network (e.g. ReplayTransport).
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def close(self) -> None:
+        """
+        Closes every pooled connection.
+        """
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _response_size(response: requests.Response, stream: bool = False) -> int:
+    # Streamed bodies haven't been read yet, so rely on Content-Length.
+    if stream:
+        return int(response.headers.get("Content-Length") or 0)
+
+    return len(response.content)
+
+
+_default_transport = None
+
+
+def get_default_transport() -> Transport:
+    """
+    Returns the transport used when no transport is given explicitly, creating it on first use.
+
+    Returns:
+        Transport: The shared default transport.
+    """
+    global _default_transport
+
+    if _default_transport is None:
+        _default_transport = Transport()
+
+    return _default_transport
@@ -1,24 +1,118 @@
-import requests
+from .transport import Transport, get_default_transport
+from .async_transport import AsyncTransport
+from .postcodes import PostcodeCache, PostcodeTable, get_default_cache, get_default_table
 
+CHANGE_POSTCODE_URL = "https://tienda.mercadona.es/api/postal-codes/actions/change-pc/"
 
-def get_warehouse_code(postal_code):
+
+def _lookup_locally(
+    postal_code: str, table: PostcodeTable = None, cache: PostcodeCache = None
+) -> tuple[str | None, bool]:
+    # Looks a postcode up in the table and then in the cache of misses, returning
+    # the warehouse and whether it was found in either.
+    table = get_default_table() if table is None else table
+    if postal_code in table:
+        return table[postal_code], True
+
+    cache = get_default_cache() if cache is None else cache
+    if postal_code in cache:
+        return cache[postal_code], True
+
+    return None, False
+
+
+def query_warehouse_code(
+    postal_code: str, transport: Transport = None
+) -> tuple[str | None, bool]:
     """
-    Get warehouse code for a given postal code.
+    Asks the API which warehouse serves a postal code, without looking it up locally.
 
     Args:
         postal_code (str): The postal code to query.
+        transport (Transport, optional): Transport used to send the request. Defaults to the shared default transport.
 
     Returns:
-        str or None: Warehouse code if found, None otherwise.
+        tuple: The warehouse code (or None), and whether the API answered. Failed requests aren't answers, so they shouldn't be cached.
     """
-    url = "https://tienda.mercadona.es/api/postal-codes/actions/change-pc/"
+    transport = transport or get_default_transport()
+    url = CHANGE_POSTCODE_URL
     payload = {"new_postal_code": postal_code}
     headers = {"Content-Type": "application/json"}
 
     try:
-        response = requests.put(url, json=payload, headers=headers)
+        response = transport.put(url, json=payload, headers=headers)
         if response.status_code == 200:
-            return response.headers.get("X-Customer-Wh")
+            return response.headers.get("X-Customer-Wh"), True
+    except Exception as e:
+        print(f"Error for postal code {postal_code}: {e}")
+    return None, False
+
+
+def get_warehouse_code(
+    postal_code,
+    transport: Transport = None,
+    table: PostcodeTable = None,
+    cache: PostcodeCache = None,
+):
+    """
+    Get warehouse code for a given postal code. The offline postcode table (see `get_default_table`) is checked first, then the local cache of previous lookups, and only then is the API asked (and its answer cached; postcodes without a warehouse only for the cache's `negative_ttl`).
+
+    Args:
+        postal_code (str): The postal code to query.
+        transport (Transport, optional): Transport used to send the request. Defaults to the shared default transport.
+        table (PostcodeTable, optional): Offline table checked first. Defaults to the table built by `mercapy-postcodes refresh`, if any.
+        cache (PostcodeCache, optional): Cache of postcodes missing from the table. Defaults to "~/.cache/mercapy/postcodes.json".
+
+    Returns:
+        str or None: Warehouse code if found, None otherwise.
+    """
+    warehouse, found = _lookup_locally(postal_code, table, cache)
+    if found:
+        return warehouse
+
+    warehouse, answered = query_warehouse_code(postal_code, transport)
+    if answered:
+        (get_default_cache() if cache is None else cache).set(postal_code, warehouse)
+
+    return warehouse
+
+
+async def get_warehouse_code_async(
+    postal_code,
+    transport: AsyncTransport = None,
+    table: PostcodeTable = None,
+    cache: PostcodeCache = None,
+):
+    """
+    Get warehouse code for a given postal code without blocking the event loop. The postcode table and the local cache are checked before asking the API.
+
+    Args:
+        postal_code (str): The postal code to query.
+        transport (AsyncTransport, optional): Transport used to send the request. Defaults to a transport that only lives for this request.
+        table (PostcodeTable, optional): Offline table checked first. Defaults to the table built by `mercapy-postcodes refresh`, if any.
+        cache (PostcodeCache, optional): Cache of postcodes missing from the table. Defaults to "~/.cache/mercapy/postcodes.json".
+
+    Returns:
+        str or None: Warehouse code if found, None otherwise.
+    """
+    warehouse, found = _lookup_locally(postal_code, table, cache)
+    if found:
+        return warehouse
+
+    if transport is None:
+        async with AsyncTransport() as transport:
+            return await get_warehouse_code_async(postal_code, transport, table, cache)
+
+    payload = {"new_postal_code": postal_code}
+
+    try:
+        response = await transport.put(CHANGE_POSTCODE_URL, json=payload)
+        if response.status == 200:
+            warehouse = response.headers.get("X-Customer-Wh")
+            (get_default_cache() if cache is None else cache).set(
+                postal_code, warehouse
+            )
+            return warehouse
     except Exception as e:
         print(f"Error for postal code {postal_code}: {e}")
     return None
@@ -32,5 +32,9 @@ setup(
     keywords=["mercadona", "api", "sdk", "data science", "prices", "information"],
     packages=find_packages(exclude=["docs", "tests"]),
     install_requires=["requests"],
+    extras_require={"async": ["aiohttp"], "fast": ["msgspec"], "parquet": ["pyarrow"]},
     setup_requires=["setuptools>=38.6.0"],
+    entry_points={
+        "console_scripts": ["mercapy-postcodes=mercapy.utils.postcodes:main"]
+    },
 )
@@ -0,0 +1,154 @@
+import asyncio, json, threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urljoin
+
+import pytest
+
+from mercapy import Mercadona, AsyncMercadona, ItemError, Product
+from mercapy.constants import API_URL
+from mercapy.utils.api import fetch_json
+from mercapy.utils.replay import (
+    FixtureArchive,
+    Faults,
+    ReplayTransport,
+    AsyncReplayTransport,
+    exchange_key,
+)
+
+PARAMS = {"lang": "es", "wh": "mad1"}
+
+
+def product_data(id: str, details: bool = True) -> dict:
+    data = {
+        "id": id,
+        "display_name": f"Galleta {id}",
+        "brand": "Hacendado",
+        "price_instructions": {"unit_price": "1.25", "bulk_price": "2.50"},
+    }
+    if details:
+        data["ean"] = f"840000000{id}"
+        data["details"] = {"legal_name": f"GALLETA {id}", "description": "Galleta"}
+        data["photos"] = []
+
+    return data
+
+
+def record(
+    archive: FixtureArchive, path: str, body: dict, status: int = 200, reason: str = "OK"
+) -> None:
+    url = urljoin(API_URL, path) + "?" + urlencode(PARAMS)
+    headers = {"Content-Type": "application/json"}
+    archive.record(
+        exchange_key("GET", url), status, headers, json.dumps(body).encode(), reason
+    )
+
+
+@pytest.fixture
+def archive() -> FixtureArchive:
+    # Two categories sharing product 1. Product 2 answers 404 and product 3 was
+    # never recorded, so requesting its details fails with a ConnectionError.
+    archive = FixtureArchive()
+
+    categories = [{"id": 10, "name": "Galletas"}, {"id": 11, "name": "Dulces"}]
+    record(archive, "/api/categories/", {"results": [{"id": 1, "categories": categories}]})
+
+    listings = {10: ["1", "2"], 11: ["1", "3"]}
+    for id, products in listings.items():
+        subcategory = {
+            "id": id * 10,
+            "name": f"Sub {id}",
+            "products": [product_data(p, details=False) for p in products],
+        }
+        record(archive, f"/api/categories/{id}/", {"id": id, "categories": [subcategory]})
+
+    record(archive, "/api/products/1/", product_data("1"))
+    record(archive, "/api/products/2/", {"detail": "Not found"}, 404, "Not Found")
+
+    return archive
+
+
+def test_throttled_requests_are_retried(archive):
+    transport = ReplayTransport(archive, Faults(throttle_first=2, retry_after=0))
+    product = Product("1", "mad1", transport=transport)
+
+    assert product.ean == "8400000001"
+
+    stats = transport.instrumentation.stats()["total"]
+    assert stats["requests"] == 1
+    assert stats["retries"] == 2
+
+
+def test_throttling_past_max_retries_is_reported(archive):
+    transport = ReplayTransport(
+        archive, Faults(throttle_first=5, retry_after=0), max_retries=1
+    )
+    mercadona = Mercadona("mad1", transport=transport)
+
+    (result,) = mercadona.get_products(["1"])
+
+    assert isinstance(result, ItemError)
+    assert result.err_code == 429
+    assert transport.instrumentation.stats()["total"]["retries"] == 1
+
+
+def test_concurrent_fetches_share_one_request(archive):
+    transport = ReplayTransport(archive, Faults(latency=0.2))
+    url = urljoin(API_URL, "/api/products/1/")
+    callers = 8
+    barrier = threading.Barrier(callers)
+
+    def fetch(_) -> dict:
+        barrier.wait()
+        return fetch_json(url, PARAMS, transport)
+
+    with ThreadPoolExecutor(max_workers=callers) as executor:
+        results = list(executor.map(fetch, range(callers)))
+
+    assert all(r["id"] == "1" for r in results)
+    # Every caller gets its own dictionary.
+    assert len({id(r) for r in results}) == callers
+
+    stats = transport.instrumentation.stats()["total"]
+    assert stats["requests"] == callers
+    assert stats["coalesced"] == callers - 1
+
+
+def test_get_products_reports_each_failure(archive):
+    mercadona = Mercadona("mad1", transport=ReplayTransport(archive))
+
+    ok, not_found, missing = mercadona.get_products(["1", "2", "3"])
+
+    assert isinstance(ok, Product) and ok.ean == "8400000001"
+    assert isinstance(not_found, ItemError) and not_found.err_code == 404
+    assert isinstance(missing, ItemError) and missing.err_code is None
+
+
+def test_catalog_keeps_listing_data_of_failed_details(archive):
+    mercadona = Mercadona("mad1", transport=ReplayTransport(archive))
+
+    catalog = mercadona.get_catalog(concurrency=4, fields=["ean"])
+    products = {p.id: p for p in catalog}
+
+    assert list(products) == ["1", "2", "3"]
+    assert catalog.duplicates == 1
+    assert products["1"].listed_in == ["10", "11"]
+    assert products["1"].ean == "8400000001"
+    # The 404 and the failed request keep the data of their listing.
+    assert products["2"]._data["display_name"] == "Galleta 2"
+    assert products["3"]._data["display_name"] == "Galleta 3"
+
+
+def test_async_catalog_keeps_listing_data_of_failed_details(archive):
+    pytest.importorskip("aiohttp")
+
+    async def crawl():
+        transport = AsyncReplayTransport(archive, Faults(throttle_first=1, retry_after=0))
+        async with AsyncMercadona("mad1", transport=transport) as mercadona:
+            return await mercadona.get_catalog(fields=["ean"])
+
+    catalog = asyncio.run(crawl())
+    products = {p.id: p for p in catalog}
+
+    assert products["1"]._data["ean"] == "8400000001"
+    assert products["2"]._data["display_name"] == "Galleta 2"
+    assert products["3"]._data["display_name"] == "Galleta 3"